@@ -0,0 +1,126 @@
+"""Compares per-call requests.post against a pooled SymantecClient.
+
+A local stand-in server answers every POST with a canned
+GetOrderByPartnerOrderID response and counts how many TCP connections were
+accepted, so the output shows connections reused versus re-established.
+
+Usage:
+
+    python benchmarks/connection_reuse.py [--calls 500]
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import os
+import threading
+import time
+
+from symantecssl.order import SymantecClient
+from symantecssl.request_models import GetOrderByPartnerOrderID
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+RESPONSE_FILE = os.path.join(
+    os.path.dirname(__file__), os.pardir, "tests", "unit", "xml_test_files",
+    "get_order_by_poid.xml"
+)
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "bench",
+    "password": "bench",
+}
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, body):
+        HTTPServer.__init__(self, address, StandInHandler)
+        self.body = body
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Nagle's algorithm combined with delayed ACKs stalls keep-alive
+    # connections, which would hide the gain from connection reuse.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/soap+xml")
+        self.send_header("Content-Length", str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def post_calls(endpoint, calls, keep_alive):
+    with SymantecClient(keep_alive=keep_alive) as client:
+        for _ in range(calls):
+            request_model = GetOrderByPartnerOrderID()
+            request_model.set_partner_order_id("131000-00000")
+            client.post(endpoint, request_model, CREDENTIALS)
+
+
+def per_call_post(endpoint, calls):
+    # Mimics the previous module level requests.post behaviour, where every
+    # call paid for a fresh connection.
+    post_calls(endpoint, calls, keep_alive=False)
+
+
+def pooled_post(endpoint, calls):
+    post_calls(endpoint, calls, keep_alive=True)
+
+
+def run(name, func, server, endpoint, calls):
+    server.connections = 0
+    start = time.time()
+    func(endpoint, calls)
+    elapsed = time.time() - start
+    print("{0:<16} {1:>6} calls {2:>6} connections {3:>9.1f} calls/s".format(
+        name, calls, server.connections, calls / elapsed
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    with open(RESPONSE_FILE, "rb") as f:
+        body = f.read()
+
+    server = StandInServer(("127.0.0.1", 0), body)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    endpoint = "http://127.0.0.1:{0}/query".format(server.server_address[1])
+    try:
+        run("per-call", per_call_post, server, endpoint, args.calls)
+        run("pooled", pooled_post, server, endpoint, args.calls)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measures the per-order cost of deserializing GetModifiedOrders responses.
+
+Parses a synthetic response once with lxml, then times
+OrderDetails.deserialize on the parsed tree so that only the response models
+are measured. The lazy and projected rows only read the status code and
+partner order ID of every order, the access pattern of most polling jobs,
+through OrderDetails.deserialize_lazy and a Projection respectively. The
+columns row deserializes every field into an OrderDetailColumns.
+
+Usage:
+
+    python benchmarks/deserialization.py [--orders 2000] [--repeat 5]
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from symantecssl.columns import OrderDetailColumns  # noqa: E402
+from symantecssl.response_models import (  # noqa: E402
+    OrderDetails, Projection
+)
+from synthetic import modified_orders_response  # noqa: E402
+
+STATUS_PROJECTION = Projection(["status_code", "partner_order_id"])
+
+
+def eager(root):
+    return OrderDetails.deserialize(root)
+
+
+def lazy(root):
+    for detail in OrderDetails.deserialize_lazy(root):
+        detail.status_code
+        detail.partner_order_id
+
+
+def projected(root):
+    return OrderDetails.deserialize(root, STATUS_PROJECTION)
+
+
+def columns(root):
+    return OrderDetailColumns.deserialize(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = modified_orders_response(args.orders)
+    root = etree.fromstring(body)
+
+    print("{0} orders, {1:.1f} KiB per order, best of {2}".format(
+        args.orders, len(body) / args.orders / 1024, args.repeat
+    ))
+    for name, func in [
+        ("eager", eager), ("lazy", lazy), ("projected", projected),
+        ("columns", columns)
+    ]:
+        best = min(timeit.repeat(
+            lambda: func(root), number=1, repeat=args.repeat
+        ))
+        print("{0:<9} {1:.3f} s, {2:.1f} us per order".format(
+            name, best, best / args.orders * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
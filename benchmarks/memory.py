@@ -0,0 +1,78 @@
+"""Measures the memory held by deserialized order details.
+
+Deserializes a synthetic GetModifiedOrders response and reports the Python
+memory, traced with tracemalloc, still held by the resulting OrderDetails,
+or OrderDetailColumns, once the lxml tree is released. Memory allocated by
+libxml2 is not traced, so only the response models are measured. Pooled rows
+deduplicate field values through a StringPool, released once deserialization
+is done.
+
+Usage:
+
+    python benchmarks/memory.py [--orders 20000]
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from symantecssl import utils  # noqa: E402
+from symantecssl.columns import OrderDetailColumns  # noqa: E402
+from symantecssl.response_models import OrderDetails  # noqa: E402
+from synthetic import modified_orders_response  # noqa: E402
+
+
+def measure(deserialize, body, pooled):
+    """Returns the memory held and peak while deserializing a response.
+
+    :param deserialize: callable taking the parsed response and a pool
+    :param body: response body
+    :param pooled: whether to deduplicate field values
+    :return: bytes held by the result, peak bytes and bytes saved by the pool
+    """
+    root = etree.fromstring(body)
+    gc.collect()
+    tracemalloc.start()
+    pool = utils.StringPool() if pooled else None
+    result = deserialize(root, pool=pool)
+    saved = pool.bytes_saved if pooled else 0
+    del root, pool
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held, peak, saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=20000)
+    args = parser.parse_args()
+
+    body = modified_orders_response(args.orders)
+
+    print("{0} orders".format(args.orders))
+    for name, deserialize in [
+        ("eager", OrderDetails.deserialize),
+        ("columns", OrderDetailColumns.deserialize)
+    ]:
+        for pooled in (False, True):
+            held, peak, saved = measure(deserialize, body, pooled)
+            print(
+                "{0:<9} {1:<6} {2:.0f} bytes per order held, {3:.0f} peak, "
+                "{4:.0f} saved".format(
+                    name, "pooled" if pooled else "", held / args.orders,
+                    peak / args.orders, saved / args.orders
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
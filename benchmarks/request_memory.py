@@ -0,0 +1,83 @@
+"""Measures the peak memory of serializing a Reissue with many SAN changes.
+
+Each mode runs in its own process, which builds the request, then reports
+how much its peak resident set size grew while serializing it:
+
+* tree builds the lxml tree with RequestEnvelope and serializes it,
+* template renders the precompiled template of symantecssl.templates,
+* stream iterates over a RequestBody, discarding each chunk as a request
+  body sent with chunked transfer encoding would.
+
+Usage:
+
+    python benchmarks/request_memory.py [--sans 100000]
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import resource
+import subprocess
+import sys
+
+from lxml import etree
+
+from symantecssl.request_models import Reissue, RequestEnvelope
+from symantecssl.streaming import RequestBody
+from symantecssl.templates import render_request
+
+MODES = ["tree", "template", "stream"]
+
+
+def reissue_request(sans):
+    request = Reissue()
+    request.set_credentials("123456", "Krieg", "TrainConductor")
+    for index in range(sans):
+        request.add_san("host%d.example.com" % index)
+        request.edit_san(
+            "old%d.example.com" % index, "new%d.example.com" % index
+        )
+    return request
+
+
+def serialize(mode, request):
+    if mode == "tree":
+        return len(etree.tostring(RequestEnvelope(request).serialize()))
+    if mode == "template":
+        return len(render_request(request, pretty_print=False))
+    return sum(len(chunk) for chunk in RequestBody(request))
+
+
+def peak_kib():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(mode, sans):
+    request = reissue_request(sans)
+    before = peak_kib()
+    size = serialize(mode, request)
+    print(size, peak_kib() - before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sans", type=int, default=100000)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        measure(args.mode, args.sans)
+        return
+
+    print("{0} added and {0} edited SANs".format(args.sans))
+    for mode in MODES:
+        size, growth = subprocess.check_output([
+            sys.executable, __file__, "--mode", mode, "--sans", str(args.sans)
+        ]).split()
+        print("{0:<9} {1:.1f} MiB body, peak grew by {2:.1f} MiB".format(
+            mode, int(size) / 2 ** 20, int(growth) / 1024
+        ))
+
+
+if __name__ == "__main__":
+    main()
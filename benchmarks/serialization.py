@@ -0,0 +1,67 @@
+"""Measures the per-request cost of serializing request envelopes.
+
+Times building the lxml tree of each request type with RequestEnvelope and
+serializing it, against rendering the precompiled byte template of
+symantecssl.templates, both indented and compact.
+
+Usage:
+
+    python benchmarks/serialization.py [--number 2000] [--repeat 5]
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import timeit
+
+from lxml import etree
+
+from symantecssl.request_models import (
+    GetModifiedOrderRequest, GetOrderByPartnerOrderID, QuickOrderRequest,
+    Reissue, RequestEnvelope
+)
+from symantecssl.templates import render_request
+
+
+def sample_requests():
+    reissue = Reissue()
+    reissue.add_san("www.example.com")
+    reissue.edit_san("old.example.com", "new.example.com")
+    requests = [
+        GetModifiedOrderRequest(), GetOrderByPartnerOrderID(),
+        QuickOrderRequest(), reissue
+    ]
+    for request in requests:
+        request.set_credentials("123456", "Krieg", "TrainConductor")
+    return requests
+
+
+def lxml_tree(request, pretty_print):
+    return etree.tostring(
+        RequestEnvelope(request).serialize(), pretty_print=pretty_print
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("{0} requests, best of {1}".format(args.number, args.repeat))
+    for request in sample_requests():
+        for pretty_print in (True, False):
+            for name, func in [("lxml", lxml_tree),
+                               ("template", render_request)]:
+                best = min(timeit.repeat(
+                    lambda: func(request, pretty_print),
+                    number=args.number, repeat=args.repeat
+                ))
+                print("{0:<24} {1:<8} {2:<9} {3:.1f} us per request".format(
+                    type(request).__name__,
+                    "pretty" if pretty_print else "compact", name,
+                    best / args.number * 1e6
+                ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""Measures serialize, parse and end-to-end throughput and peak memory.
+
+Runs every case on synthetic Symantec data, see synthetic.py:
+
+* serialize: rendering the request envelope of each request type with
+  serialize_request, and writing a Reissue with --sans added SANs as it is
+  streamed,
+* parse: parse_response on GetModifiedOrders responses of --orders orders,
+  and on GetOrderByPartnerOrderID, QuickOrder and Reissue responses, as well
+  as iter_order_details streaming the GetModifiedOrders response,
+* end_to_end: SymantecClient.post and stream_order_details through a
+  requests session answering with the synthetic responses, so that the
+  whole client is measured without a network.
+
+Each case reports its best throughput out of --repeat runs and the peak
+Python memory traced by tracemalloc during one more run. Memory allocated
+by libxml2 is not traced. Responses of more than --tree-limit orders are
+not held in memory: cases parsing a whole response are then skipped, and
+streaming cases generate the response while reading it, so their time
+includes generating it.
+
+Results can be written with --output and compared with --baseline against
+those of an earlier run with the same parameters, on the same machine. The
+suite exits with status 1 when a case is slower, or has a higher peak, than
+in the baseline by more than --tolerance.
+
+Usage:
+
+    python benchmarks/suite.py [--orders 1000] [--events 3] [--ca-certs 2]
+        [--sans 1000] [--number 200] [--repeat 5] [--tree-limit 50000]
+        [--only serialize parse end_to_end] [--output results.json]
+        [--baseline baseline.json] [--tolerance 0.25]
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+import requests
+from requests.adapters import BaseAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from symantecssl.order import (  # noqa: E402
+    SymantecClient, parse_response, serialize_request
+)
+from symantecssl.request_models import (  # noqa: E402
+    GetModifiedOrderRequest, GetOrderByPartnerOrderID, QuickOrderRequest,
+    Reissue
+)
+from symantecssl.streaming import iter_order_details  # noqa: E402
+import synthetic  # noqa: E402
+
+GROUPS = ("serialize", "parse", "end_to_end")
+
+ENDPOINT = "https://api.example.com/webtrust/"
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+class Case(object):
+    """A measured operation.
+
+    :param name: unique name of the case, prefixed with its group
+    :param func: callable running the operation once
+    :param items: number of items, orders or requests, handled per call
+    :param unit: name of the items
+    :param number: calls per timed run
+    """
+
+    def __init__(self, name, func, items=1, unit="requests", number=1):
+        self.name = name
+        self.func = func
+        self.items = items
+        self.unit = unit
+        self.number = number
+
+    def run(self, repeat):
+        """Times the case, then traces its peak memory.
+
+        :param repeat: number of timed runs
+        :return: dictionary of results
+        """
+        best = min(timeit.repeat(self.func, number=self.number, repeat=repeat))
+        seconds = best / self.number
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            self.func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "seconds": seconds,
+            "throughput": self.items / seconds,
+            "unit": self.unit,
+            "peak_bytes": peak,
+        }
+
+
+class SyntheticAdapter(BaseAdapter):
+    """Transport adapter answering every request with a synthetic response.
+
+    Request bodies streamed by RequestBody are read as they would be sent.
+
+    :param respond: callable returning the response body as an iterable of
+    bytes chunks
+    """
+
+    def __init__(self, respond=None):
+        super(SyntheticAdapter, self).__init__()
+        self.respond = respond
+
+    def send(self, request, stream=False, **kwargs):
+        if request.body is not None and not isinstance(request.body, bytes):
+            for _ in request.body:
+                pass
+
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = synthetic.SyntheticStream(self.respond())
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+class SyntheticSession(requests.Session):
+    """Session sending every request through a SyntheticAdapter."""
+
+    def __init__(self, adapter):
+        super(SyntheticSession, self).__init__()
+        self.adapter = adapter
+
+    def get_adapter(self, url):
+        return self.adapter
+
+
+def reissue(sans):
+    request = Reissue()
+    for index in range(sans):
+        request.add_san("san{0}.example.com".format(index))
+    return request
+
+
+def serialize_cases(args):
+    requests_models = [
+        GetModifiedOrderRequest(), GetOrderByPartnerOrderID(),
+        QuickOrderRequest(), reissue(1)
+    ]
+    cases = [
+        Case(
+            "serialize/" + type(request).__name__,
+            lambda request=request: serialize_request(request, CREDENTIALS),
+            number=args.number
+        )
+        for request in requests_models
+    ]
+
+    large = reissue(args.sans)
+    cases.append(Case(
+        "serialize/Reissue-{0}-sans".format(args.sans),
+        lambda: serialize_request(large, CREDENTIALS, pretty_print=False)
+    ))
+    cases.append(Case(
+        "serialize/Reissue-{0}-sans-stream".format(args.sans),
+        lambda: b"".join(serialize_request(large, CREDENTIALS, stream=True))
+    ))
+    return cases
+
+
+def modified_orders_chunks(args):
+    """Returns a callable generating the GetModifiedOrders response chunks.
+
+    Responses within --tree-limit orders are generated once and kept.
+    """
+    def generate():
+        return synthetic.iter_modified_orders_response(
+            args.orders, events=args.events, ca_certs=args.ca_certs
+        )
+
+    if args.orders > args.tree_limit:
+        return generate
+    chunks = list(generate())
+    return lambda: chunks
+
+
+def count(iterable):
+    return sum(1 for _ in iterable)
+
+
+def parse_cases(args, chunks):
+    cases = []
+    if args.orders <= args.tree_limit:
+        orders = b"".join(chunks())
+        cases.append(Case(
+            "parse/GetModifiedOrders",
+            lambda: parse_response(GetModifiedOrderRequest(), 200, orders),
+            items=args.orders, unit="orders"
+        ))
+
+    cases.append(Case(
+        "parse/GetModifiedOrders-stream",
+        lambda: count(iter_order_details(
+            synthetic.SyntheticStream(chunks())
+        )),
+        items=args.orders, unit="orders"
+    ))
+
+    for request, body in [
+        (GetOrderByPartnerOrderID(),
+         synthetic.order_by_partner_order_id_response(
+             events=args.events, ca_certs=args.ca_certs)),
+        (QuickOrderRequest(), synthetic.quick_order_response()),
+        (Reissue(), synthetic.reissue_response()),
+    ]:
+        cases.append(Case(
+            "parse/" + type(request).__name__,
+            lambda request=request, body=body: parse_response(
+                request, 200, body
+            ),
+            number=args.number
+        ))
+    return cases
+
+
+def end_to_end_cases(args, chunks):
+    adapter = SyntheticAdapter()
+    client = SymantecClient(session=SyntheticSession(adapter))
+
+    def post(request, respond):
+        def func():
+            adapter.respond = respond
+            return client.post(ENDPOINT, request, CREDENTIALS)
+        return func
+
+    def stream(request, respond):
+        def func():
+            adapter.respond = respond
+            return count(client.stream_order_details(
+                ENDPOINT, request, CREDENTIALS
+            ))
+        return func
+
+    cases = []
+    if args.orders <= args.tree_limit:
+        cases.append(Case(
+            "end_to_end/GetModifiedOrders",
+            post(GetModifiedOrderRequest(), chunks),
+            items=args.orders, unit="orders"
+        ))
+    cases.append(Case(
+        "end_to_end/GetModifiedOrders-stream",
+        stream(GetModifiedOrderRequest(), chunks),
+        items=args.orders, unit="orders"
+    ))
+
+    order = [synthetic.order_by_partner_order_id_response(
+        events=args.events, ca_certs=args.ca_certs
+    )]
+    quick_order = [synthetic.quick_order_response()]
+    reissued = [synthetic.reissue_response()]
+    for request, respond in [
+        (GetOrderByPartnerOrderID(), lambda: order),
+        (QuickOrderRequest(), lambda: quick_order),
+        (Reissue(), lambda: reissued),
+    ]:
+        cases.append(Case(
+            "end_to_end/" + type(request).__name__, post(request, respond),
+            number=args.number
+        ))
+    return cases
+
+
+def compare(results, baseline, tolerance):
+    """Compares results against a baseline.
+
+    :param results: results of this run
+    :param baseline: results of an earlier run with the same parameters
+    :param tolerance: relative slowdown, or peak memory increase, tolerated
+    :return: dictionary of the changes by case name, and list of the
+    regressions as text
+    """
+    changes = {}
+    regressions = []
+    for name, result in sorted(results["cases"].items()):
+        reference = baseline["cases"].get(name)
+        if reference is None:
+            continue
+
+        speed = result["throughput"] / reference["throughput"]
+        memory = (result["peak_bytes"] + 1) / (reference["peak_bytes"] + 1)
+        changes[name] = (speed, memory)
+        if speed < 1 - tolerance:
+            regressions.append("{0}: throughput {1:.0%} of baseline".format(
+                name, speed
+            ))
+        if memory > 1 + tolerance:
+            regressions.append("{0}: peak memory {1:.0%} of baseline".format(
+                name, memory
+            ))
+    return changes, regressions
+
+
+def report(results, changes):
+    for name, result in sorted(results["cases"].items()):
+        line = "{0:<40} {1:>10,.0f} {2}/s {3:>9.1f} us {4:>8.2f} MiB".format(
+            name, result["throughput"], result["unit"],
+            1e6 / result["throughput"], result["peak_bytes"] / 2 ** 20
+        )
+        if name in changes:
+            speed, memory = changes[name]
+            line += "  speed {0:+.0%}, peak {1:+.0%}".format(
+                speed - 1, memory - 1
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--orders", type=int, default=1000,
+                        help="orders per GetModifiedOrders response, from 1 "
+                             "to 1000000")
+    parser.add_argument("--events", type=int, default=3,
+                        help="modification events per order")
+    parser.add_argument("--ca-certs", type=int, default=2,
+                        help="CA certificates per order")
+    parser.add_argument("--sans", type=int, default=1000,
+                        help="SANs added by the large Reissue request")
+    parser.add_argument("--number", type=int, default=200,
+                        help="calls per timed run of single requests")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tree-limit", type=int, default=50000,
+                        help="largest response held in memory, in orders")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=GROUPS)
+    parser.add_argument("--output", help="file the results are written to")
+    parser.add_argument("--baseline", help="results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if not 1 <= args.orders <= 1000000:
+        parser.error("--orders must be between 1 and 1000000")
+
+    parameters = {
+        "orders": args.orders, "events": args.events,
+        "ca_certs": args.ca_certs, "sans": args.sans,
+        "tree_limit": args.tree_limit,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["parameters"] != parameters:
+            parser.error("the baseline was run with other parameters: "
+                         "{0}".format(baseline["parameters"]))
+
+    chunks = modified_orders_chunks(args)
+    cases = []
+    if "serialize" in args.only:
+        cases.extend(serialize_cases(args))
+    if "parse" in args.only:
+        cases.extend(parse_cases(args, chunks))
+    if "end_to_end" in args.only:
+        cases.extend(end_to_end_cases(args, chunks))
+
+    print("{0} orders, {1} events and {2} CA certificates per order, "
+          "best of {3}".format(args.orders, args.events, args.ca_certs,
+                               args.repeat))
+    results = {
+        "parameters": parameters,
+        "python": platform.python_version(),
+        "cases": dict((case.name, case.run(args.repeat)) for case in cases),
+    }
+
+    changes, regressions = {}, []
+    if baseline is not None:
+        changes, regressions = compare(results, baseline, args.tolerance)
+    report(results, changes)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if regressions:
+        print("\nRegressions beyond {0:.0%}:".format(args.tolerance))
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
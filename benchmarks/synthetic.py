@@ -0,0 +1,349 @@
+"""Synthetic Symantec responses used by the benchmarks.
+
+The generated orders follow the layout of the GetModifiedOrders and
+GetOrderByPartnerOrderID responses returned by Symantec, with every section
+the response models read, so that parsing cost scales like it does on real
+data. The number of modification events and CA certificates of each order
+can be set, and large GetModifiedOrders responses can be generated in chunks
+through SyntheticStream rather than held in memory. QuickOrder and Reissue
+responses are also generated, for the order requests.
+"""
+from __future__ import absolute_import, division, print_function
+
+import random
+
+ENVELOPE_START = (
+    '<env:Envelope xmlns:env="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<env:Header/><env:Body>'
+    '<m:GetModifiedOrdersResponse '
+    'xmlns:m="http://api.geotrust.com/webtrust/query">'
+    '<m:GetModifiedOrdersResult>'
+    '<m:QueryResponseHeader>'
+    '<m:SuccessCode>0</m:SuccessCode>'
+    '<m:Timestamp>2015-01-29T20:42:05.447+00:00</m:Timestamp>'
+    '<m:ReturnCount>{count}</m:ReturnCount>'
+    '</m:QueryResponseHeader>'
+    '<m:OrderDetails>'
+)
+
+ENVELOPE_END = (
+    '</m:OrderDetails>'
+    '</m:GetModifiedOrdersResult>'
+    '</m:GetModifiedOrdersResponse>'
+    '</env:Body></env:Envelope>'
+)
+
+ORDER_BY_PARTNER_ORDER_ID = (
+    '<env:Envelope xmlns:env="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<env:Header/><env:Body>'
+    '<m:GetOrderByPartnerOrderIDResponse '
+    'xmlns:m="http://api.geotrust.com/webtrust/query">'
+    '<m:GetOrderByPartnerOrderIDResult>'
+    '<m:QueryResponseHeader>'
+    '<m:SuccessCode>0</m:SuccessCode>'
+    '<m:Timestamp>2015-01-29T20:42:05.447+00:00</m:Timestamp>'
+    '<m:ReturnCount>1</m:ReturnCount>'
+    '</m:QueryResponseHeader>'
+    '{order}'
+    '</m:GetOrderByPartnerOrderIDResult>'
+    '</m:GetOrderByPartnerOrderIDResponse>'
+    '</env:Body></env:Envelope>'
+)
+
+ORDER_RESPONSE = (
+    '<env:Envelope xmlns:env="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<env:Header/><env:Body>'
+    '<m:{operation}Response xmlns:m="http://api.geotrust.com/webtrust/order">'
+    '<m:{operation}Result>'
+    '<m:OrderResponseHeader>'
+    '<m:PartnerOrderID>{partner_order_id}</m:PartnerOrderID>'
+    '<m:SuccessCode>0</m:SuccessCode>'
+    '<m:Timestamp>2015-01-29T20:42:05.447+00:00</m:Timestamp>'
+    '</m:OrderResponseHeader>'
+    '<m:GeoTrustOrderID>{geotrust_order_id}</m:GeoTrustOrderID>'
+    '</m:{operation}Result>'
+    '</m:{operation}Response>'
+    '</env:Body></env:Envelope>'
+)
+
+EVENT = (
+    '<m:ModificationEvent>'
+    '<m:ModificationEventID>{event_id}</m:ModificationEventID>'
+    '<m:ModificationEventName>{name}</m:ModificationEventName>'
+    '<m:ModificationTimestamp>{timestamp}</m:ModificationTimestamp>'
+    '</m:ModificationEvent>'
+)
+
+CONTACT = (
+    '<m:{kind}>'
+    '<m:FirstName>{first_name}</m:FirstName>'
+    '<m:LastName>{last_name}</m:LastName>'
+    '<m:Phone>2103122400</m:Phone>'
+    '<m:Email>{email}</m:Email>'
+    '<m:Title>Administrator</m:Title>'
+    '<m:OrganizationName>{organization}</m:OrganizationName>'
+    '<m:AddressLine1>1 Main Street</m:AddressLine1>'
+    '<m:City>San Antonio</m:City>'
+    '<m:Region>Texas</m:Region>'
+    '<m:PostalCode>78201</m:PostalCode>'
+    '<m:Country>US</m:Country>'
+    '</m:{kind}>'
+)
+
+CA_CERTIFICATE = (
+    '<m:CACertificate><m:Type>{kind}</m:Type>'
+    '<m:CACert>-----BEGIN CERTIFICATE-----\n{certificate}\n'
+    '-----END CERTIFICATE-----</m:CACert></m:CACertificate>'
+)
+
+ORDER = (
+    '<m:OrderDetail>'
+    '<m:ModificationEvents>{events}</m:ModificationEvents>'
+    '<m:OrderInfo>'
+    '<m:PartnerOrderID>{partner_order_id}</m:PartnerOrderID>'
+    '<m:GeoTrustOrderID>{geotrust_order_id}</m:GeoTrustOrderID>'
+    '<m:DomainName>{domain}</m:DomainName>'
+    '<m:OrderDate>2014-08-05T14:44:15+00:00</m:OrderDate>'
+    '<m:Price>35.0</m:Price>'
+    '<m:Method>RESELLER</m:Method>'
+    '<m:OrderStatusMajor>{status_major}</m:OrderStatusMajor>'
+    '<m:ValidityPeriod>12</m:ValidityPeriod>'
+    '<m:ServerCount>1</m:ServerCount>'
+    '<m:RenewalInd>Y</m:RenewalInd>'
+    '<m:ProductCode>QUICKSSLPREMIUM</m:ProductCode>'
+    '<m:OrderState>WF_DOMAIN_APPROVAL</m:OrderState>'
+    '<m:VulnerabilityScanInfo>'
+    '<m:ServiceStatus>INACTIVE</m:ServiceStatus>'
+    '<m:OnDemandScanInProgress>false</m:OnDemandScanInProgress>'
+    '</m:VulnerabilityScanInfo>'
+    '</m:OrderInfo>'
+    '{vulnerabilities}'
+    '<m:QuickOrderDetail>'
+    '<m:OrderStatusMinor>'
+    '<m:OrderStatusMinorCode>{status_code}</m:OrderStatusMinorCode>'
+    '<m:OrderStatusMinorName>{status_name}</m:OrderStatusMinorName>'
+    '</m:OrderStatusMinor>'
+    '<m:OrganizationInfo>'
+    '<m:OrganizationName>{organization}</m:OrganizationName>'
+    '<m:OrganizationAddress>'
+    '<m:City>San Antonio</m:City>'
+    '<m:Region>Texas</m:Region>'
+    '<m:Country>US</m:Country>'
+    '</m:OrganizationAddress>'
+    '</m:OrganizationInfo>'
+    '<m:ApproverNotifiedDate>2014-08-05T14:44:15+00:00'
+    '</m:ApproverNotifiedDate>'
+    '<m:ApproverEmailAddress>admin@{domain}</m:ApproverEmailAddress>'
+    '</m:QuickOrderDetail>'
+    '<m:OrderContacts>{contacts}</m:OrderContacts>'
+    '<m:Fulfillment>'
+    '<m:CACertificates>{ca_certificates}</m:CACertificates>'
+    '<m:ServerCertificate>-----BEGIN CERTIFICATE-----\n{certificate}\n'
+    '-----END CERTIFICATE-----</m:ServerCertificate>'
+    '</m:Fulfillment>'
+    '<m:AuthenticationComments/>'
+    '<m:AuthenticationStatuses/>'
+    '</m:OrderDetail>'
+)
+
+STATUSES = [
+    ('ORDER_WAITING_FOR_APPROVAL', 'Order Waiting For Approval', 'PENDING'),
+    ('ORDER_COMPLETE', 'Order Complete', 'COMPLETE'),
+    ('ORDER_CANCELLED', 'Order Cancelled', 'CANCELLED'),
+]
+
+EVENT_NAMES = ['Order Created', 'Order Approved', 'Certificate Issued']
+
+ORGANIZATIONS = ['MyOrg', 'Example Inc', 'Acme Corp', 'Initech']
+
+
+def order_detail(index, rng, events=None, ca_certs=2):
+    """Builds the XML of a single synthetic OrderDetail.
+
+    :param index: position of the order, used to derive unique IDs
+    :param rng: random.Random instance
+    :param events: number of modification events of the order, between 1
+    and 3 at random by default
+    :param ca_certs: number of CA certificates of the order, the last one
+    being the root
+    :return: OrderDetail XML text
+    """
+    domain = "www{0}.example.com".format(index)
+    organization = rng.choice(ORGANIZATIONS)
+    status_code, status_name, status_major = rng.choice(STATUSES)
+    certificate = "A" * 64 * 20
+
+    if events is None:
+        events = rng.randint(1, len(EVENT_NAMES))
+    modification_events = "".join(
+        EVENT.format(
+            event_id=index * 10 + number,
+            name=EVENT_NAMES[number % len(EVENT_NAMES)],
+            timestamp="2014-08-05T1{0}:44:15+00:00".format(number % 10)
+        )
+        for number in range(events)
+    )
+
+    vulnerabilities = ""
+    if rng.random() < 0.2:
+        vulnerabilities = (
+            '<m:Vulnerabilities><m:Vulnerability>'
+            '<m:Severity>{0}</m:Severity>'
+            '<m:NumberFound>{1}</m:NumberFound>'
+            '</m:Vulnerability></m:Vulnerabilities>'
+        ).format(rng.randint(1, 5), rng.randint(1, 10))
+
+    contacts = "".join(
+        CONTACT.format(
+            kind=kind, first_name="First{0}".format(index),
+            last_name="Last{0}".format(index),
+            email="contact{0}@{1}".format(index, domain),
+            organization=organization
+        )
+        for kind in ('AdminContact', 'TechContact', 'BillingContact')
+    )
+
+    ca_certificates = "".join(
+        CA_CERTIFICATE.format(
+            kind="ROOT" if number == ca_certs - 1 else "INTERMEDIATE",
+            certificate=certificate
+        )
+        for number in range(ca_certs)
+    )
+
+    return ORDER.format(
+        events=modification_events,
+        partner_order_id=partner_order_id(index),
+        geotrust_order_id=geotrust_order_id(index), domain=domain,
+        status_major=status_major, vulnerabilities=vulnerabilities,
+        status_code=status_code, status_name=status_name,
+        organization=organization, contacts=contacts,
+        ca_certificates=ca_certificates, certificate=certificate
+    )
+
+
+def partner_order_id(index):
+    """Returns the partner order ID of the synthetic order at index."""
+    return "PO-{0:08d}".format(index)
+
+
+def geotrust_order_id(index):
+    """Returns the GeoTrust order ID of the synthetic order at index."""
+    return 1800000 + index
+
+
+def iter_modified_orders_response(count, seed=0, events=None, ca_certs=2,
+                                  batch=100):
+    """Generates a synthetic GetModifiedOrders response in chunks.
+
+    :param count: number of orders in the response
+    :param seed: seed of the random generator, so runs are comparable
+    :param events: number of modification events of each order, see
+    order_detail
+    :param ca_certs: number of CA certificates of each order
+    :param batch: number of orders per chunk
+    :return: generator of bytes chunks
+    """
+    rng = random.Random(seed)
+    yield ENVELOPE_START.format(count=count).encode("utf-8")
+    for start in range(0, count, batch):
+        yield "".join(
+            order_detail(index, rng, events, ca_certs)
+            for index in range(start, min(start + batch, count))
+        ).encode("utf-8")
+    yield ENVELOPE_END.encode("utf-8")
+
+
+def modified_orders_response(count, seed=0, events=None, ca_certs=2):
+    """Builds a synthetic GetModifiedOrders response.
+
+    :param count: number of orders in the response
+    :param seed: seed of the random generator, so runs are comparable
+    :param events: number of modification events of each order, see
+    order_detail
+    :param ca_certs: number of CA certificates of each order
+    :return: response body as bytes
+    """
+    return b"".join(
+        iter_modified_orders_response(count, seed, events, ca_certs)
+    )
+
+
+def order_by_partner_order_id_response(index=0, seed=0, events=None,
+                                       ca_certs=2):
+    """Builds a synthetic GetOrderByPartnerOrderID response.
+
+    :param index: position of the order, see partner_order_id
+    :param seed: seed of the random generator, so runs are comparable
+    :param events: number of modification events of the order
+    :param ca_certs: number of CA certificates of the order
+    :return: response body as bytes
+    """
+    order = order_detail(index, random.Random(seed), events, ca_certs)
+    return ORDER_BY_PARTNER_ORDER_ID.format(order=order).encode("utf-8")
+
+
+def quick_order_response(index=0):
+    """Builds a synthetic QuickOrder response.
+
+    :param index: position of the order, see partner_order_id
+    :return: response body as bytes
+    """
+    return ORDER_RESPONSE.format(
+        operation="QuickOrder", partner_order_id=partner_order_id(index),
+        geotrust_order_id=geotrust_order_id(index)
+    ).encode("utf-8")
+
+
+def reissue_response(index=0):
+    """Builds a synthetic Reissue response.
+
+    :param index: position of the order, see partner_order_id
+    :return: response body as bytes
+    """
+    return ORDER_RESPONSE.format(
+        operation="Reissue", partner_order_id=partner_order_id(index),
+        geotrust_order_id=geotrust_order_id(index)
+    ).encode("utf-8")
+
+
+class SyntheticStream(object):
+    """Read-only file-like object over generated response chunks.
+
+    Lets lxml.etree.iterparse, and requests responses, read responses too
+    large to be held in memory, such as a million orders.
+
+    :param chunks: iterable of bytes, see iter_modified_orders_response
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = b""
+        self._offset = 0
+        self.size = 0
+
+    def read(self, size=-1):
+        parts = []
+        wanted = size
+        while wanted != 0:
+            if self._offset == len(self._chunk):
+                self._chunk = next(self._chunks, None)
+                self._offset = 0
+                if self._chunk is None:
+                    self._chunk = b""
+                    break
+            end = len(self._chunk)
+            if wanted > 0:
+                end = min(end, self._offset + wanted)
+                wanted -= end - self._offset
+            parts.append(self._chunk[self._offset:end])
+            self._offset = end
+
+        data = b"".join(parts)
+        self.size += len(data)
+        return data
+
+    def close(self):
+        self._chunks = iter(())
+        self._chunk = b""
+        self._offset = 0
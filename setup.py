@@ -50,11 +50,17 @@ setuptools.setup(
 
     install_requires=[
         "enum34",
+        "futures; python_version < '3.2'",
         "lxml",
         "requests",
         "requests-toolbelt",
         "six",
     ],
 
+    extras_require={
+        "async": ["aiohttp"],
+        "prometheus": ["prometheus_client"],
+    },
+
     packages=setuptools.find_packages(exclude=["tests", "tests.*"]),
 )
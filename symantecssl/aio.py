@@ -0,0 +1,295 @@
+"""Asyncio client for Symantec's SOAPXML API.
+
+Requires Python 3.5+ and aiohttp, which can be installed with the ``async``
+extra: ``pip install symantecssl[async]``. This module uses the async and
+await syntax, so it can not be imported on older versions of Python.
+"""
+from __future__ import absolute_import, division, print_function
+import asyncio
+import functools
+import time
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+    _CONNECTION_ERRORS = (asyncio.TimeoutError,)
+else:
+    _CONNECTION_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+from symantecssl.instrumentation import SEND, SERIALIZE, start_metrics
+from symantecssl.order import (
+    FailedRequest, is_throttled, parse_response, serialize_request
+)
+
+
+def _set_released(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _wake(loop, future):
+    """Wakes a request waiting in AsyncSymantecClient._acquire.
+
+    Called by Governor.release, possibly from another thread.
+    """
+    try:
+        loop.call_soon_threadsafe(_set_released, future)
+    except RuntimeError:
+        # The event loop was closed while the request was waiting.
+        pass
+
+
+class AsyncResponse(object):
+    """Response returned by the asyncio client.
+
+    Mirrors the attributes of the requests Response returned by post_request
+    that callers rely on.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.model = None
+
+
+class AsyncSymantecClient(object):
+    """Asyncio counterpart of SymantecClient.
+
+    Connections are pooled by an aiohttp connector and the number of requests
+    in flight is bounded by a semaphore, so a single event loop can keep
+    hundreds of queries outstanding without exhausting sockets.
+
+    :param max_concurrency: maximum number of requests in flight
+    :param pool_maxsize: maximum number of pooled connections per endpoint
+    :param timeout: optional total timeout in seconds for a single request
+    :param session: optional preconfigured aiohttp ClientSession to use
+    :param retry: optional RetryPolicy. Without one, every request is only
+    attempted once.
+    :param throttle: optional ThrottleRegistry pacing requests per partner
+    code, which may be shared with synchronous clients
+    :param parser: optional lxml XMLParser used to parse responses, the
+    parser of the event loop thread by default
+    :param pretty_print: if False, requests are sent compact rather than
+    indented
+    :param instrumentation: optional Instrumentation receiving the time
+    spent in each phase of the requests posted, see
+    symantecssl.instrumentation. The CPU time of the send phase is not
+    measured.
+    """
+
+    def __init__(self, max_concurrency=100, pool_maxsize=100, timeout=None,
+                 session=None, retry=None, throttle=None, parser=None,
+                 pretty_print=True, instrumentation=None):
+        if aiohttp is None and session is None:
+            raise ImportError(
+                "aiohttp is required for AsyncSymantecClient; install "
+                "symantecssl[async]"
+            )
+        self.max_concurrency = max_concurrency
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.retry = retry
+        self.throttle = throttle
+        self.parser = parser
+        self.pretty_print = pretty_print
+        self.instrumentation = instrumentation
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Closes the session and every pooled connection."""
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=0, limit_per_host=self.pool_maxsize
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._owns_session = True
+        return self._session
+
+    def _get_semaphore(self):
+        # Created on first use so that it belongs to the running event loop
+        # rather than to the one current when the client was constructed.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _acquire(self, governor):
+        """Waits until the governor lets a request start.
+
+        Waits for the next token of the rate limit, or for another request
+        to end when too many are in flight, without blocking the event loop.
+
+        :param governor: Governor of the partner account
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            released = loop.create_future()
+            delay = governor.try_acquire(
+                on_release=functools.partial(_wake, loop, released)
+            )
+            if delay == 0:
+                return
+            if delay is None:
+                await released
+            else:
+                await asyncio.sleep(delay)
+
+    async def _send_once(self, endpoint, request_model, serialized_xml):
+        headers = {'Content-Type': 'application/soap+xml'}
+        async with self._get_semaphore():
+            governor = None
+            if self.throttle is not None:
+                governor = self.throttle.get(
+                    request_model.request_header.partner_code
+                )
+                await self._acquire(governor)
+
+            # Started once the request is allowed out, so that time spent
+            # queued locally is not reported to the governor as latency.
+            sent = time.time()
+            failed = True
+            try:
+                session = self._get_session()
+                async with session.post(
+                    endpoint, data=serialized_xml, headers=headers
+                ) as http_response:
+                    content = await http_response.read()
+                    response = AsyncResponse(
+                        http_response.status, http_response.headers, content
+                    )
+                failed = is_throttled(response.status_code)
+            finally:
+                if governor is not None:
+                    governor.release(
+                        failed=failed, latency=time.time() - sent
+                    )
+
+        return response
+
+    async def _send(self, endpoint, request_model, serialized_xml):
+        """Posts a serialized request, retrying it according to the policy.
+
+        :param endpoint: Symantec endpoint to hit directly
+        :param request_model: request model instance being sent
+        :param serialized_xml: serialized request body
+        :return: response with a 200 status code
+        """
+        start = time.time()
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                response = await self._send_once(
+                    endpoint, request_model, serialized_xml
+                )
+            except _CONNECTION_ERRORS as error:
+                if self.retry is None:
+                    raise
+                response = None
+                status_code = None
+                connection_error = error
+            else:
+                # Symantec not expected to return 2xx range; only 200
+                if response.status_code == 200:
+                    return response
+                status_code = response.status_code
+
+            elapsed = time.time() - start
+            delay = None
+            if self.retry is not None:
+                delay = self.retry.next_delay(
+                    request_model, attempts, elapsed, status_code
+                )
+
+            if delay is None:
+                if response is None:
+                    raise FailedRequest(
+                        attempts=attempts, elapsed=elapsed
+                    ) from connection_error
+                raise FailedRequest(
+                    status_code=status_code, attempts=attempts,
+                    elapsed=elapsed, response=response
+                )
+
+            await asyncio.sleep(delay)
+
+    async def post(self, endpoint, request_model, credentials, lazy=False,
+                   pool=None):
+        """Create a post request against Symantec's SOAPXML API.
+
+        See symantecssl.order.post_request for details on the supported
+        request models and credentials.
+
+        :param endpoint: Symantec endpoint to hit directly
+        :param request_model: request model instance to initiate call type
+        :param credentials: Symantec specific credentials for orders.
+        :param lazy: whether to deserialize order details on attribute
+        access, see LazyOrderDetail
+        :param pool: optional StringPool deduplicating the field values of
+        order details
+        :return response: deserialized response from API
+        """
+        with start_metrics(
+                self.instrumentation, request_model, endpoint) as metrics:
+            with metrics.phase(SERIALIZE):
+                serialized_xml = serialize_request(
+                    request_model, credentials, self.pretty_print
+                )
+            metrics.record_request(serialized_xml)
+
+            # Other coroutines run while the response is awaited.
+            with metrics.phase(SEND, cpu=False):
+                response = await self._send(
+                    endpoint, request_model, serialized_xml
+                )
+            metrics.record_response(response)
+
+            response.model = parse_response(
+                request_model, response.status_code, response.content,
+                lazy=lazy, parser=self.parser, metrics=metrics, pool=pool
+            )
+
+            return response
+
+
+async def async_post_request(endpoint, request_model, credentials,
+                             client=None, lazy=False, pool=None):
+    """Create a post request against Symantec's SOAPXML API from asyncio.
+
+    :param endpoint: Symantec endpoint to hit directly
+    :param request_model: request model instance to initiate call type
+    :param credentials: Symantec specific credentials for orders.
+    :param client: optional AsyncSymantecClient to reuse. When omitted a
+    short lived client is created for this call only.
+    :param lazy: whether to deserialize order details on attribute access,
+    see LazyOrderDetail
+    :param pool: optional StringPool deduplicating the field values of order
+    details
+    :return response: deserialized response from API
+    """
+    if client is not None:
+        return await client.post(
+            endpoint, request_model, credentials, lazy=lazy, pool=pool
+        )
+
+    async with AsyncSymantecClient() as client:
+        return await client.post(
+            endpoint, request_model, credentials, lazy=lazy, pool=pool
+        )
@@ -0,0 +1,156 @@
+from __future__ import absolute_import, division, print_function
+import operator
+
+from concurrent import futures
+
+from symantecssl.order import get_default_client, serialize_request
+
+
+class OrderResult(object):
+    """Outcome of a single order of a batch.
+
+    :param index: position of the order in the batch
+    :param request_model: request model of the order
+    :param response: response of the order, whose model is the deserialized
+    response such as a QuickOrderResponse, or None if the order failed
+    :param error: exception raised while serializing or placing the order,
+    or None if it succeeded
+    """
+
+    def __init__(self, index, request_model, response=None, error=None):
+        self.index = index
+        self.request_model = request_model
+        self.response = response
+        self.error = error
+
+    @property
+    def succeeded(self):
+        return self.error is None
+
+    @property
+    def model(self):
+        """Returns the deserialized response, or None if the order failed."""
+        if self.response is None:
+            return None
+        return self.response.model
+
+
+class BatchResult(object):
+    """Results of a batch of orders, in the order the orders were given.
+
+    :param results: list of OrderResult sorted by index
+    """
+
+    def __init__(self, results):
+        self.results = results
+
+    def __len__(self):
+        return len(self.results)
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __getitem__(self, index):
+        return self.results[index]
+
+    @property
+    def succeeded(self):
+        return [result for result in self.results if result.succeeded]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.succeeded]
+
+    @property
+    def models(self):
+        """Returns the deserialized responses, None for failed orders."""
+        return [result.model for result in self.results]
+
+
+def iter_order_results(endpoint, orders, credentials, workers=8,
+                       client=None):
+    """Places orders concurrently and yields each result once it completes.
+
+    Every order is serialized before the first one is posted, then posted on
+    a pool of worker threads. Results are yielded in completion order, so
+    slow orders do not hold back the results of the others.
+
+    A failed order does not stop the batch: any exception raised while
+    serializing or placing an order is kept as the error of its result.
+    Orders not started yet are cancelled when the generator is closed.
+
+    note:: orders are not idempotent and are only retried when the client
+    has a RetryPolicy with retry_non_idempotent set.
+
+    :param endpoint: Symantec order endpoint
+    :param orders: iterable of order request models, such as
+    QuickOrderRequest instances
+    :param credentials: Symantec specific credentials, see post_request
+    :param workers: number of orders posted concurrently. The client should
+    pool at least as many connections.
+    :param client: optional SymantecClient, defaults to the shared client
+    :return: generator of OrderResult
+    """
+    client = client or get_default_client()
+
+    def place(result, serialized_xml):
+        try:
+            result.response = client.post_serialized(
+                endpoint, result.request_model, serialized_xml
+            )
+        except Exception as error:
+            result.error = error
+        return result
+
+    prepared = []
+    for index, request_model in enumerate(orders):
+        result = OrderResult(index, request_model)
+        try:
+            serialized_xml = serialize_request(
+                request_model, credentials, client.pretty_print,
+                client.stream_requests
+            )
+        except Exception as error:
+            result.error = error
+            yield result
+        else:
+            prepared.append((result, serialized_xml))
+
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = [
+            executor.submit(place, result, serialized_xml)
+            for result, serialized_xml in prepared
+        ]
+        try:
+            for future in futures.as_completed(pending):
+                yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def place_orders(endpoint, orders, credentials, workers=8, client=None,
+                 callback=None):
+    """Places a batch of orders concurrently.
+
+    See iter_order_results for how orders are placed.
+
+    :param endpoint: Symantec order endpoint
+    :param orders: iterable of order request models, such as
+    QuickOrderRequest instances
+    :param credentials: Symantec specific credentials, see post_request
+    :param workers: number of orders posted concurrently
+    :param client: optional SymantecClient, defaults to the shared client
+    :param callback: optional callable given each OrderResult as soon as it
+    completes
+    :return: BatchResult holding a result per order, in the given order
+    """
+    results = []
+    for result in iter_order_results(
+            endpoint, orders, credentials, workers, client):
+        if callback is not None:
+            callback(result)
+        results.append(result)
+
+    results.sort(key=operator.attrgetter('index'))
+    return BatchResult(results)
@@ -0,0 +1,327 @@
+from __future__ import absolute_import, division, print_function
+import collections
+import copy
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+
+from symantecssl.request_models import GetOrderByPartnerOrderID
+
+
+def cache_tag(partner_code, partner_order_id):
+    """Builds the tag grouping the cached responses of an order.
+
+    :param partner_code: partner code of the account the order belongs to
+    :param partner_order_id: partner order ID of the order
+    :return: tag given to ResponseCache.set and ResponseCache.invalidate
+    """
+    return '{0}:{1}'.format(partner_code, partner_order_id)
+
+
+def cache_key(request_model, lazy=False):
+    """Builds the cache key of a request.
+
+    Only query requests flagged as cacheable have a key. Order requests such
+    as QuickOrderRequest and Reissue are never cached.
+
+    The key is made of the request type, partner code, partner order ID, the
+    query option flags, the projection and whether the response is lazily
+    deserialized, so that responses are never shared between partner
+    accounts, query options, projections or response models.
+
+    :param request_model: request model instance with credentials set
+    :param lazy: whether the response is deserialized with LazyOrderDetail
+    :return: cache key or None if the request must not be cached
+    """
+    if not getattr(request_model, 'cacheable', False):
+        return None
+
+    # Flags are keyed by the text they are serialized to.
+    flags = ','.join(
+        '{0}={1}'.format(name, str(value).lower())
+        for name, value in sorted(vars(request_model.query_options).items())
+    )
+    digest = hashlib.sha1(flags.encode('utf-8'))
+    projection = getattr(request_model, 'projection', None)
+    if projection is not None:
+        # Keyed by the normalized paths, whatever order they were given in.
+        paths = sorted('.'.join(path) for path in projection.paths)
+        digest.update(','.join(paths).encode('utf-8'))
+
+    return '{0}:{1}:{2}:{3}:{4:d}'.format(
+        type(request_model).__name__,
+        request_model.request_header.partner_code,
+        request_model.partner_order_id,
+        digest.hexdigest(),
+        bool(lazy)
+    )
+
+
+class ResponseCache(object):
+    """In-memory LRU cache with TTL expiry for query responses.
+
+    When a path is given, entries are also written to an SQLite database so
+    that several processes can share cached responses.
+
+    :param maxsize: maximum number of entries kept in memory
+    :param ttl: time to live of an entry, in seconds
+    :param path: optional location of the shared SQLite database
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = collections.OrderedDict()
+        self._tags = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        self._connection = None
+
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            with self._connection:
+                self._connection.execute(
+                    'CREATE TABLE IF NOT EXISTS responses ('
+                    'key TEXT PRIMARY KEY, tag TEXT, expires REAL, '
+                    'value BLOB)'
+                )
+                self._connection.execute(
+                    'CREATE INDEX IF NOT EXISTS responses_tag '
+                    'ON responses (tag)'
+                )
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        """Returns the cache counters.
+
+        :return: dict of hits, misses, evictions and expirations
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+    def _load(self, key, now):
+        row = self._connection.execute(
+            'SELECT expires, value, tag FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[0] <= now:
+            return None
+
+        return row[0], pickle.loads(bytes(row[1])), row[2]
+
+    def _store(self, key, expires, value, tag):
+        # Callers pop the key first so that it is re-inserted as the most
+        # recently used entry.
+        self._entries[key] = (expires, value, tag)
+        if tag is not None:
+            self._tags[tag].add(key)
+
+        while len(self._entries) > self.maxsize:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._untag(evicted_key, evicted[2])
+            self.evictions += 1
+
+    def _untag(self, key, tag):
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    def get(self, key):
+        """Returns a copy of a cached value.
+
+        Callers are free to modify the value returned, the cached one is left
+        untouched.
+
+        :param key: cache key, see cache_key
+        :return: cached value or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] <= now:
+                self._untag(key, entry[2])
+                self.expirations += 1
+                entry = None
+
+            if entry is None and self._connection is not None:
+                entry = self._load(key, now)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._store(key, *entry)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, key, value, tag=None):
+        """Caches a value for the configured time to live.
+
+        :param key: cache key, see cache_key
+        :param value: picklable value to cache
+        :param tag: optional tag, see cache_tag, grouping entries that are
+        invalidated together
+        """
+        expires = time.time() + self.ttl
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._untag(key, previous[2])
+            self._store(key, expires, value, tag)
+
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute(
+                        'INSERT OR REPLACE INTO responses '
+                        'VALUES (?, ?, ?, ?)',
+                        (key, tag, expires, sqlite3.Binary(
+                            pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                        ))
+                    )
+
+    def invalidate(self, tag, is_stale=None):
+        """Evicts the entries carrying a tag.
+
+        :param tag: tag given when the entries were cached
+        :param is_stale: optional callable receiving a cached value and
+        returning whether it must be evicted. Every entry is evicted when
+        omitted.
+        :return: number of entries evicted
+        """
+        evicted = set()
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                if is_stale is None or is_stale(self._entries[key][1]):
+                    del self._entries[key]
+                    self._untag(key, tag)
+                    evicted.add(key)
+
+            if self._connection is not None:
+                # Entries shared through the database may not be in memory.
+                rows = self._connection.execute(
+                    'SELECT key, value FROM responses WHERE tag = ?', (tag,)
+                ).fetchall()
+                if is_stale is not None:
+                    rows = [
+                        (key, value) for key, value in rows
+                        if is_stale(pickle.loads(bytes(value)))
+                    ]
+                stale_keys = [key for key, _ in rows]
+                with self._connection:
+                    self._connection.executemany(
+                        'DELETE FROM responses WHERE key = ?',
+                        [(key,) for key in stale_keys]
+                    )
+                evicted.update(stale_keys)
+
+        return len(evicted)
+
+    def clear(self):
+        """Removes every entry, including the shared ones."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute('DELETE FROM responses')
+
+
+class CacheInvalidator(object):
+    """Evicts or refreshes cached orders from the modified orders feed.
+
+    Order details returned by GetModifiedOrders, for instance through
+    IncrementalSync, are compared with the cached GetOrderByPartnerOrderID
+    responses. Only cached orders missing one of the modification events of
+    the feed are evicted, which makes long time to live values safe.
+
+    When refresh is enabled, evicted orders are retrieved again right away
+    through the client, which caches the new response.
+
+    :param cache: ResponseCache used by the client
+    :param refresh: whether to retrieve evicted orders again
+    :param endpoint: Symantec query endpoint, required to refresh
+    :param credentials: Symantec specific credentials, required to refresh
+    :param query_options: optional OrderQueryOptions used to refresh
+    :param client: SymantecClient using the cache, required to refresh
+    :param partner_code: partner code of the account the feed belongs to,
+    taken from the credentials when omitted
+    """
+
+    def __init__(self, cache, refresh=False, endpoint=None, credentials=None,
+                 query_options=None, client=None, partner_code=None):
+        if partner_code is None:
+            if credentials is None:
+                raise ValueError(
+                    'Either partner_code or credentials must be given'
+                )
+            partner_code = credentials['partner_code']
+
+        self.cache = cache
+        self.partner_code = partner_code
+        self.refresh = refresh
+        self.endpoint = endpoint
+        self.credentials = credentials
+        self.query_options = query_options
+        self.client = client
+
+    @staticmethod
+    def _stale_check(detail):
+        event_ids = set(event.mod_id for event in detail.modified_events)
+
+        def is_stale(value):
+            _, model = value
+            if not event_ids:
+                return True
+            cached_ids = set(event.mod_id for event in model.modified_events)
+            return not event_ids.issubset(cached_ids)
+
+        return is_stale
+
+    def _refresh(self, partner_order_id):
+        request_model = GetOrderByPartnerOrderID()
+        request_model.set_partner_order_id(partner_order_id)
+        if self.query_options is not None:
+            request_model.query_options = self.query_options
+
+        self.client.post(self.endpoint, request_model, self.credentials)
+
+    def consume(self, order_details):
+        """Invalidates the cached orders changed in the given order details.
+
+        :param order_details: iterable of OrderDetail, such as OrderDetails
+        :return: list of partner order IDs evicted from the cache
+        """
+        changed = []
+        for detail in order_details:
+            partner_order_id = detail.partner_order_id
+            if partner_order_id in ('', 'None'):
+                continue
+
+            evicted = self.cache.invalidate(
+                cache_tag(self.partner_code, partner_order_id),
+                self._stale_check(detail)
+            )
+            if evicted:
+                changed.append(partner_order_id)
+                if self.refresh:
+                    self._refresh(partner_order_id)
+
+        return changed
@@ -0,0 +1,422 @@
+from __future__ import absolute_import, division, print_function
+import array
+import collections
+import csv
+
+from symantecssl.response_models import (
+    _FIELD_ALIASES, _ORDER_DETAIL_SCOPE, _ORDER_DETAILS, _SKIP, _Section
+)
+
+
+class _Layout(object):
+    """Columns and handler table derived from an order detail _Scope.
+
+    Fields are flattened into columns named by their attribute path, such as
+    organization_contacts.admin.email. Repeated sections, such as
+    modified_events, get their own columns, one value per item, and are
+    listed in sections.
+
+    :param scope: _Scope of the order detail children
+    """
+
+    def __init__(self, scope):
+        self.columns = []
+        self.sections = []
+        self.table, direct = _table(scope, (), self.columns, self.sections)
+        self.template = _template(len(self.columns), direct)
+
+
+class _RepeatedSection(object):
+    """Handler of an item of a repeated section, such as ModificationEvent.
+
+    :param index: position of the section in _Layout.sections
+    :param name: attribute path of the section, such as modified_events
+    :param columns: names of the item columns, prefixed with name
+    :param table: handler table of the item children
+    :param template: values of a new item row
+    """
+
+    def __init__(self, index, name, columns, table, template):
+        self.index = index
+        self.name = name
+        self.columns = columns
+        self.table = table
+        self.template = template
+
+
+class _Group(object):
+    """Handler of an element describing a model, such as OrganizationInfo.
+
+    :param table: handler table of the element children
+    :param reset: indexes of the columns set to "None" when the model is
+    found, as OrderDetail does when it creates the model
+    """
+
+    def __init__(self, table, reset):
+        self.table = table
+        self.reset = reset
+
+
+def _template(width, direct):
+    row = [''] * width
+    for index in direct:
+        row[index] = "None"
+    return row
+
+
+def _table(scope, prefix, columns, sections):
+    """Converts a _Scope into a handler table filling rows of columns.
+
+    Handlers are either the index of the column set to the element text, a
+    nested table for wrapper elements, a _Group, a _RepeatedSection or _SKIP.
+
+    :param scope: _Scope to convert
+    :param prefix: attribute path of the scope model
+    :param columns: list of column names, extended with the scope fields
+    :param sections: list of _RepeatedSection, extended with the repeated
+    sections of the scope
+    :return: handler table and indexes of the columns set to "None" when the
+    scope model is created
+    """
+    table = {}
+    direct = []
+    for tag, handler in scope.items():
+        if handler is _SKIP:
+            table[tag] = _SKIP
+        elif not isinstance(handler, _Section):
+            direct.append(len(columns))
+            table[tag] = len(columns)
+            columns.append('.'.join(prefix + (handler,)))
+        elif handler.cls is None:
+            table[tag], wrapped = _table(
+                handler.scope, prefix, columns, sections
+            )
+            direct.extend(wrapped)
+        elif handler.attribute is None:
+            item_columns = []
+            item_table, item_direct = _table(
+                handler.scope, prefix, item_columns, sections
+            )
+            section = _RepeatedSection(
+                len(sections), '.'.join(prefix), item_columns, item_table,
+                _template(len(item_columns), item_direct)
+            )
+            sections.append(section)
+            table[tag] = section
+        else:
+            table[tag] = _Group(*_table(
+                handler.scope, prefix + (handler.attribute,), columns,
+                sections
+            ))
+    return table, direct
+
+
+def _fill(xml_node, row, items, table, pool=None):
+    """Deserializes an order detail subtree into rows in a single pass.
+
+    Mirrors response_models._walk, setting columns of a row instead of model
+    attributes.
+
+    :param xml_node: XML node to be parsed
+    :param row: list of the order column values
+    :param items: list of item rows per repeated section
+    :param table: handler table of the node children
+    :param pool: optional StringPool deduplicating the field values
+    """
+    stack = [(xml_node, row, table)]
+    while stack:
+        xml_node, row, table = stack.pop()
+        for child in xml_node:
+            handler = table.get(child.tag)
+            if handler is None:
+                if len(child):
+                    stack.append((child, row, table))
+            elif handler is _SKIP:
+                continue
+            elif handler.__class__ is int:
+                if pool is None:
+                    row[handler] = child.text
+                else:
+                    row[handler] = pool(child.text)
+            elif handler.__class__ is dict:
+                stack.append((child, row, handler))
+            elif handler.__class__ is _Group:
+                for index in handler.reset:
+                    row[index] = "None"
+                stack.append((child, row, handler.table))
+            else:
+                item = list(handler.template)
+                items[handler.index].append(item)
+                stack.append((child, item, handler.table))
+
+
+def _column_name(name):
+    head, _, tail = name.partition('.')
+    if head in _FIELD_ALIASES:
+        name = _FIELD_ALIASES[head] + (('.' + tail) if tail else '')
+    return name
+
+
+_DEFAULT_LAYOUT = _Layout(_ORDER_DETAIL_SCOPE)
+
+
+class OrderDetailColumns(object):
+    """Columnar result of GetModifiedOrders and GetOrderByPartnerOrderID.
+
+    Holds one list per order detail field instead of one OrderDetail per
+    order, which is much cheaper to build, filter, sort and aggregate for
+    large sync windows. Columns are named by attribute path, as accepted by
+    Projection: status_code, organization_info.name or
+    organization_contacts.admin.email. Field values are the ones
+    OrderDetail.deserialize would set.
+
+    Repeated sections, modified_events and vulnerabilities, have one column
+    per item field, such as modified_events.event_name, and an offsets array:
+    the items of order i are at offsets[i]:offsets[i + 1] of the section
+    columns.
+
+    :param projection: optional Projection of the fields to deserialize,
+    only these fields get a column
+    :param pool: optional StringPool deduplicating the field values
+    """
+
+    def __init__(self, projection=None, pool=None):
+        if projection is None:
+            layout = _DEFAULT_LAYOUT
+        else:
+            layout = _Layout(projection.scope)
+        self.pool = pool
+        self._init(layout)
+
+    def _init(self, layout):
+        self._layout = layout
+        self._size = 0
+        self._order_columns = [[] for _ in layout.columns]
+        self._item_columns = [
+            [[] for _ in section.columns] for section in layout.sections
+        ]
+        self._section_names = {}
+        self.columns = collections.OrderedDict(
+            zip(layout.columns, self._order_columns)
+        )
+        self.offsets = collections.OrderedDict()
+        for section, columns in zip(layout.sections, self._item_columns):
+            self.offsets[section.name] = array.array('l', [0])
+            for name, column in zip(section.columns, columns):
+                self.columns[name] = column
+                self._section_names[name] = section.name
+
+    def _empty(self):
+        columns = object.__new__(type(self))
+        columns.pool = self.pool
+        columns._init(self._layout)
+        return columns
+
+    @classmethod
+    def deserialize(cls, xml_node, projection=None, pool=None):
+        """Deserializes every order detail of a response into columns.
+
+        :param xml_node: XML node to be parsed, such as a GetModifiedOrders
+        response
+        :param projection: optional Projection of the fields to deserialize
+        :param pool: optional StringPool deduplicating the field values
+        :return: OrderDetailColumns
+        """
+        columns = cls(projection, pool)
+        columns.extend(_ORDER_DETAILS.findall(xml_node))
+        return columns
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        """Returns a column by attribute path.
+
+        :param name: attribute path, such as status_code or
+        contacts.admin.email
+        :return: list of values
+        """
+        return self.columns[_column_name(name)]
+
+    def append(self, xml_node):
+        """Deserializes an order detail into a new row.
+
+        :param xml_node: Order Detail XML node
+        """
+        layout = self._layout
+        row = list(layout.template)
+        items = [[] for _ in layout.sections]
+        _fill(xml_node, row, items, layout.table, self.pool)
+
+        for column, value in zip(self._order_columns, row):
+            column.append(value)
+        for section, columns, section_items in zip(
+                layout.sections, self._item_columns, items):
+            offsets = self.offsets[section.name]
+            offsets.append(offsets[-1] + len(section_items))
+            for item in section_items:
+                for column, value in zip(columns, item):
+                    column.append(value)
+        self._size += 1
+
+    def extend(self, xml_nodes):
+        """Deserializes order details into new rows.
+
+        :param xml_nodes: iterable of Order Detail XML nodes
+        """
+        for xml_node in xml_nodes:
+            self.append(xml_node)
+
+    def _order_column(self, name):
+        name = _column_name(name)
+        if name in self._section_names:
+            raise ValueError("Not an order column: %s" % name)
+        return self.columns[name]
+
+    def counts(self, section):
+        """Returns the number of items of each order in a repeated section.
+
+        :param section: repeated section, such as modified_events
+        :return: list of counts
+        """
+        offsets = self.offsets[section]
+        return [offsets[i + 1] - offsets[i] for i in range(self._size)]
+
+    def parents(self, section):
+        """Returns the index of the order of each item of a repeated section.
+
+        :param section: repeated section, such as modified_events
+        :return: list of order indexes, aligned with the section columns
+        """
+        parents = []
+        for index, count in enumerate(self.counts(section)):
+            parents.extend([index] * count)
+        return parents
+
+    def mask(self, name, predicate):
+        """Evaluates a predicate over a column.
+
+        For columns of a repeated section, an order matches when any of its
+        items does.
+
+        :param name: column name
+        :param predicate: callable taking a value and returning a boolean
+        :return: list of booleans, one per order
+        """
+        name = _column_name(name)
+        matches = [bool(predicate(value)) for value in self.columns[name]]
+        section = self._section_names.get(name)
+        if section is None:
+            return matches
+
+        offsets = self.offsets[section]
+        return [
+            any(matches[offsets[i]:offsets[i + 1]]) for i in range(self._size)
+        ]
+
+    def take(self, indexes):
+        """Selects orders by index.
+
+        :param indexes: iterable of order indexes
+        :return: OrderDetailColumns holding the selected orders in order
+        """
+        indexes = list(indexes)
+        columns = self._empty()
+        for source, target in zip(self._order_columns,
+                                  columns._order_columns):
+            target.extend([source[i] for i in indexes])
+
+        for section, sources, targets in zip(
+                self._layout.sections, self._item_columns,
+                columns._item_columns):
+            offsets = self.offsets[section.name]
+            spans = [(offsets[i], offsets[i + 1]) for i in indexes]
+            for source, target in zip(sources, targets):
+                for start, end in spans:
+                    target.extend(source[start:end])
+            target_offsets = columns.offsets[section.name]
+            for start, end in spans:
+                target_offsets.append(target_offsets[-1] + end - start)
+
+        columns._size = len(indexes)
+        return columns
+
+    def compress(self, mask):
+        """Selects the orders where a mask is true.
+
+        :param mask: iterable of booleans, one per order, see mask
+        :return: OrderDetailColumns holding the selected orders
+        """
+        return self.take(
+            index for index, selected in enumerate(mask) if selected
+        )
+
+    def sort_by(self, name, reverse=False):
+        """Sorts orders by the values of an order column.
+
+        :param name: column name
+        :param reverse: whether to sort in descending order
+        :return: sorted OrderDetailColumns
+        """
+        column = self._order_column(name)
+        return self.take(sorted(
+            range(self._size), key=column.__getitem__, reverse=reverse
+        ))
+
+    def group_by(self, name):
+        """Groups orders by the values of an order column.
+
+        :param name: column name
+        :return: OrderedDict of OrderDetailColumns by value, in order of
+        first appearance
+        """
+        groups = collections.OrderedDict()
+        for index, value in enumerate(self._order_column(name)):
+            groups.setdefault(value, []).append(index)
+        return collections.OrderedDict(
+            (value, self.take(indexes)) for value, indexes in groups.items()
+        )
+
+    def to_dict(self, section=None):
+        """Exports columns as a dict of lists.
+
+        The result can be given as is to pandas.DataFrame.
+
+        :param section: optional repeated section to export instead of the
+        order columns. Its items also get an order column holding the index
+        of their order.
+        :return: dict of lists by column name
+        """
+        if section is None:
+            return collections.OrderedDict(
+                (name, list(column))
+                for name, column in zip(self._layout.columns,
+                                        self._order_columns)
+            )
+
+        result = collections.OrderedDict([('order', self.parents(section))])
+        for name, column in self.columns.items():
+            if self._section_names.get(name) == section:
+                result[name] = list(column)
+        return result
+
+    def rows(self, section=None):
+        """Exports columns as rows.
+
+        :param section: optional repeated section to export, see to_dict
+        :return: list of dicts by column name
+        """
+        columns = self.to_dict(section)
+        return [dict(zip(columns, values))
+                for values in zip(*columns.values())]
+
+    def to_csv(self, fileobj, section=None):
+        """Writes columns as CSV, with a header row.
+
+        :param fileobj: file-like object opened for writing text
+        :param section: optional repeated section to export, see to_dict
+        """
+        columns = self.to_dict(section)
+        writer = csv.writer(fileobj)
+        writer.writerow(list(columns))
+        writer.writerows(zip(*columns.values()))
@@ -0,0 +1,339 @@
+"""Per-phase measurements of the requests sent by the clients.
+
+A client given an Instrumentation measures the wall-clock and CPU time of
+each phase of every request it posts:
+
+* serialize: rendering the request envelope,
+* send: the network round trip, including retries,
+* parse: parsing the response body into an lxml tree,
+* deserialize: building the response models from the tree,
+
+along with the request and response sizes, request type and HTTP status
+code, then hands them to Instrumentation.record. Clients without
+instrumentation, the default, take no measurement. Errors raised by
+Instrumentation.record are logged and never replace the outcome of the
+request.
+
+CPU time is measured for the current thread. AsyncSymantecClient does not
+report the CPU time of the send phase: other coroutines run on the thread
+while the request awaits its response, so their work would be counted too.
+
+The Prometheus adapter requires prometheus_client, which can be installed
+with the ``prometheus`` extra: ``pip install symantecssl[prometheus]``.
+"""
+from __future__ import absolute_import, division, print_function
+import logging
+import time
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+SERIALIZE = 'serialize'
+SEND = 'send'
+PARSE = 'parse'
+DESERIALIZE = 'deserialize'
+PHASES = (SERIALIZE, SEND, PARSE, DESERIALIZE)
+
+_logger = logging.getLogger('symantecssl')
+
+_wall_clock = getattr(time, 'perf_counter', time.time)
+# CPU time of the current thread where available, of the process otherwise.
+_cpu_clock = getattr(time, 'thread_time', None)
+if _cpu_clock is None:  # pragma: no cover
+    _cpu_clock = getattr(time, 'process_time', None) or time.clock
+
+
+class _Phase(object):
+    """Context manager adding its duration to a phase of RequestMetrics.
+
+    :param metrics: RequestMetrics the duration is added to
+    :param name: phase name
+    :param cpu: whether to measure the CPU time of the phase as well
+    """
+
+    __slots__ = ('metrics', 'name', 'measure_cpu', 'wall', 'cpu')
+
+    def __init__(self, metrics, name, cpu=True):
+        self.metrics = metrics
+        self.name = name
+        self.measure_cpu = cpu
+
+    def __enter__(self):
+        self.wall = _wall_clock()
+        if self.measure_cpu:
+            self.cpu = _cpu_clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = _wall_clock() - self.wall
+        metrics = self.metrics
+        metrics.wall_times[self.name] = (
+            metrics.wall_times.get(self.name, 0) + wall
+        )
+        if self.measure_cpu:
+            cpu = _cpu_clock() - self.cpu
+            metrics.cpu_times[self.name] = (
+                metrics.cpu_times.get(self.name, 0) + cpu
+            )
+
+
+class RequestMetrics(object):
+    """Measurements of a single request.
+
+    Used as a context manager around the request: on exit, the error raised
+    if any is kept and the metrics are given to the instrumentation.
+
+    :param instrumentation: Instrumentation recording the metrics
+    :param request_type: name of the request model class, such as
+    GetModifiedOrderRequest
+    :param endpoint: Symantec endpoint the request is posted to
+    """
+
+    def __init__(self, instrumentation, request_type, endpoint):
+        self.instrumentation = instrumentation
+        self.request_type = request_type
+        self.endpoint = endpoint
+        self.wall_times = {}
+        self.cpu_times = {}
+        self.request_bytes = None
+        self.response_bytes = None
+        self.status_code = None
+        self.error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, error, traceback):
+        if error is not None:
+            self.error = error
+            if self.status_code is None:
+                self.status_code = getattr(error, 'status_code', None)
+        try:
+            self.instrumentation.record(self)
+        except Exception:
+            _logger.exception(
+                'Could not record the metrics of %s to %s',
+                self.request_type, self.endpoint
+            )
+
+    @property
+    def wall_time(self):
+        """Returns the wall-clock time of every phase, in seconds."""
+        return sum(self.wall_times.values())
+
+    @property
+    def cpu_time(self):
+        """Returns the CPU time of the phases it was measured for, in
+        seconds.
+        """
+        return sum(self.cpu_times.values())
+
+    def phase(self, name, cpu=True):
+        """Measures a phase of the request.
+
+        :param name: phase name, such as SERIALIZE
+        :param cpu: whether to measure the CPU time of the phase. Phases
+        awaiting in a coroutine would count the CPU time of other coroutines.
+        :return: context manager timing its block
+        """
+        return _Phase(self, name, cpu)
+
+    def record_request(self, serialized_xml):
+        """Records the size of the request body.
+
+        :param serialized_xml: serialized request body. The size of bodies
+        written while they are sent, see RequestBody, is unknown.
+        """
+        if isinstance(serialized_xml, bytes):
+            self.request_bytes = len(serialized_xml)
+
+    def record_response(self, response):
+        """Records the status code and size of the response.
+
+        :param response: response with its body read
+        """
+        self.status_code = response.status_code
+        if response.content is not None:
+            self.response_bytes = len(response.content)
+
+
+class _NullMetrics(object):
+    """Stands in for RequestMetrics when a client has no instrumentation.
+
+    Every method does nothing, so instrumented code paths cost a few no-op
+    calls and no measurement.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def phase(self, name, cpu=True):
+        return self
+
+    def record_request(self, serialized_xml):
+        pass
+
+    def record_response(self, response):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+class Instrumentation(object):
+    """Receives the metrics of every request posted by a client.
+
+    The base class ignores them, subclasses override record.
+    """
+
+    def start(self, request_model, endpoint):
+        """Starts measuring a request.
+
+        :param request_model: request model instance being posted
+        :param endpoint: Symantec endpoint the request is posted to
+        :return: RequestMetrics
+        """
+        return RequestMetrics(self, type(request_model).__name__, endpoint)
+
+    def record(self, metrics):
+        """Called once a request completed or failed.
+
+        :param metrics: RequestMetrics of the request
+        """
+
+
+def start_metrics(instrumentation, request_model, endpoint):
+    """Starts measuring a request, if instrumented.
+
+    :param instrumentation: Instrumentation, or None
+    :param request_model: request model instance being posted
+    :param endpoint: Symantec endpoint the request is posted to
+    :return: RequestMetrics, or NULL_METRICS without instrumentation
+    """
+    if instrumentation is None:
+        return NULL_METRICS
+    return instrumentation.start(request_model, endpoint)
+
+
+class LoggingInstrumentation(Instrumentation):
+    """Logs a line per request with the time spent in each phase.
+
+    The RequestMetrics are also attached to each record as its metrics
+    attribute, for handlers formatting them differently.
+
+    :param logger: optional logging.Logger, the symantecssl logger by default
+    :param level: level of the lines of successful requests. Failed requests
+    are logged at WARNING.
+    """
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger or logging.getLogger('symantecssl')
+        self.level = level
+
+    def record(self, metrics):
+        level = self.level if metrics.error is None else logging.WARNING
+        if not self.logger.isEnabledFor(level):
+            return
+
+        phases = ', '.join(
+            self._format_phase(metrics, phase)
+            for phase in PHASES if phase in metrics.wall_times
+        )
+        self.logger.log(
+            level, '%s to %s: status %s in %.3f s [%s], request %s bytes, '
+            'response %s bytes%s', metrics.request_type, metrics.endpoint,
+            metrics.status_code, metrics.wall_time, phases,
+            metrics.request_bytes, metrics.response_bytes,
+            '' if metrics.error is None else ', failed: %r' % metrics.error,
+            extra={'metrics': metrics}
+        )
+
+    @staticmethod
+    def _format_phase(metrics, phase):
+        text = '%s %.3f s' % (phase, metrics.wall_times[phase])
+        if phase in metrics.cpu_times:
+            text += ' (cpu %.3f s)' % metrics.cpu_times[phase]
+        return text
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """Exports request metrics to a prometheus_client registry.
+
+    Metrics, prefixed with the namespace:
+
+    * phase_seconds and phase_cpu_seconds: histograms of the wall-clock and
+      CPU time of each phase, by request_type and phase,
+    * request_bytes and response_bytes: histograms of the body sizes, by
+      request_type,
+    * requests_total: counter of requests by request_type and status, the
+      HTTP status code or "error" when no response was received.
+
+    :param registry: optional CollectorRegistry, the default registry of
+    prometheus_client otherwise
+    :param namespace: prefix of the metric names
+    """
+
+    # Body sizes from 256 bytes to 64 MiB.
+    BYTES_BUCKETS = tuple(2 ** exponent for exponent in range(8, 27, 2))
+
+    def __init__(self, registry=None, namespace='symantecssl'):
+        if prometheus_client is None:
+            raise ImportError(
+                "prometheus_client is required for PrometheusInstrumentation; "
+                "install symantecssl[prometheus]"
+            )
+        if registry is None:
+            registry = prometheus_client.REGISTRY
+
+        self.phase_seconds = prometheus_client.Histogram(
+            'phase_seconds', 'Wall-clock time of each phase of the requests',
+            ['request_type', 'phase'], namespace=namespace, registry=registry
+        )
+        self.phase_cpu_seconds = prometheus_client.Histogram(
+            'phase_cpu_seconds', 'CPU time of each phase of the requests',
+            ['request_type', 'phase'], namespace=namespace, registry=registry
+        )
+        self.request_bytes = prometheus_client.Histogram(
+            'request_bytes', 'Size of the request bodies', ['request_type'],
+            namespace=namespace, registry=registry,
+            buckets=self.BYTES_BUCKETS
+        )
+        self.response_bytes = prometheus_client.Histogram(
+            'response_bytes', 'Size of the response bodies',
+            ['request_type'], namespace=namespace, registry=registry,
+            buckets=self.BYTES_BUCKETS
+        )
+        self.requests = prometheus_client.Counter(
+            'requests_total', 'Requests by HTTP status code',
+            ['request_type', 'status'], namespace=namespace,
+            registry=registry
+        )
+
+    def record(self, metrics):
+        request_type = metrics.request_type
+        for phase, seconds in metrics.wall_times.items():
+            self.phase_seconds.labels(request_type, phase).observe(seconds)
+        for phase, seconds in metrics.cpu_times.items():
+            self.phase_cpu_seconds.labels(request_type, phase).observe(
+                seconds
+            )
+        if metrics.request_bytes is not None:
+            self.request_bytes.labels(request_type).observe(
+                metrics.request_bytes
+            )
+        if metrics.response_bytes is not None:
+            self.response_bytes.labels(request_type).observe(
+                metrics.response_bytes
+            )
+
+        status = metrics.status_code
+        self.requests.labels(
+            request_type, 'error' if status is None else str(status)
+        ).inc()
@@ -0,0 +1,558 @@
+from __future__ import absolute_import, division, print_function
+import base64
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from lxml import etree
+import requests
+
+from symantecssl import utils
+from symantecssl.order import (
+    FailedRequest, _cached_response, get_default_client, parse_response
+)
+from symantecssl.request_models import (
+    GetModifiedOrderRequest, GetOrderByPartnerOrderID, QuickOrderRequest,
+    Reissue
+)
+
+SUBMITTED = 'submitted'
+ACKNOWLEDGED = 'acknowledged'
+FAILED = 'failed'
+
+# Fields read from the order detail when reconciling an order.
+RECONCILE_FIELDS = ['partner_order_id', 'geotrust_order_id', 'status_code']
+
+# Fields read from the modified orders when reconciling a reissue.
+REISSUE_RECONCILE_FIELDS = [
+    'partner_order_id', 'geotrust_order_id', 'modified_events'
+]
+
+# Request models an OrderLedger records, entries are keyed by their name.
+_REQUEST_TYPES = (QuickOrderRequest, Reissue)
+
+_COLUMNS = (
+    'request_type', 'partner_order_id', 'state', 'submitted', 'updated',
+    'attempts', 'geotrust_order_id', 'content', 'error'
+)
+
+
+def _request_type(request_model):
+    """Returns the name entries of a request model are recorded under.
+
+    :param request_model: order request model
+    :return: QuickOrderRequest or Reissue
+    """
+    for request_type in _REQUEST_TYPES:
+        if isinstance(request_model, request_type):
+            return request_type.__name__
+    raise TypeError(
+        "Only QuickOrderRequest and Reissue orders can be recorded in a "
+        "ledger, not %s" % type(request_model).__name__
+    )
+
+
+class LedgerConflictError(Exception):
+    """Raised when an order is submitted while the same order is in flight.
+
+    :param request_type: name of the order request model
+    :param partner_order_id: partner order ID of the order
+    """
+
+    def __init__(self, request_type, partner_order_id):
+        super(LedgerConflictError, self).__init__(
+            "%s %s is already being placed" % (request_type, partner_order_id)
+        )
+        self.request_type = request_type
+        self.partner_order_id = partner_order_id
+
+
+class LedgerEntry(object):
+    """State of an order recorded in an OrderLedger.
+
+    :param request_type: name of the order request model, QuickOrderRequest
+    or Reissue
+    :param partner_order_id: partner order ID the order is placed with
+    :param state: SUBMITTED while the outcome of the order is unknown,
+    ACKNOWLEDGED once it is known to be placed, FAILED once it is known not
+    to be placed
+    :param submitted: time of the first submission, in seconds since the
+    epoch
+    :param updated: time of the last change, in seconds since the epoch
+    :param attempts: number of times the order was posted
+    :param geotrust_order_id: order ID assigned by Symantec, once known
+    :param content: raw body of the response acknowledging the order, None
+    when the order was acknowledged by reconciliation
+    :param error: description of the last failure
+    """
+
+    def __init__(self, request_type, partner_order_id, state=SUBMITTED,
+                 submitted=None, updated=None, attempts=0,
+                 geotrust_order_id=None, content=None, error=None):
+        self.request_type = request_type
+        self.partner_order_id = partner_order_id
+        self.state = state
+        self.submitted = submitted if submitted is not None else time.time()
+        self.updated = updated if updated is not None else self.submitted
+        self.attempts = attempts
+        self.geotrust_order_id = geotrust_order_id
+        self.content = content
+        self.error = error
+
+    def to_row(self):
+        return tuple(getattr(self, column) for column in _COLUMNS)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+
+class LedgerStore(object):
+    """Persists the entries of an OrderLedger by request type and partner
+    order ID.
+    """
+
+    def get(self, request_type, partner_order_id):
+        """Loads an entry.
+
+        :param request_type: name of the order request model
+        :param partner_order_id: partner order ID of the order
+        :return: LedgerEntry or None
+        """
+        raise NotImplementedError
+
+    def save(self, entry):
+        """Saves an entry, replacing the previous one.
+
+        :param entry: LedgerEntry
+        """
+        raise NotImplementedError
+
+    def purge(self, before):
+        """Removes the entries first submitted before a given time.
+
+        :param before: time in seconds since the epoch
+        :return: number of entries removed
+        """
+        raise NotImplementedError
+
+
+class FileLedgerStore(LedgerStore):
+    """Ledger store backed by a JSON file.
+
+    The whole file is rewritten on every change, which suits ledgers of up
+    to a few thousand orders.
+
+    :param path: location of the JSON file, created on first save
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def _dump(self, entries):
+        # Write to a temporary file first so a crash never leaves a
+        # truncated ledger behind.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entries, f)
+        utils.replace_file(tmp_path, self.path)
+
+    @staticmethod
+    def _key(request_type, partner_order_id):
+        return '%s:%s' % (request_type, partner_order_id)
+
+    def get(self, request_type, partner_order_id):
+        with self._lock:
+            row = self._load().get(self._key(request_type, partner_order_id))
+        if row is None:
+            return None
+
+        row = list(row)
+        content = row[_COLUMNS.index('content')]
+        if content is not None:
+            row[_COLUMNS.index('content')] = base64.b64decode(content)
+        return LedgerEntry.from_row(row)
+
+    def save(self, entry):
+        row = list(entry.to_row())
+        if entry.content is not None:
+            row[_COLUMNS.index('content')] = (
+                base64.b64encode(entry.content).decode('ascii')
+            )
+        with self._lock:
+            entries = self._load()
+            entries[self._key(entry.request_type,
+                              entry.partner_order_id)] = row
+            self._dump(entries)
+
+    def purge(self, before):
+        submitted = _COLUMNS.index('submitted')
+        with self._lock:
+            entries = self._load()
+            kept = dict(
+                (key, row) for key, row in entries.items()
+                if row[submitted] >= before
+            )
+            if len(kept) != len(entries):
+                self._dump(kept)
+        return len(entries) - len(kept)
+
+
+class SQLiteLedgerStore(LedgerStore):
+    """Ledger store backed by an SQLite database.
+
+    :param path: location of the SQLite database
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS ledger ('
+                'request_type TEXT, partner_order_id TEXT, state TEXT, '
+                'submitted REAL, updated REAL, attempts INTEGER, '
+                'geotrust_order_id TEXT, content BLOB, error TEXT, '
+                'PRIMARY KEY (request_type, partner_order_id))'
+            )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS ledger_submitted '
+                'ON ledger (submitted)'
+            )
+
+    def close(self):
+        self._connection.close()
+
+    def get(self, request_type, partner_order_id):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT %s FROM ledger '
+                'WHERE request_type = ? AND partner_order_id = ?'
+                % ', '.join(_COLUMNS), (request_type, partner_order_id)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        row = list(row)
+        content = row[_COLUMNS.index('content')]
+        if content is not None:
+            row[_COLUMNS.index('content')] = bytes(content)
+        return LedgerEntry.from_row(row)
+
+    def save(self, entry):
+        row = list(entry.to_row())
+        if entry.content is not None:
+            row[_COLUMNS.index('content')] = sqlite3.Binary(entry.content)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO ledger (%s) VALUES (%s)' % (
+                    ', '.join(_COLUMNS), ', '.join('?' * len(_COLUMNS))
+                ), row
+            )
+
+    def purge(self, before):
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                'DELETE FROM ledger WHERE submitted < ?', (before,)
+            )
+        return cursor.rowcount
+
+
+def _is_ambiguous(error):
+    """Checks whether an order may have been placed despite an error.
+
+    Connection errors, timeouts, 5xx responses and responses that can not
+    be parsed leave the outcome unknown. Responses with a 4xx status code
+    show that the order was rejected, and other errors, such as a request
+    that can not be serialized, are raised before the order is sent.
+
+    :param error: exception raised while placing the order
+    :return: True if the outcome of the order is unknown
+    """
+    if isinstance(error, FailedRequest):
+        return error.status_code is None or error.status_code >= 500
+    return isinstance(error, (
+        requests.Timeout, requests.ConnectionError, etree.LxmlError
+    ))
+
+
+def _reissued_since(detail, since):
+    """Checks whether an order has a reissue event since a given time.
+
+    :param detail: OrderDetail with its modification events
+    :param since: naive UTC datetime
+    :return: True if the order was reissued at or after since
+    """
+    for event in detail.modified_events:
+        if 'reissue' not in event.event_name.lower():
+            continue
+        try:
+            if utils.parse_timestamp(event.time_stamp) >= since:
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+class OrderLedger(object):
+    """Records orders to make retries safe and duplicate submissions cheap.
+
+    Orders such as QuickOrderRequest and Reissue are not idempotent: when
+    one times out, it may or may not have been placed. The ledger records
+    the state of every order by request type and partner order ID, so a
+    Reissue is recorded apart from the QuickOrderRequest of the same order.
+    When the outcome of an order is unknown, the ledger reconciles it and
+    only submits it again if it was not placed: a QuickOrderRequest with a
+    single GetOrderByPartnerOrderID query, a Reissue with a GetModifiedOrders
+    query looking for a reissue event since the order was first submitted,
+    less the clock_skew margin.
+
+    Submitting an order again within the window returns the recorded
+    response instead of placing it twice.
+
+    note:: concurrent submissions of the same order are only detected
+    within a process. Share a ledger store between processes only if they
+    place different orders.
+
+    :param store: LedgerStore, such as FileLedgerStore or SQLiteLedgerStore
+    :param query_endpoint: Symantec query endpoint used to reconcile orders
+    :param client: optional SymantecClient, defaults to the shared client
+    :param window: how long an order is remembered, a timedelta object.
+    Orders submitted earlier are placed again and can be purged.
+    :param max_resubmits: number of times an order found not placed by
+    reconciliation is submitted again
+    :param clock_skew: how far the local clock may be ahead of or behind
+    Symantec's, a timedelta object. Reissue events up to clock_skew before
+    the first submission of a reissue are taken for it, so another reissue
+    of the same order placed within that margin hides a lost one.
+    """
+
+    def __init__(self, store, query_endpoint, client=None,
+                 window=datetime.timedelta(days=1), max_resubmits=1,
+                 clock_skew=datetime.timedelta(minutes=5)):
+        self.store = store
+        self.query_endpoint = query_endpoint
+        self.client = client or get_default_client()
+        self.window = window
+        self.max_resubmits = max_resubmits
+        self.clock_skew = clock_skew
+        self.duplicates = 0
+        self.reconciliations = 0
+        self.resubmits = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """Returns the ledger counters.
+
+        :return: dict of duplicates, reconciliations and resubmits
+        """
+        return {
+            'duplicates': self.duplicates,
+            'reconciliations': self.reconciliations,
+            'resubmits': self.resubmits,
+        }
+
+    def purge(self):
+        """Removes the entries older than the window.
+
+        :return: number of entries removed
+        """
+        return self.store.purge(time.time() - self.window.total_seconds())
+
+    def post(self, endpoint, request_model, credentials):
+        """Places an order, unless the ledger shows it was already placed.
+
+        :param endpoint: Symantec order endpoint
+        :param request_model: QuickOrderRequest or Reissue, with a partner
+        order ID set through RequestHeader.set_request_header
+        :param credentials: Symantec specific credentials, see post_request
+        :return response: deserialized response from API. When the order
+        was acknowledged by reconciliation rather than by its own response,
+        the response has no content and its model only holds the order IDs.
+        """
+        request_type = _request_type(request_model)
+        partner_order_id = request_model.request_header.partner_order_id
+        if not partner_order_id:
+            raise ValueError(
+                "Orders need a partner order ID to be recorded in a ledger"
+            )
+
+        key = (request_type, partner_order_id)
+        with self._lock:
+            if key in self._in_flight:
+                raise LedgerConflictError(request_type, partner_order_id)
+            self._in_flight.add(key)
+        try:
+            return self._post(
+                endpoint, request_model, credentials, request_type,
+                partner_order_id
+            )
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def _post(self, endpoint, request_model, credentials, request_type,
+              partner_order_id):
+        entry = self.store.get(request_type, partner_order_id)
+        expired = time.time() - self.window.total_seconds()
+        if entry is None or entry.submitted < expired:
+            entry = LedgerEntry(request_type, partner_order_id)
+        elif entry.state == ACKNOWLEDGED:
+            self.duplicates += 1
+            return self._recorded_response(endpoint, request_model, entry)
+        elif entry.state == SUBMITTED:
+            # A previous submission ended without a known outcome.
+            detail = self._reconcile(entry, credentials)
+            if detail is not None:
+                return self._acknowledge(
+                    endpoint, request_model, entry, detail
+                )
+
+        resubmits = 0
+        while True:
+            entry.state = SUBMITTED
+            entry.attempts += 1
+            entry.updated = time.time()
+            self.store.save(entry)
+            try:
+                response = self.client.post(
+                    endpoint, request_model, credentials
+                )
+            except Exception as error:
+                entry.error = repr(error)
+                if not _is_ambiguous(error):
+                    self._fail(entry)
+                    raise
+
+                self.store.save(entry)
+                try:
+                    detail = self._reconcile(entry, credentials)
+                except Exception:
+                    # The outcome stays unknown, the entry stays submitted.
+                    raise error
+                if detail is not None:
+                    return self._acknowledge(
+                        endpoint, request_model, entry, detail
+                    )
+                if resubmits >= self.max_resubmits:
+                    self._fail(entry)
+                    raise
+                resubmits += 1
+                self.resubmits += 1
+                continue
+
+            entry.state = ACKNOWLEDGED
+            entry.content = response.content
+            entry.geotrust_order_id = getattr(
+                getattr(response.model, 'result', None), 'order_id', None
+            )
+            entry.error = None
+            entry.updated = time.time()
+            self.store.save(entry)
+            return response
+
+    def _fail(self, entry):
+        entry.state = FAILED
+        entry.updated = time.time()
+        self.store.save(entry)
+
+    def _reconcile(self, entry, credentials):
+        """Looks up an order of unknown outcome.
+
+        :param entry: LedgerEntry of the order
+        :param credentials: Symantec specific credentials
+        :return: OrderDetail of the order, or None if it was not placed
+        """
+        self.reconciliations += 1
+        if entry.request_type == Reissue.__name__:
+            return self._reconcile_reissue(entry, credentials)
+
+        query = GetOrderByPartnerOrderID()
+        query.partner_order_id = entry.partner_order_id
+        query.set_projection(RECONCILE_FIELDS)
+        # A cached answer may predate the order.
+        query.cacheable = False
+        detail = self.client.post(
+            self.query_endpoint, query, credentials
+        ).model
+
+        if detail.partner_order_id != entry.partner_order_id:
+            return None
+        return detail
+
+    def _reconcile_reissue(self, entry, credentials):
+        """Looks up a reissue of unknown outcome.
+
+        The original order always exists, so the reissue is only considered
+        placed when the order has a reissue event since its first
+        submission. Event times are set by Symantec's clock, so the
+        submission time is moved back by the clock_skew margin.
+
+        :param entry: LedgerEntry of the reissue
+        :param credentials: Symantec specific credentials
+        :return: OrderDetail of the order, or None if it was not reissued
+        """
+        submitted = datetime.datetime.utcfromtimestamp(entry.submitted)
+        since = submitted - self.clock_skew
+        query = GetModifiedOrderRequest()
+        query.set_time_frame(
+            since, datetime.datetime.utcnow() + self.clock_skew
+        )
+        query.set_projection(REISSUE_RECONCILE_FIELDS)
+        details = self.client.post(
+            self.query_endpoint, query, credentials
+        ).model
+
+        for detail in details:
+            if detail.partner_order_id != entry.partner_order_id:
+                continue
+            if _reissued_since(detail, since):
+                return detail
+        return None
+
+    def _acknowledge(self, endpoint, request_model, entry, detail):
+        entry.state = ACKNOWLEDGED
+        entry.geotrust_order_id = detail.geotrust_order_id
+        entry.content = None
+        entry.updated = time.time()
+        self.store.save(entry)
+        return self._recorded_response(endpoint, request_model, entry)
+
+    def _recorded_response(self, endpoint, request_model, entry):
+        """Builds the response of an acknowledged order from its entry.
+
+        :param endpoint: Symantec order endpoint
+        :param request_model: order request model
+        :param entry: acknowledged LedgerEntry
+        :return: response carrying the recorded body and model
+        """
+        if entry.content is not None:
+            model = parse_response(
+                request_model, 200, entry.content,
+                parser=getattr(self.client, 'parser', None)
+            )
+            return _cached_response(endpoint, entry.content, model)
+
+        model = request_model.response_model()
+        result = model.result
+        if hasattr(result, 'order_id'):
+            result.order_id = entry.geotrust_order_id
+        result.order_response.partner_order_id = entry.partner_order_id
+        return _cached_response(endpoint, None, model)
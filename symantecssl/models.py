@@ -3,8 +3,19 @@ from lxml import etree
 
 from symantecssl import utils
 
+_ADMIN_CONTACT = utils.ElementPath('m:AdminContact')
+_TECH_CONTACT = utils.ElementPath('m:TechContact')
+_BILLING_CONTACT = utils.ElementPath('m:BillingContact')
+
+_FIRST_NAME = utils.ElementPath('m:FirstName')
+_LAST_NAME = utils.ElementPath('m:LastName')
+_PHONE = utils.ElementPath('m:Phone')
+_EMAIL = utils.ElementPath('m:Email')
+_TITLE = utils.ElementPath('m:Title')
+
 
 class OrderContacts(object):
+    __slots__ = ('admin', 'tech', 'billing', 'approval_email')
 
     def __init__(self):
         self.admin = ContactInfo()
@@ -21,9 +32,9 @@ class OrderContacts(object):
         :return: parsed order contacts information response.
         """
         contacts = OrderContacts()
-        admin_node = xml_node.find('.//m:AdminContact', utils.NS)
-        tech_node = xml_node.find('.//m:TechContact', utils.NS)
-        billing_node = xml_node.find('.//m:BillingContact', utils.NS)
+        admin_node = _ADMIN_CONTACT.find(xml_node)
+        tech_node = _TECH_CONTACT.find(xml_node)
+        billing_node = _BILLING_CONTACT.find(xml_node)
 
         contacts.admin = ContactInfo.deserialize(admin_node)
         contacts.tech = ContactInfo.deserialize(tech_node)
@@ -44,6 +55,11 @@ class OrderContacts(object):
 
 
 class ContactInfo(object):
+    __slots__ = (
+        'first_name', 'last_name', 'phone', 'email', 'title', 'org_name',
+        'address_line_one', 'address_line_two', 'city', 'region',
+        'postal_code', 'country', 'fax'
+    )
 
     def __init__(self):
         self.first_name = ''
@@ -69,21 +85,11 @@ class ContactInfo(object):
         :return: parsed contact information response.
         """
         contact = ContactInfo()
-        contact.first_name = utils.get_element_text(
-            xml_node.find('.//m:FirstName', utils.NS)
-        )
-        contact.last_name = utils.get_element_text(
-            xml_node.find('.//m:LastName', utils. NS)
-        )
-        contact.phone = utils.get_element_text(
-            xml_node.find('.//m:Phone', utils.NS)
-        )
-        contact.email = utils.get_element_text(
-            xml_node.find('.//m:Email', utils.NS)
-        )
-        contact.title = utils.get_element_text(
-            xml_node.find('.//m:Title', utils. NS)
-        )
+        contact.first_name = _FIRST_NAME.text(xml_node)
+        contact.last_name = _LAST_NAME.text(xml_node)
+        contact.phone = _PHONE.text(xml_node)
+        contact.email = _EMAIL.text(xml_node)
+        contact.title = _TITLE.text(xml_node)
 
         return contact
 
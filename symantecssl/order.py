@@ -1,18 +1,481 @@
 from __future__ import absolute_import, division, print_function
-import requests
+import threading
+import time
 
+import requests
+from requests.adapters import HTTPAdapter
 
 from lxml import etree
 
+from symantecssl import utils
+from symantecssl.cache import cache_key, cache_tag
+from symantecssl.instrumentation import (
+    DESERIALIZE, NULL_METRICS, PARSE, SEND, SERIALIZE, start_metrics
+)
 from symantecssl.request_models import RequestEnvelope as ReqEnv
+from symantecssl.streaming import (
+    RequestBody, iter_order_details, read_order_columns
+)
+from symantecssl.templates import render_request
 
 
 class FailedRequest(Exception):
-    # TODO(chellygel) Elaborate on exception data
-    pass
+    """Raised when Symantec does not answer a request with a 200 response.
+
+    Also raised, chained from the last error, when the retries of a request
+    that failed to connect or timed out run out.
+
+    :param status_code: HTTP status code of the last response, None when the
+    last attempt got no response
+    :param attempts: number of attempts made before giving up
+    :param elapsed: seconds spent over every attempt
+    :param response: last response received
+    """
+
+    def __init__(self, status_code=None, attempts=1, elapsed=None,
+                 response=None):
+        super(FailedRequest, self).__init__(
+            "Request failed with status {0} after {1} attempt(s)".format(
+                status_code, attempts
+            )
+        )
+        self.status_code = status_code
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.response = response
+
+
+def serialize_request(request_model, credentials, pretty_print=True,
+                      stream=False):
+    """Serializes a request model into the SOAP envelope to be posted.
+
+    Request models of this package are rendered from precompiled templates,
+    see symantecssl.templates. Others are serialized with lxml.
+
+    :param request_model: request model instance to initiate call type
+    :param credentials: Symantec specific credentials for orders.
+    :param pretty_print: whether to indent the envelope, compact otherwise
+    :param stream: if True, returns a RequestBody writing the compact
+    envelope as it is sent instead, see symantecssl.streaming.write_request
+    :return: serialized XML request body
+    """
+    request_model.set_credentials(**credentials)
+    if stream:
+        return RequestBody(request_model)
+
+    serialized_xml = render_request(request_model, pretty_print)
+    if serialized_xml is None:
+        model = ReqEnv(request_model=request_model)
+        serialized_xml = etree.tostring(
+            model.serialize(), pretty_print=pretty_print
+        )
+    return serialized_xml
+
+
+def parse_response(request_model, status_code, content, lazy=False,
+                   parser=None, metrics=NULL_METRICS, pool=None):
+    """Checks and deserializes a response from Symantec's SOAPXML API.
+
+    :param request_model: request model instance the response belongs to
+    :param status_code: HTTP status code of the response
+    :param content: raw body of the response
+    :param lazy: whether to deserialize order details on attribute access,
+    see LazyOrderDetail. Ignored by responses without order details.
+    :param parser: optional lxml XMLParser, the parser of the current thread
+    returned by utils.get_response_parser by default
+    :param metrics: optional RequestMetrics measuring the parse and
+    deserialize phases
+    :param pool: optional StringPool deduplicating the field values of order
+    details. Ignored by responses without order details.
+    :return: deserialized response model
+
+    note:: the projection set on the request model and the pool are ignored
+    in lazy mode, where attributes are only deserialized when read anyway.
+    """
+    # Symantec not expected to return 2xx range; only 200
+    if status_code != 200:
+        raise FailedRequest(status_code=status_code)
+    with metrics.phase(PARSE):
+        xml_root = etree.fromstring(
+            content, parser or utils.get_response_parser()
+        )
+
+    response_model = request_model.response_model
+    with metrics.phase(DESERIALIZE):
+        # Only order detail models can be lazy, projected or pooled.
+        if not hasattr(response_model, 'deserialize_lazy'):
+            return response_model.deserialize(xml_root)
+        if lazy:
+            return response_model.deserialize_lazy(xml_root)
+
+        return response_model.deserialize(
+            xml_root, projection=getattr(request_model, 'projection', None),
+            pool=pool
+        )
+
+
+def is_throttled(status_code):
+    """Checks whether a status code shows the partner account is overloaded.
+
+    :param status_code: HTTP status code of a response
+    :return: True for throttling and server errors
+    """
+    return status_code == 429 or status_code >= 500
+
+
+def _cached_response(endpoint, content, model):
+    """Builds a response object for a value served from a ResponseCache.
+
+    :param endpoint: Symantec endpoint the request was made against
+    :param content: raw body of the cached response
+    :param model: deserialized response model
+    :return: response carrying the cached body and model
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.url = endpoint
+    response._content = content
+    setattr(response, "model", model)
+
+    return response
+
+
+class SymantecClient(object):
+    """Reusable client for Symantec's SOAPXML API.
+
+    The client keeps a single requests Session alive so that TCP and TLS
+    connections are reused between calls instead of being re-established for
+    every query or order. Each endpoint (Symantec has one for queries and one
+    for orders) is given its own connection pool.
+
+    :param pool_maxsize: number of connections kept alive per endpoint
+    :param keep_alive: if False, every request asks the server to close the
+    connection once the response has been read
+    :param timeout: optional timeout passed through to requests
+    :param session: optional preconfigured requests Session to use
+    :param cache: optional ResponseCache serving cacheable query requests
+    :param retry: optional RetryPolicy. Without one, every request is only
+    attempted once.
+    :param throttle: optional ThrottleRegistry pacing requests per partner
+    code
+    :param parser: optional lxml XMLParser used to parse responses. lxml
+    parsers can not be used by several threads at once, so only give one to
+    clients used by a single thread. By default each thread reuses its own
+    parser, see utils.get_response_parser.
+    :param pretty_print: if False, requests are sent compact rather than
+    indented
+    :param stream_requests: if True, request envelopes are written while
+    they are sent, with chunked transfer encoding, instead of being
+    serialized in memory first. Peak memory of large Reissue requests then
+    does not depend on their number of SANs.
+    :param instrumentation: optional Instrumentation receiving the time
+    spent in each phase of the requests posted, see
+    symantecssl.instrumentation
+    """
+
+    def __init__(self, pool_maxsize=10, keep_alive=True, timeout=None,
+                 session=None, cache=None, retry=None, throttle=None,
+                 parser=None, pretty_print=True, stream_requests=False,
+                 instrumentation=None):
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.cache = cache
+        self.retry = retry
+        self.throttle = throttle
+        self.parser = parser
+        self.pretty_print = pretty_print
+        self.stream_requests = stream_requests
+        self.instrumentation = instrumentation
+        self.session = session or requests.Session()
+        self._adapters = {}
+        self._lock = threading.Lock()
+
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the session and every pooled connection."""
+        self.session.close()
+        self._adapters.clear()
+
+    def _mount(self, endpoint):
+        """Mounts a dedicated connection pool for the given endpoint.
+
+        :param endpoint: Symantec endpoint that will be hit by the session
+        """
+        if endpoint in self._adapters:
+            return
+
+        with self._lock:
+            if endpoint not in self._adapters:
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_maxsize
+                )
+                self.session.mount(endpoint, adapter)
+                self._adapters[endpoint] = adapter
+
+    def _post_once(self, endpoint, request_model, serialized_xml, stream):
+        """Posts a serialized request once, paced by the throttle.
+
+        :param endpoint: Symantec endpoint to hit directly
+        :param request_model: request model instance being sent
+        :param serialized_xml: serialized request body
+        :param stream: whether to stream the response body
+        :return: response
+        """
+        headers = {'Content-Type': 'application/soap+xml'}
+        governor = None
+        if self.throttle is not None:
+            governor = self.throttle.get(
+                request_model.request_header.partner_code
+            )
+            governor.acquire()
+
+        sent = time.time()
+        failed = True
+        try:
+            response = self.session.post(
+                endpoint, serialized_xml, headers=headers,
+                timeout=self.timeout, stream=stream
+            )
+            failed = is_throttled(response.status_code)
+        finally:
+            if governor is not None:
+                governor.release(failed=failed, latency=time.time() - sent)
 
+        return response
 
-def post_request(endpoint, request_model, credentials):
+    def _send(self, endpoint, request_model, serialized_xml, stream=False):
+        """Posts a serialized request, retrying it according to the policy.
+
+        :param endpoint: Symantec endpoint to hit directly
+        :param request_model: request model instance being sent
+        :param serialized_xml: serialized request body
+        :param stream: whether to stream the response body
+        :return: response with a 200 status code
+        """
+        self._mount(endpoint)
+
+        start = time.time()
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                response = self._post_once(
+                    endpoint, request_model, serialized_xml, stream
+                )
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if self.retry is None:
+                    raise
+                response = None
+                status_code = None
+                connection_error = error
+            else:
+                # Symantec not expected to return 2xx range; only 200
+                if response.status_code == 200:
+                    return response
+                status_code = response.status_code
+
+            elapsed = time.time() - start
+            delay = None
+            if self.retry is not None:
+                delay = self.retry.next_delay(
+                    request_model, attempts, elapsed, status_code
+                )
+
+            if delay is None:
+                if response is None:
+                    failure = FailedRequest(
+                        attempts=attempts, elapsed=elapsed
+                    )
+                    # raise ... from is not available on Python 2
+                    failure.__cause__ = connection_error
+                    raise failure
+                setattr(response, "model", None)
+                response.close()
+                raise FailedRequest(
+                    status_code=status_code, attempts=attempts,
+                    elapsed=elapsed, response=response
+                )
+
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+
+    def post(self, endpoint, request_model, credentials, lazy=False,
+             pool=None):
+        """Create a post request against Symantec's SOAPXML API.
+
+        See post_request for details on the supported request models and
+        credentials.
+
+        :param endpoint: Symantec endpoint to hit directly
+        :param request_model: request model instance to initiate call type
+        :param credentials: Symantec specific credentials for orders.
+        :param lazy: whether to deserialize order details on attribute
+        access, see LazyOrderDetail
+        :param pool: optional StringPool deduplicating the field values of
+        order details
+        :return response: deserialized response from API
+        """
+        with start_metrics(
+                self.instrumentation, request_model, endpoint) as metrics:
+            with metrics.phase(SERIALIZE):
+                serialized_xml = serialize_request(
+                    request_model, credentials, self.pretty_print,
+                    self.stream_requests
+                )
+            return self._post_serialized(
+                endpoint, request_model, serialized_xml, lazy, pool, metrics
+            )
+
+    def post_serialized(self, endpoint, request_model, serialized_xml,
+                        lazy=False, pool=None):
+        """Posts a request serialized beforehand.
+
+        Lets callers serialize requests ahead of time, see serialize_request,
+        and only post them later, possibly from another thread.
+
+        :param endpoint: Symantec endpoint to hit directly
+        :param request_model: request model instance the body was serialized
+        from, with credentials set
+        :param serialized_xml: serialized request body
+        :param lazy: whether to deserialize order details on attribute
+        access, see LazyOrderDetail
+        :param pool: optional StringPool deduplicating the field values of
+        order details
+        :return response: deserialized response from API
+        """
+        with start_metrics(
+                self.instrumentation, request_model, endpoint) as metrics:
+            return self._post_serialized(
+                endpoint, request_model, serialized_xml, lazy, pool, metrics
+            )
+
+    def _post_serialized(self, endpoint, request_model, serialized_xml, lazy,
+                         pool, metrics):
+        metrics.record_request(serialized_xml)
+        key = None
+        if self.cache is not None:
+            key = cache_key(request_model, lazy)
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                response = _cached_response(endpoint, *cached)
+                metrics.record_response(response)
+                return response
+
+        with metrics.phase(SEND):
+            response = self._send(endpoint, request_model, serialized_xml)
+        setattr(response, "model", None)
+        metrics.record_response(response)
+
+        deserialized = parse_response(
+            request_model, response.status_code, response.content, lazy=lazy,
+            parser=self.parser, metrics=metrics, pool=pool
+        )
+        setattr(response, "model", deserialized)
+
+        if key is not None:
+            self.cache.set(
+                key, (response.content, deserialized),
+                tag=cache_tag(
+                    request_model.request_header.partner_code,
+                    request_model.partner_order_id
+                )
+            )
+
+        return response
+
+    def stream_order_details(self, endpoint, request_model, credentials,
+                             pool=None):
+        """Create a post request and stream the order details it returns.
+
+        The response body is read and parsed incrementally rather than loaded
+        into memory at once, which keeps memory bounded for GetModifiedOrders
+        calls covering a wide date range.
+
+        note:: the request is only sent once iteration starts.
+
+        :param endpoint: Symantec endpoint to hit directly
+        :param request_model: query request model returning order details
+        :param credentials: Symantec specific credentials for orders.
+        :param pool: optional StringPool deduplicating the field values
+        :return: generator of OrderDetail objects
+        """
+        serialized_xml = serialize_request(
+            request_model, credentials, self.pretty_print,
+            self.stream_requests
+        )
+        response = self._send(
+            endpoint, request_model, serialized_xml, stream=True
+        )
+
+        try:
+            response.raw.decode_content = True
+            for detail in iter_order_details(
+                    response.raw, request_model.projection, pool):
+                yield detail
+        finally:
+            response.close()
+
+    def fetch_order_columns(self, endpoint, request_model, credentials,
+                            pool=None):
+        """Create a post request and read its order details into columns.
+
+        The response body is parsed incrementally and each order detail is
+        deserialized straight into an OrderDetailColumns.
+
+        :param endpoint: Symantec endpoint to hit directly
+        :param request_model: query request model returning order details
+        :param credentials: Symantec specific credentials for orders.
+        :param pool: optional StringPool deduplicating the field values
+        :return: OrderDetailColumns
+        """
+        serialized_xml = serialize_request(
+            request_model, credentials, self.pretty_print,
+            self.stream_requests
+        )
+        response = self._send(
+            endpoint, request_model, serialized_xml, stream=True
+        )
+
+        try:
+            response.raw.decode_content = True
+            return read_order_columns(
+                response.raw, request_model.projection, pool
+            )
+        finally:
+            response.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """Returns the shared client used by post_request.
+
+    :return: process wide SymantecClient instance
+    """
+    global _default_client
+
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = SymantecClient()
+
+    return _default_client
+
+
+def post_request(endpoint, request_model, credentials, lazy=False,
+                 pool=None):
     """Create a post request against Symantec's SOAPXML API.
 
     Currently supported Request Models are:
@@ -28,28 +491,59 @@ def post_request(endpoint, request_model, credentials):
     username
     password
 
+    note:: connections are pooled and reused through a shared SymantecClient.
+    Create your own SymantecClient to control the pool size or keep-alive.
+
     Access all data from response via models
 
+    note:: with lazy set, order details are only deserialized as their
+    attributes are read, which is cheaper when only a few fields such as
+    status_code are used.
+
     :param endpoint: Symantec endpoint to hit directly
     :param request_model: request model instance to initiate call type
     :param credentials: Symantec specific credentials for orders.
+    :param lazy: whether to deserialize order details on attribute access,
+    see LazyOrderDetail
+    :param pool: optional StringPool deduplicating the field values of order
+    details
     :return response: deserialized response from API
     """
+    return get_default_client().post(
+        endpoint, request_model, credentials, lazy=lazy, pool=pool
+    )
 
-    request_model.set_credentials(**credentials)
-    model = ReqEnv(request_model=request_model)
-    serialized_xml = etree.tostring(model.serialize(), pretty_print=True)
 
-    headers = {'Content-Type': 'application/soap+xml'}
+def stream_order_details(endpoint, request_model, credentials, pool=None):
+    """Create a post request and stream the order details it returns.
 
-    response = requests.post(endpoint, serialized_xml, headers=headers)
-    setattr(response, "model", None)
+    Streaming counterpart of post_request for GetModifiedOrders and
+    GetOrderByPartnerOrderID. Order details are yielded one at a time while
+    the response is still being read.
 
-    # Symantec not expected to return 2xx range; only 200
-    if response.status_code != 200:
-        raise FailedRequest()
-    xml_root = etree.fromstring(response.content)
-    deserialized = request_model.response_model.deserialize(xml_root)
-    setattr(response, "model", deserialized)
+    :param endpoint: Symantec endpoint to hit directly
+    :param request_model: query request model returning order details
+    :param credentials: Symantec specific credentials for orders.
+    :param pool: optional StringPool deduplicating the field values
+    :return: generator of OrderDetail objects
+    """
+    return get_default_client().stream_order_details(
+        endpoint, request_model, credentials, pool
+    )
 
-    return response
+
+def fetch_order_columns(endpoint, request_model, credentials, pool=None):
+    """Create a post request and read its order details into columns.
+
+    Columnar counterpart of post_request for GetModifiedOrders and
+    GetOrderByPartnerOrderID, see OrderDetailColumns.
+
+    :param endpoint: Symantec endpoint to hit directly
+    :param request_model: query request model returning order details
+    :param credentials: Symantec specific credentials for orders.
+    :param pool: optional StringPool deduplicating the field values
+    :return: OrderDetailColumns
+    """
+    return get_default_client().fetch_order_columns(
+        endpoint, request_model, credentials, pool
+    )
@@ -1,12 +1,27 @@
 from __future__ import absolute_import, division, print_function
+import copy
+
 from lxml import etree
 
 from symantecssl import utils
 from symantecssl.response_models import (
-    OrderDetails, OrderDetail, OrderContacts, QuickOrderResponse,
+    OrderDetails, OrderDetail, OrderContacts, Projection, QuickOrderResponse,
     ReissueResponse
 )
 
+# Query options returning the section holding each OrderDetail attribute.
+# Order info and modification events are always returned.
+_PROJECTION_QUERY_OPTIONS = {
+    'status_code': ('product_detail',),
+    'status_name': ('product_detail',),
+    'approver_email': ('product_detail',),
+    'organization_info': ('product_detail',),
+    'organization_contacts': ('contacts',),
+    'vulnerabilities': (
+        'vulnerability_scan_summary', 'vulnerability_scan_details'
+    ),
+}
+
 
 class ApproverEmail(object):
 
@@ -58,6 +73,39 @@ class RequestEnvelope(object):
         return root
 
 
+def _header_fragment(key):
+    """Builds the request header of a partner code and username.
+
+    Order request headers get empty ProductCode and PartnerOrderID elements,
+    and every header an empty Password element, set by
+    RequestHeader.serialize on each copy so that passwords are never cached.
+
+    :param key: tuple of order_type, partner code and username
+    :return: request header element
+    """
+    order_type, partner_code, username = key
+    if order_type:
+        root = etree.Element("OrderRequestHeader")
+        for node in ('ProductCode', 'PartnerOrderID'):
+            etree.SubElement(root, node)
+
+    else:
+        root = etree.Element("QueryRequestHeader")
+
+    utils.create_subelement_with_text(root, 'PartnerCode', partner_code)
+    auth_token = etree.SubElement(root, "AuthToken")
+
+    utils.create_subelement_with_text(auth_token, "UserName", username)
+    etree.SubElement(auth_token, "Password")
+
+    return root
+
+
+# Request headers by partner code and username, copied by
+# RequestHeader.serialize.
+_HEADER_FRAGMENTS = utils.FragmentCache()
+
+
 class RequestHeader(object):
 
     def __init__(self):
@@ -73,32 +121,22 @@ class RequestHeader(object):
         Each request model should call this in order to process the request.
         The request model will initiate serialization here.
 
+        The header of each partner code and username is built once and
+        copied, see _HEADER_FRAGMENTS.
+
         :order_type: a True or False value to create the proper XML header for
         the request.
 
         :return: root element for the request header
         """
+        root = copy.deepcopy(_HEADER_FRAGMENTS.get(
+            (bool(order_type), self.partner_code, self.username),
+            _header_fragment
+        ))
+        root[-1][1].text = self.password
         if order_type:
-            root = etree.Element("OrderRequestHeader")
-            for node, node_text in [
-                ('ProductCode', self.product_code),
-                ('PartnerOrderID', self.partner_order_id)
-            ]:
-                utils.create_subelement_with_text(root, node, node_text)
-
-        else:
-            root = etree.Element("QueryRequestHeader")
-
-        utils.create_subelement_with_text(
-            root, 'PartnerCode', self.partner_code
-        )
-        auth_token = etree.SubElement(root, "AuthToken")
-
-        for node, node_text in [
-            ("UserName", self.username),
-            ("Password", self.password)
-        ]:
-            utils.create_subelement_with_text(auth_token, node, node_text)
+            root[0].text = self.product_code
+            root[1].text = self.partner_order_id
 
         return root
 
@@ -140,6 +178,23 @@ class OrderQueryOptions(object):
         self.vulnerability_scan_details = vulnerability_scan_details
         self.certificate_algorithm_info = cert_algorithm_info
 
+    @classmethod
+    def for_projection(cls, projection):
+        """Creates query options only returning what a projection reads.
+
+        :param projection: Projection of the order detail attributes
+        :return: query options with every other section turned off
+        """
+        options = cls()
+        for name in vars(options):
+            setattr(options, name, False)
+
+        for attribute in projection.attributes:
+            for name in _PROJECTION_QUERY_OPTIONS.get(attribute, ()):
+                setattr(options, name, True)
+
+        return options
+
     def serialize(self):
         """Serializes and sets the query options for the request.
 
@@ -355,6 +410,11 @@ class OrderChanges(object):
 
 class Request(object):
 
+    # Whether responses to this request may be served from a ResponseCache
+    cacheable = False
+    # Whether this request may be sent again without side effects
+    idempotent = False
+
     def __init__(self):
         self.partner_code = ''
         self.username = ''
@@ -364,6 +424,7 @@ class Request(object):
         self.to_date = ''
         self.request_header = RequestHeader()
         self.query_options = OrderQueryOptions()
+        self.projection = None
 
     def set_credentials(self, partner_code, username, password):
 
@@ -451,6 +512,21 @@ class Request(object):
             vulnerability_scan_details)
         self.query_options.certificate_algorithm_info = cert_algorithm_info
 
+    def set_projection(self, fields):
+        """Restricts the order details returned to the given fields.
+
+        The query options are derived from the fields, so that Symantec only
+        returns the sections holding them, and only these fields are
+        deserialized. Other attributes keep their default value.
+
+        :param fields: order detail attribute paths, such as status_code,
+        contacts.admin.email or modified_events. See Projection.
+        """
+        self.projection = Projection(fields)
+        self.query_options = OrderQueryOptions.for_projection(
+            self.projection
+        )
+
     def set_partner_order_id(self, partner_order_id):
         """Sets the partner order ID for order retrieval.
 
@@ -461,6 +537,8 @@ class Request(object):
 
 class GetModifiedOrderRequest(Request):
 
+    idempotent = True
+
     def __init__(self):
         super(GetModifiedOrderRequest, self).__init__()
         self.response_model = OrderDetails
@@ -589,6 +667,9 @@ class QuickOrderRequest(Request):
 
 class GetOrderByPartnerOrderID(Request):
 
+    cacheable = True
+    idempotent = True
+
     def __init__(self):
         super(GetOrderByPartnerOrderID, self).__init__()
         self.response_model = OrderDetail
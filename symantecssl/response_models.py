@@ -1,31 +1,129 @@
 from __future__ import absolute_import, division, print_function
 
 from symantecssl import utils
-from symantecssl.models import OrderContacts
+from symantecssl.models import ContactInfo, OrderContacts
+
+_ORDER_DETAILS = utils.ElementPath('.//m:OrderDetail')
+
+_ORDER_DETAIL = utils.ElementPath('self::m:OrderDetail', './/m:OrderDetail')
+_ORGANIZATION_NAME = utils.ElementPath('m:OrganizationName')
+_ORGANIZATION_CITY = utils.ElementPath('m:OrganizationAddress/m:City')
+_ORGANIZATION_REGION = utils.ElementPath('m:OrganizationAddress/m:Region')
+_ORGANIZATION_COUNTRY = utils.ElementPath('m:OrganizationAddress/m:Country')
+
+_COMMON_NAME = utils.ElementPath('m:CommonName')
+_CERTIFICATE_STATUS = utils.ElementPath('m:CertificateStatus')
+_HASH_ALGORITHM = utils.ElementPath('m:AlgorithmInfo/m:SignatureHashAlgorithm')
+_ENCRYPTION_ALGORITHM = utils.ElementPath(
+    'm:AlgorithmInfo/m:SignatureEncryptionAlgorithm'
+)
+
+_SERVER_CERTIFICATE = utils.ElementPath('m:ServerCertificate')
+_CA_CERTIFICATES = utils.ElementPath('m:CACertificates')
+_CA_CERTIFICATE_TYPE = utils.ElementPath('m:Type')
+_CA_CERTIFICATE = utils.ElementPath('m:CACert')
+
+_MODIFICATION_EVENT = utils.ElementPath('m:ModificationEvent')
+_MODIFICATION_EVENT_ID = utils.ElementPath('m:ModificationEventID')
+_MODIFICATION_EVENT_NAME = utils.ElementPath('m:ModificationEventName')
+_MODIFICATION_TIMESTAMP = utils.ElementPath('m:ModificationTimestamp')
+
+
+# Order responses are small, they are searched from the envelope.
+_ORDER_GEOTRUST_ORDER_ID = utils.ElementPath(
+    './/m:GeoTrustOrderID', namespaces=utils.ONS
+)
+_ORDER_PARTNER_ORDER_ID = utils.ElementPath(
+    './/m:PartnerOrderID', namespaces=utils.ONS
+)
+_SUCCESS_CODE = utils.ElementPath('.//m:SuccessCode', namespaces=utils.ONS)
+_TIMESTAMP = utils.ElementPath('.//m:Timestamp', namespaces=utils.ONS)
+
+
+class Projection(object):
+    """Subset of the order detail attributes to deserialize.
+
+    Attributes are named by their path from OrderDetail, for instance
+    status_code, organization_contacts.admin.email, or modified_events for a
+    whole section. contacts can be used for organization_contacts.
+    Attributes left out keep the default value of their model.
+
+    :param fields: iterable of attribute paths
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+
+        paths = set()
+        for field in self.fields:
+            path = tuple(field.split('.'))
+            path = (_FIELD_ALIASES.get(path[0], path[0]),) + path[1:]
+            if path not in _ORDER_DETAIL_FIELD_PATHS:
+                raise ValueError("Unknown order detail field: %s" % field)
+            paths.add(path)
+
+        # Normalized attribute paths, aliases resolved
+        self.paths = frozenset(paths)
+        # Top level OrderDetail attributes read by the projection
+        self.attributes = frozenset(path[0] for path in paths)
+        self.scope = _project(_ORDER_DETAIL_SCOPE, paths)
 
 
 class OrderDetails(list):
+    __slots__ = ()
 
     def __init__(self, details_to_add=[]):
         self.extend(details_to_add)
 
     @classmethod
-    def deserialize(cls, xml_node):
+    def deserialize(cls, xml_node, projection=None, pool=None):
         """ Deserializes order details section in response.
 
         :param xml_node: XML node to be parsed. Expected to explicitly be
         Order Details XML node.
+        :param projection: optional Projection of the attributes to
+        deserialize
+        :param pool: optional StringPool deduplicating the field values
         :return: details in order detail section.
         """
-        details = [OrderDetail.deserialize(node) for node in
-                   xml_node.findall('.//m:OrderDetail', utils.NS)]
+        details = [OrderDetail.deserialize(node, projection, pool) for node in
+                   _ORDER_DETAILS.findall(xml_node)]
+        return OrderDetails(details)
+
+    @classmethod
+    def deserialize_lazy(cls, xml_node):
+        """Wraps each order detail in a LazyOrderDetail.
+
+        :param xml_node: XML node to be parsed. Expected to explicitly be
+        Order Details XML node.
+        :return: lazily deserialized details in order detail section.
+        """
+        details = [LazyOrderDetail(node) for node in
+                   _ORDER_DETAILS.findall(xml_node)]
         return OrderDetails(details)
 
 
 class OrderDetail(object):
+    """Order detail returned by the queries.
+
+    Deserialization walks the order detail subtree once, dispatching every
+    element on its tag, see _walk.
+
+    Instances, like the other response models, use __slots__ rather than a
+    __dict__ so that large result sets stay compact in memory.
+    """
+
+    __slots__ = (
+        'partner_order_id', 'geotrust_order_id', 'status_code', 'status_name',
+        'status_message', 'organization_info', 'organization_contacts',
+        'modified_events', 'vulnerabilities', 'approver_email'
+    )
 
     def __init__(self):
+        self.partner_order_id = ''
+        self.geotrust_order_id = ''
         self.status_code = ''
+        self.status_name = ''
         self.status_message = ''
         self.organization_info = OrganizationInfo()
         self.organization_contacts = OrderContacts()
@@ -34,51 +132,91 @@ class OrderDetail(object):
         self.approver_email = ''
 
     @classmethod
-    def deserialize(cls, xml_node):
+    def deserialize(cls, xml_node, projection=None, pool=None):
         """Deserializes the order detail section in response.
 
         :param xml_node: XML node to be parsed. Expected to explicitly be
         Order Detail XML node.
+        :param projection: optional Projection of the attributes to
+        deserialize
+        :param pool: optional StringPool deduplicating the field values
         :return: parsed order detail response.
         """
+        scope = _ORDER_DETAIL_SCOPE
+        if projection is not None:
+            scope = projection.scope
+
         od = OrderDetail()
+        for field in scope.fields:
+            setattr(od, field, "None")
 
-        od.status_code = utils.get_element_text(
-            xml_node.find('.//m:OrderStatusMinorCode', utils.NS)
-        )
-        od.status_name = utils.get_element_text(
-            xml_node.find('.//m:OrderStatusMinorName', utils.NS)
-        )
-        od.approver_email = utils.get_element_text(
-            xml_node.find('.//m:ApproverEmailAddress', utils.NS)
-        )
+        # Whole responses are accepted as well as the order detail node.
+        order_node = _ORDER_DETAIL.find(xml_node)
+        if order_node is not None:
+            _walk(order_node, od, scope, pool)
 
-        # Deserialize Child nodes
-        org_info_node = xml_node.find('.//m:OrganizationInfo', utils.NS)
-        org_contacts_node = xml_node.find('.//m:OrderContacts', utils.NS)
-        od.organization_info = OrganizationInfo.deserialize(org_info_node)
-        od.organization_contacts = OrderContacts.deserialize(org_contacts_node)
+        return od
 
-        if xml_node.find('.//m:ModificationEvents', utils.NS) is not None:
-            mod_events_node = xml_node.find(
-                './/m:ModificationEvents', utils.NS
-            )
-            od.modified_events = (
-                ModificationEvents.deserialize(mod_events_node)
-            )
+    @classmethod
+    def deserialize_lazy(cls, xml_node):
+        """Wraps the order detail section in a LazyOrderDetail.
 
-        if xml_node.find('.//m:Vulnerabilities', utils.NS) is not None:
-            vulnerability_node = xml_node.find(
-                './/m:Vulnerabilities', utils.NS
-            )
-            od.vulnerabilities = (
-                Vulnerabilities.deserialize(vulnerability_node)
-            )
+        :param xml_node: XML node to be parsed. Expected to explicitly be
+        Order Detail XML node.
+        :return: lazily deserialized order detail response.
+        """
+        order_node = _ORDER_DETAIL.find(xml_node)
+        if order_node is None:
+            order_node = xml_node
+        return LazyOrderDetail(order_node)
 
-        return od
+
+class LazyOrderDetail(OrderDetail):
+    """Order detail deserialized on first access to each attribute.
+
+    Holds the order detail node and only deserializes a field or section,
+    such as status_code or organization_contacts, when it is first read. The
+    result is memoized on the instance. The node, and so the whole response
+    document, is kept alive as long as the instance.
+
+    Pickling a LazyOrderDetail, for instance in an OrderStore, stores a
+    fully deserialized OrderDetail.
+
+    :param xml_node: Order Detail XML node
+    """
+
+    __slots__ = ('_xml_node',)
+
+    def __init__(self, xml_node):
+        # OrderDetail.__init__ is not called, the attributes it sets are
+        # deserialized on access instead.
+        self._xml_node = xml_node
+        self.status_message = ''
+
+    def __getattr__(self, name):
+        loader = _LAZY_LOADERS.get(name)
+        if loader is None:
+            raise AttributeError(name)
+
+        value = loader(self._xml_node)
+        setattr(self, name, value)
+        return value
+
+    def __reduce__(self):
+        # The node can not be pickled, a plain OrderDetail is pickled instead.
+        state = self.materialize().__reduce_ex__(2)[2]
+        return OrderDetail.__new__, (OrderDetail,), state
+
+    def materialize(self):
+        """Deserializes every attribute at once.
+
+        :return: OrderDetail
+        """
+        return OrderDetail.deserialize(self._xml_node)
 
 
 class OrganizationInfo(object):
+    __slots__ = ('name', 'city', 'region', 'country')
 
     def __init__(self):
         self.name = ''
@@ -96,23 +234,18 @@ class OrganizationInfo(object):
         :return: parsed organization information response.
         """
         org_info = OrganizationInfo()
-        org_info.name = utils.get_element_text(
-            xml_node.find('.//m:OrganizationName', utils.NS)
-        )
-        org_info.city = utils.get_element_text(
-            xml_node.find('.//m:City', utils.NS)
-        )
-        org_info.region = utils.get_element_text(
-            xml_node.find('.//m:Region', utils.NS)
-        )
-        org_info.country = utils.get_element_text(
-            xml_node.find('.//m:Country', utils.NS)
-        )
+        org_info.name = _ORGANIZATION_NAME.text(xml_node)
+        org_info.city = _ORGANIZATION_CITY.text(xml_node)
+        org_info.region = _ORGANIZATION_REGION.text(xml_node)
+        org_info.country = _ORGANIZATION_COUNTRY.text(xml_node)
 
         return org_info
 
 
 class CertificateInfo(object):
+    __slots__ = (
+        'common_name', 'status', 'hash_algorithm', 'encryption_algorithm'
+    )
 
     def __init__(self):
         self.common_name = ''
@@ -129,75 +262,73 @@ class CertificateInfo(object):
         :return: parsed certificate information response.
         """
         cert_info = CertificateInfo()
-        cert_info.common_name = utils.get_element_text(
-            xml_node.find('.//m:CommonName', utils.NS)
-        )
-        cert_info.status = utils.get_element_text(
-            xml_node.find('.//m:CertificateStatus', utils.NS)
-        )
-        cert_info.hash_algorithm = utils.get_element_text(
-            xml_node.find('.//m:SignatureHashAlgorithm', utils.NS)
-        )
-        cert_info.encryption_algorithm = utils.get_element_text(
-            xml_node.find('.//m:SignatureEncryptionAlgorithm', utils.NS)
-        )
+        cert_info.common_name = _COMMON_NAME.text(xml_node)
+        cert_info.status = _CERTIFICATE_STATUS.text(xml_node)
+        cert_info.hash_algorithm = _HASH_ALGORITHM.text(xml_node)
+        cert_info.encryption_algorithm = _ENCRYPTION_ALGORITHM.text(xml_node)
 
         return cert_info
 
 
 class Certificate(object):
+    __slots__ = ('server_cert', 'intermediates')
 
     def __init__(self):
         self.server_cert = ''
         self.intermediates = []
 
     @classmethod
-    def deserialize(cls, xml_node):
+    def deserialize(cls, xml_node, pool=None):
         """Deserializes the certificate section in the response.
 
         :param xml_node:XML node to be parsed. Expected to explicitly be
         Certificates XML node.
+        :param pool: optional StringPool deduplicating the intermediate
+        certificates
         :return: parsed certificate response.
         """
         cert = Certificate()
-        cert.server_cert = utils.get_element_text(
-            xml_node.find('.//m:ServerCertificate', utils.NS)
-        )
-        ca_certs = xml_node.find('.//m:CACertificates', utils.NS)
+        cert.server_cert = _SERVER_CERTIFICATE.text(xml_node)
+        ca_certs = _CA_CERTIFICATES.find(xml_node)
 
         for x in ca_certs:
-            cert.intermediates.append(IntermediateCertificate.deserialize(x))
+            cert.intermediates.append(
+                IntermediateCertificate.deserialize(x, pool)
+            )
 
         return cert
 
 
 class IntermediateCertificate(object):
+    __slots__ = ('type', 'cert')
 
     def __init__(self):
         self.type = ''
         self.cert = ''
 
     @classmethod
-    def deserialize(cls, xml_node):
+    def deserialize(cls, xml_node, pool=None):
         """Deserializes the intermediate certificates section in the response.
 
         :param xml_node: XML node to be parsed. Expected to explicitly be
         Intermediate Certificate XML node.
+        :param pool: optional StringPool deduplicating the certificate, which
+        is usually shared by many orders
         :return: parsed intermediate certificate response.
         """
 
         inter_info = IntermediateCertificate()
-        inter_info.type = utils.get_element_text(
-            xml_node.find('.//m:Type', utils.NS)
-        )
-        inter_info.cert = utils.get_element_text(
-            xml_node.find('.//m:CACert', utils.NS)
-        )
+        inter_info.type = _CA_CERTIFICATE_TYPE.text(xml_node)
+        inter_info.cert = _CA_CERTIFICATE.text(xml_node)
+        if pool is not None:
+            inter_info.type = pool(inter_info.type)
+            inter_info.cert = pool(inter_info.cert)
 
         return inter_info
 
 
 class ModificationEvents(list):
+    __slots__ = ()
 
     def __init__(self, details_to_add=[]):
         self.extend(details_to_add)
@@ -215,11 +346,13 @@ class ModificationEvents(list):
         response.
         """
         details = [ModificationEvent.deserialize(node) for node in
-                   xml_node.findall('.//m:ModificationEvent', utils.NS)]
+                   _MODIFICATION_EVENT.findall(xml_node)]
         return ModificationEvents(details)
 
 
 class ModificationEvent(object):
+    __slots__ = ('event_name', 'time_stamp', 'mod_id')
+
     def __init__(self):
         self.event_name = ''
         self.time_stamp = ''
@@ -235,63 +368,31 @@ class ModificationEvent(object):
         """
         me = ModificationEvent()
 
-        me.mod_id = utils.get_element_text(
-            xml_node.find('.//m:ModificationEventID', utils.NS)
-        )
-        me.event_name = utils.get_element_text(
-            xml_node.find('.//m:ModificationEventName', utils.NS)
-        )
-        me.time_stamp = utils.get_element_text(
-            xml_node.find('.//m:ModificationTimestamp', utils.NS)
-        )
+        me.mod_id = _MODIFICATION_EVENT_ID.text(xml_node)
+        me.event_name = _MODIFICATION_EVENT_NAME.text(xml_node)
+        me.time_stamp = _MODIFICATION_TIMESTAMP.text(xml_node)
 
         return me
 
 
 class Vulnerabilities(list):
+    __slots__ = ()
 
     def __init__(self, details_to_add=[]):
         self.extend(details_to_add)
 
-    @classmethod
-    def deserialize(cls, xml_node):
-        """Deserializes the Vulnerabilities section in the response.
-
-        :param xml_node: XML node to be parsed. Expected to explicitly be
-        Vulnerabilities XML node.
-        :return: parsed vulnerabilities response.
-        """
-        details = [Vulnerability.deserialize(node) for node in
-                   xml_node.findall('.//m:Vulnerability', utils.NS)]
-        return Vulnerabilities(details)
-
 
 class Vulnerability(object):
+    __slots__ = ('severity', 'number_found')
+
     def __init__(self):
         self.severity = ''
         self.number_found = ''
 
-    @classmethod
-    def deserialize(cls, xml_node):
-        """ Deserializes the vulnerability section in the response.
-
-        :param xml_node: XML node to be parsed. Expected to explicitly be
-        Vulnerability XML node.
-        :return: parsed vulnerability response.
-        """
-        vuln = Vulnerability()
-
-        vuln.mod_id = utils.get_element_text(
-            xml_node.find('.//m:Severity', utils.NS)
-        )
-        vuln.event_name = utils.get_element_text(
-            xml_node.find('.//m:NumberFound', utils.NS)
-        )
-
-        return vuln
-
 
 class QuickOrderResponse(object):
+    __slots__ = ('result',)
+
     def __init__(self):
         self.result = QuickOrderResult()
 
@@ -303,6 +404,8 @@ class QuickOrderResponse(object):
 
 
 class QuickOrderResult(object):
+    __slots__ = ('order_id', 'order_response')
+
     def __init__(self):
         self.order_id = ''
         self.order_response = OrderResponseHeader()
@@ -310,15 +413,15 @@ class QuickOrderResult(object):
     @classmethod
     def deserialize(cls, xml_node):
         result = QuickOrderResult()
-        result.order_id = utils.get_element_text(
-            xml_node.find('.//m:GeoTrustOrderID', utils.ONS)
-        )
+        result.order_id = _ORDER_GEOTRUST_ORDER_ID.text(xml_node)
         result.order_response = OrderResponseHeader.deserialize(xml_node)
 
         return result
 
 
 class OrderResponseHeader(object):
+    __slots__ = ('partner_order_id', 'success_code', 'timestamp')
+
     def __init__(self):
         self.partner_order_id = ''
         self.success_code = ''
@@ -327,20 +430,18 @@ class OrderResponseHeader(object):
     @classmethod
     def deserialize(cls, xml_node):
         order_response = OrderResponseHeader()
-        order_response.partner_order_id = utils.get_element_text(
-            xml_node.find('.//m:PartnerOrderID', utils.ONS)
-        )
-        order_response.success_code = utils.get_element_text(
-            xml_node.find('.//m:SuccessCode', utils.ONS)
-        )
-        order_response.timestamp = utils.get_element_text(
-            xml_node.find('.//m:Timestamp', utils.ONS)
+        order_response.partner_order_id = (
+            _ORDER_PARTNER_ORDER_ID.text(xml_node)
         )
+        order_response.success_code = _SUCCESS_CODE.text(xml_node)
+        order_response.timestamp = _TIMESTAMP.text(xml_node)
 
         return order_response
 
 
 class ReissueResponse(object):
+    __slots__ = ('result',)
+
     def __init__(self):
         self.result = ReissueResult()
 
@@ -358,6 +459,8 @@ class ReissueResponse(object):
 
 
 class ReissueResult(object):
+    __slots__ = ('order_response',)
+
     def __init__(self):
         self.order_response = OrderResponseHeader()
 
@@ -372,3 +475,282 @@ class ReissueResult(object):
         result = ReissueResult()
         result.order_response = OrderResponseHeader.deserialize(xml_node)
         return result
+
+
+# Handler of the elements left out by a Projection.
+_SKIP = object()
+
+
+class _Section(object):
+    """Handler of an element describing a model.
+
+    :param scope: _Scope of the element children
+    :param cls: model created for the element, None for wrapper elements
+    whose fields are set on the parent model
+    :param attribute: attribute of the parent model set to the new model,
+    None to append the new model to the parent list
+    """
+
+    def __init__(self, scope, cls=None, attribute=None):
+        self.scope = scope
+        self.cls = cls
+        self.attribute = attribute
+
+    def enter(self, target):
+        """Creates the model of the element.
+
+        :param target: parent model
+        :return: model filled from the element children
+        """
+        if self.cls is None:
+            return target
+
+        model = self.cls()
+        for field in self.scope.fields:
+            setattr(model, field, "None")
+        if self.attribute is None:
+            target.append(model)
+        else:
+            setattr(target, self.attribute, model)
+        return model
+
+
+class _Scope(dict):
+    """Handler table of the elements found below a model.
+
+    Maps element names to either the attribute set to the element text, a
+    _Section or _SKIP.
+
+    :param handlers: dict of handlers by element name, with or without
+    namespace
+    """
+
+    def __init__(self, handlers):
+        super(_Scope, self).__init__(
+            (name if name.startswith('{') else
+             '{%s}%s' % (utils.NS['m'], name), handler)
+            for name, handler in handlers.items()
+        )
+        # Fields set to "None" when the model is created.
+        self.fields = []
+        for handler in handlers.values():
+            if isinstance(handler, _Section):
+                if handler.cls is None:
+                    self.fields.extend(handler.scope.fields)
+            elif handler is not _SKIP:
+                self.fields.append(handler)
+
+
+def _walk(xml_node, target, scope, pool=None):
+    """Deserializes a subtree into a model in a single pass.
+
+    Every element is visited at most once. Elements without handler are
+    walked through with the scope of their parent, so fields nested deeper
+    than the schema says are still found.
+
+    :param xml_node: XML node to be parsed
+    :param target: model filled from the node
+    :param scope: _Scope of the node children
+    :param pool: optional StringPool deduplicating the field values
+    """
+    stack = [(xml_node, target, scope)]
+    while stack:
+        xml_node, target, scope = stack.pop()
+        for child in xml_node:
+            handler = scope.get(child.tag)
+            if handler is None:
+                if len(child):
+                    stack.append((child, target, scope))
+            elif isinstance(handler, _Section):
+                stack.append((child, handler.enter(target), handler.scope))
+            elif handler is _SKIP:
+                continue
+            elif pool is None:
+                setattr(target, handler, child.text)
+            else:
+                setattr(target, handler, pool(child.text))
+
+
+def _field_paths(scope, prefix=()):
+    """Lists the attribute paths a scope deserializes.
+
+    :param scope: _Scope to list, not restricted by a projection
+    :param prefix: attribute path of the scope model
+    :return: set of attribute paths as tuples, sections included
+    """
+    paths = set()
+    for handler in scope.values():
+        if isinstance(handler, _Section):
+            section_prefix = prefix
+            if handler.attribute is not None:
+                section_prefix = prefix + (handler.attribute,)
+                paths.add(section_prefix)
+            paths.update(_field_paths(handler.scope, section_prefix))
+        else:
+            paths.add(prefix + (handler,))
+    return paths
+
+
+def _project(scope, paths):
+    """Restricts a scope to the given attribute paths.
+
+    Handlers outside of the paths are replaced by _SKIP, so the elements
+    they handle are neither deserialized nor walked through.
+
+    :param scope: _Scope to restrict
+    :param paths: set of attribute paths as tuples, relative to the scope
+    :return: restricted _Scope
+    """
+    handlers = {}
+    for tag, handler in scope.items():
+        if isinstance(handler, _Section):
+            if handler.attribute is None:
+                child_paths = paths
+            elif (handler.attribute,) in paths:
+                handlers[tag] = handler
+                continue
+            else:
+                child_paths = set(
+                    path[1:] for path in paths
+                    if path[0] == handler.attribute
+                )
+
+            child_scope = _project(handler.scope, child_paths)
+            if any(h is not _SKIP for h in child_scope.values()):
+                handlers[tag] = _Section(
+                    child_scope, handler.cls, handler.attribute
+                )
+            else:
+                handlers[tag] = _SKIP
+        elif (handler,) in paths:
+            handlers[tag] = handler
+        else:
+            handlers[tag] = _SKIP
+    return _Scope(handlers)
+
+
+_CONTACT_SCOPE = _Scope({
+    'FirstName': 'first_name',
+    'LastName': 'last_name',
+    'Phone': 'phone',
+    'Email': 'email',
+    'Title': 'title',
+})
+
+_ORGANIZATION_INFO_SCOPE = _Scope({
+    'OrganizationName': 'name',
+    'City': 'city',
+    'Region': 'region',
+    'Country': 'country',
+})
+
+_ORDER_CONTACTS_SCOPE = _Scope({
+    'AdminContact': _Section(_CONTACT_SCOPE, ContactInfo, 'admin'),
+    'TechContact': _Section(_CONTACT_SCOPE, ContactInfo, 'tech'),
+    'BillingContact': _Section(_CONTACT_SCOPE, ContactInfo, 'billing'),
+})
+
+_MODIFICATION_EVENT_SCOPE = _Scope({
+    'ModificationEventID': 'mod_id',
+    'ModificationEventName': 'event_name',
+    'ModificationTimestamp': 'time_stamp',
+})
+
+_MODIFICATION_EVENTS_SCOPE = _Scope({
+    'ModificationEvent': _Section(
+        _MODIFICATION_EVENT_SCOPE, ModificationEvent
+    ),
+})
+
+_VULNERABILITY_SCOPE = _Scope({
+    'Severity': 'severity',
+    'NumberFound': 'number_found',
+})
+
+_VULNERABILITIES_SCOPE = _Scope({
+    'Vulnerability': _Section(_VULNERABILITY_SCOPE, Vulnerability),
+})
+
+_ORDER_INFO_SCOPE = _Scope({
+    'PartnerOrderID': 'partner_order_id',
+    'GeoTrustOrderID': 'geotrust_order_id',
+})
+
+_ORDER_STATUS_SCOPE = _Scope({
+    'OrderStatusMinorCode': 'status_code',
+    'OrderStatusMinorName': 'status_name',
+})
+
+_ORDER_DETAIL_SCOPE = _Scope({
+    'OrderInfo': _Section(_ORDER_INFO_SCOPE),
+    'OrderStatusMinor': _Section(_ORDER_STATUS_SCOPE),
+    'ApproverEmailAddress': 'approver_email',
+    'OrganizationInfo': _Section(
+        _ORGANIZATION_INFO_SCOPE, OrganizationInfo, 'organization_info'
+    ),
+    'OrderContacts': _Section(
+        _ORDER_CONTACTS_SCOPE, OrderContacts, 'organization_contacts'
+    ),
+    'ModificationEvents': _Section(
+        _MODIFICATION_EVENTS_SCOPE, ModificationEvents, 'modified_events'
+    ),
+    'Vulnerabilities': _Section(
+        _VULNERABILITIES_SCOPE, Vulnerabilities, 'vulnerabilities'
+    ),
+})
+
+_ORDER_DETAIL_FIELD_PATHS = frozenset(_field_paths(_ORDER_DETAIL_SCOPE))
+
+# Shorter names accepted by Projection.
+_FIELD_ALIASES = {
+    'contacts': 'organization_contacts',
+}
+
+
+def _lazy_section(path, cls, scope):
+    def load(xml_node):
+        section_node = path.find(xml_node)
+        if section_node is None:
+            return cls()
+
+        model = cls()
+        for field in scope.fields:
+            setattr(model, field, "None")
+        _walk(section_node, model, scope)
+        return model
+    return load
+
+
+_LAZY_LOADERS = {
+    'partner_order_id': utils.ElementPath(
+        'm:OrderInfo/m:PartnerOrderID', './/m:OrderInfo/m:PartnerOrderID'
+    ).text,
+    'geotrust_order_id': utils.ElementPath(
+        'm:OrderInfo/m:GeoTrustOrderID', './/m:OrderInfo/m:GeoTrustOrderID'
+    ).text,
+    'status_code': utils.ElementPath(
+        'm:QuickOrderDetail/m:OrderStatusMinor/m:OrderStatusMinorCode'
+    ).text,
+    'status_name': utils.ElementPath(
+        'm:QuickOrderDetail/m:OrderStatusMinor/m:OrderStatusMinorName'
+    ).text,
+    'approver_email': utils.ElementPath(
+        'm:QuickOrderDetail/m:ApproverEmailAddress'
+    ).text,
+    'organization_info': _lazy_section(
+        utils.ElementPath('m:QuickOrderDetail/m:OrganizationInfo'),
+        OrganizationInfo, _ORGANIZATION_INFO_SCOPE
+    ),
+    'organization_contacts': _lazy_section(
+        utils.ElementPath('m:OrderContacts'), OrderContacts,
+        _ORDER_CONTACTS_SCOPE
+    ),
+    'modified_events': _lazy_section(
+        utils.ElementPath('m:ModificationEvents'), ModificationEvents,
+        _MODIFICATION_EVENTS_SCOPE
+    ),
+    'vulnerabilities': _lazy_section(
+        utils.ElementPath('m:Vulnerabilities'), Vulnerabilities,
+        _VULNERABILITIES_SCOPE
+    ),
+}
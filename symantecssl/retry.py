@@ -0,0 +1,71 @@
+from __future__ import absolute_import, division, print_function
+import random
+
+
+class RetryPolicy(object):
+    """Retry policy with exponential backoff and jitter.
+
+    By default only idempotent requests, the queries, are retried. Orders
+    such as QuickOrderRequest and Reissue are only retried when
+    retry_non_idempotent is set, as a retried order may be placed twice.
+
+    :param max_attempts: maximum number of attempts, including the first one
+    :param backoff_factor: delay in seconds before the first retry. The delay
+    doubles on every following retry.
+    :param max_backoff: upper bound in seconds of a single delay
+    :param jitter: whether to pick each delay uniformly between zero and the
+    exponential delay, which spreads retries from concurrent callers
+    :param deadline: optional total number of seconds after which no retry is
+    attempted
+    :param retry_statuses: HTTP status codes that are retried
+    :param retry_non_idempotent: whether to also retry order requests
+    """
+
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=30,
+                 jitter=True, deadline=None,
+                 retry_statuses=(500, 502, 503, 504),
+                 retry_non_idempotent=False):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_non_idempotent = retry_non_idempotent
+
+    def backoff(self, attempt):
+        """Returns the delay before the next attempt.
+
+        :param attempt: number of attempts made so far
+        :return: delay in seconds
+        """
+        delay = min(
+            self.max_backoff, self.backoff_factor * (2 ** (attempt - 1))
+        )
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def next_delay(self, request_model, attempt, elapsed, status_code=None):
+        """Decides whether a failed attempt is retried.
+
+        :param request_model: request model instance that failed
+        :param attempt: number of attempts made so far
+        :param elapsed: seconds spent since the first attempt
+        :param status_code: HTTP status code of the failed attempt, None
+        when the connection failed or timed out
+        :return: delay in seconds before retrying, or None to give up
+        """
+        if attempt >= self.max_attempts:
+            return None
+        idempotent = getattr(request_model, 'idempotent', False)
+        if not (idempotent or self.retry_non_idempotent):
+            return None
+        if status_code is not None and status_code not in self.retry_statuses:
+            return None
+
+        delay = self.backoff(attempt)
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return None
+
+        return delay
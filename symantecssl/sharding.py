@@ -0,0 +1,178 @@
+from __future__ import absolute_import, division, print_function
+import copy
+import datetime
+
+from concurrent import futures
+
+import requests
+
+from symantecssl.order import FailedRequest, get_default_client
+from symantecssl.request_models import GetModifiedOrderRequest
+from symantecssl.response_models import ModificationEvents, OrderDetails
+
+
+def split_time_frame(from_date, to_date, window):
+    """Splits a date range into consecutive sub-windows.
+
+    :param from_date: start of the range, a datetime object
+    :param to_date: end of the range, a datetime object
+    :param window: maximum length of each sub-window, a timedelta object
+    :return: list of (from_date, to_date) tuples covering the whole range
+    """
+    if window <= datetime.timedelta(0):
+        raise ValueError("window must be a positive timedelta")
+
+    windows = []
+    start = from_date
+    while start < to_date:
+        end = min(start + window, to_date)
+        windows.append((start, end))
+        start = end
+
+    return windows
+
+
+def _merge_events(earlier, later):
+    """Merges the modification events of an order returned by two windows.
+
+    :param earlier: ModificationEvents from the earlier window
+    :param later: ModificationEvents from the later window
+    :return: ModificationEvents de-duplicated by event ID, in window order
+    """
+    merged = ModificationEvents()
+    seen = set()
+    for event in list(earlier) + list(later):
+        key = event.mod_id
+        if key in ('', 'None'):
+            key = (event.event_name, event.time_stamp)
+        if key not in seen:
+            seen.add(key)
+            merged.append(event)
+
+    return merged
+
+
+def _merge_order_details(results):
+    """Merges order details from several windows into one OrderDetails.
+
+    Orders appearing in more than one window are de-duplicated, keeping the
+    detail from the latest window as it reflects the most recent state,
+    along with the modification events returned by every window.
+
+    :param results: list of (window, OrderDetails) tuples
+    :return: merged OrderDetails
+    """
+    merged = {}
+    unkeyed = []
+    for _, details in sorted(results, key=lambda result: result[0]):
+        for detail in details:
+            key = detail.partner_order_id
+            if key in ('', 'None'):
+                key = detail.geotrust_order_id
+            if key in ('', 'None'):
+                unkeyed.append(detail)
+                continue
+
+            previous = merged.pop(key, None)
+            if previous is not None:
+                detail.modified_events = _merge_events(
+                    previous.modified_events, detail.modified_events
+                )
+            merged[key] = detail
+
+    return OrderDetails(list(merged.values()) + unkeyed)
+
+
+def _can_retry(error):
+    """Tells whether a failed window may succeed once it is split.
+
+    Timeouts, connection errors and server errors are worth a smaller
+    window; any other error, such as rejected credentials, is not.
+
+    :param error: exception raised while querying a window
+    :return: True when the window should be split and queried again
+    """
+    if isinstance(error, FailedRequest):
+        return error.status_code is None or error.status_code >= 500
+    return isinstance(error, (requests.Timeout, requests.ConnectionError))
+
+
+def get_modified_orders(
+        endpoint, credentials, from_date, to_date,
+        window=datetime.timedelta(days=1), workers=4,
+        min_window=datetime.timedelta(minutes=15), max_orders=None,
+        query_options=None, client=None
+):
+    """Retrieves modified orders for a large date range in parallel.
+
+    The range is split into sub-windows which are queried concurrently on a
+    pool of worker threads. A sub-window is split in half and queried again
+    when its request times out, cannot connect or fails with a server error,
+    or when it returns at least max_orders orders, until it would become
+    shorter than min_window. Any other failure is raised at once and the
+    windows still pending are dropped.
+
+    :param endpoint: Symantec query endpoint
+    :param credentials: Symantec specific credentials, see post_request
+    :param from_date: start of the range, a datetime object
+    :param to_date: end of the range, a datetime object
+    :param window: initial length of each sub-window, a timedelta object
+    :param workers: number of requests run concurrently
+    :param min_window: sub-windows are never split below this length
+    :param max_orders: optional number of orders above which a sub-window is
+    considered too large and split again
+    :param query_options: optional OrderQueryOptions used for every request
+    :param client: optional SymantecClient, defaults to the shared client
+    :return: merged and de-duplicated OrderDetails
+    """
+    client = client or get_default_client()
+
+    def query(start, end):
+        request_model = GetModifiedOrderRequest()
+        request_model.set_time_frame(start, end)
+        if query_options is not None:
+            request_model.query_options = copy.copy(query_options)
+        return client.post(endpoint, request_model, credentials).model
+
+    def can_split(start, end):
+        return end - start >= 2 * min_window
+
+    def split(start, end):
+        middle = start + (end - start) // 2
+        return [(start, middle), (middle, end)]
+
+    results = []
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = dict(
+            (executor.submit(query, start, end), (start, end))
+            for start, end in split_time_frame(from_date, to_date, window)
+        )
+
+        while pending:
+            done, _ = futures.wait(
+                pending, return_when=futures.FIRST_COMPLETED
+            )
+            for future in done:
+                start, end = pending.pop(future)
+                try:
+                    details = future.result()
+                except (FailedRequest, requests.RequestException) as error:
+                    if not (_can_retry(error) and can_split(start, end)):
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    sub_windows = split(start, end)
+                else:
+                    too_large = (
+                        max_orders is not None and len(details) >= max_orders
+                    )
+                    if not (too_large and can_split(start, end)):
+                        results.append(((start, end), details))
+                        continue
+                    sub_windows = split(start, end)
+
+                for sub_start, sub_end in sub_windows:
+                    future = executor.submit(query, sub_start, sub_end)
+                    pending[future] = (sub_start, sub_end)
+
+    return _merge_order_details(results)
@@ -0,0 +1,209 @@
+from __future__ import absolute_import, division, print_function
+import pickle
+import sqlite3
+import threading
+import time
+
+from symantecssl import utils
+from symantecssl.order import get_default_client
+from symantecssl.request_models import GetOrderByPartnerOrderID
+
+
+def _latest_modification(detail):
+    """Returns the latest modification timestamp of an order detail.
+
+    :param detail: OrderDetail to inspect
+    :return: ISO8601 UTC timestamp or None if it has no modification events
+    """
+    latest = None
+    for event in detail.modified_events:
+        try:
+            timestamp = utils.parse_timestamp(event.time_stamp)
+        except ValueError:
+            continue
+        if latest is None or timestamp > latest:
+            latest = timestamp
+
+    return latest.isoformat() if latest is not None else None
+
+
+def _seconds(max_age):
+    if hasattr(max_age, 'total_seconds'):
+        return max_age.total_seconds()
+    return max_age
+
+
+class OrderStore(object):
+    """Local SQLite store of deserialized order details.
+
+    Order details returned by GetModifiedOrders or GetOrderByPartnerOrderID
+    are upserted by partner order ID and indexed by status code, approver
+    email, admin contact email and latest modification timestamp, so that
+    lookups can be served locally instead of through another API call.
+
+    :param path: location of the SQLite database, in memory by default
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS orders ('
+                'partner_order_id TEXT PRIMARY KEY, geotrust_order_id TEXT, '
+                'status_code TEXT, approver_email TEXT, admin_email TEXT, '
+                'modified_at TEXT, stored_at REAL, detail BLOB)'
+            )
+            for column in ('status_code', 'approver_email', 'admin_email',
+                           'modified_at'):
+                self._connection.execute(
+                    'CREATE INDEX IF NOT EXISTS orders_{0} '
+                    'ON orders ({0})'.format(column)
+                )
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM orders'
+            ).fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+    def upsert(self, order_details):
+        """Inserts or replaces order details in the store.
+
+        A stored order detail is only replaced by one modified at the same
+        time or later, so that a stale detail, such as one returned by an
+        older window, never overwrites a newer one. Order details without
+        modification events, such as those returned by
+        GetOrderByPartnerOrderID, always replace the stored one and keep its
+        modification timestamp. Order details without a partner order ID
+        are skipped.
+
+        :param order_details: iterable of OrderDetail, such as OrderDetails
+        :return: number of order details stored
+        """
+        stored_at = time.time()
+        rows = [
+            (detail.partner_order_id, detail.geotrust_order_id,
+             detail.status_code, detail.approver_email,
+             detail.organization_contacts.admin.email,
+             _latest_modification(detail), stored_at,
+             sqlite3.Binary(pickle.dumps(detail, pickle.HIGHEST_PROTOCOL)))
+            for detail in order_details
+            if detail.partner_order_id not in ('', 'None')
+        ]
+
+        stored = 0
+        with self._lock, self._connection:
+            for row in rows:
+                (partner_order_id, geotrust_order_id, status_code,
+                 approver_email, admin_email, modified_at, _, detail) = row
+                cursor = self._connection.execute(
+                    'UPDATE orders SET geotrust_order_id = ?, '
+                    'status_code = ?, approver_email = ?, admin_email = ?, '
+                    'modified_at = COALESCE(?, modified_at), stored_at = ?, '
+                    'detail = ? WHERE partner_order_id = ? AND '
+                    '(? IS NULL OR modified_at IS NULL OR modified_at <= ?)',
+                    (geotrust_order_id, status_code, approver_email,
+                     admin_email, modified_at, stored_at, detail,
+                     partner_order_id, modified_at, modified_at)
+                )
+                if cursor.rowcount == 0:
+                    # Either a new order, or a stale detail left out.
+                    cursor = self._connection.execute(
+                        'INSERT OR IGNORE INTO orders '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', row
+                    )
+                stored += cursor.rowcount
+
+        return stored
+
+    def get(self, partner_order_id, max_age=None):
+        """Looks up an order detail by partner order ID.
+
+        :param partner_order_id: partner order ID of the order
+        :param max_age: optional maximum age, in seconds or as a timedelta,
+        of the stored record. Older records are treated as missing.
+        :return: OrderDetail or None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT stored_at, detail FROM orders '
+                'WHERE partner_order_id = ?', (partner_order_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        stored_at, detail = row
+        if max_age is not None and time.time() - stored_at > _seconds(max_age):
+            return None
+
+        return pickle.loads(bytes(detail))
+
+    def find(self, status_code=None, approver_email=None, admin_email=None,
+             modified_since=None):
+        """Finds order details matching every given criteria.
+
+        :param status_code: order status minor code, e.g. ORDER_COMPLETE
+        :param approver_email: approver email address of the order
+        :param admin_email: email address of the admin contact
+        :param modified_since: datetime, naive in UTC, of the oldest
+        modification to return
+        :return: list of OrderDetail ordered by modification timestamp
+        """
+        clauses = []
+        params = []
+        for column, value in [
+            ('status_code', status_code),
+            ('approver_email', approver_email),
+            ('admin_email', admin_email),
+        ]:
+            if value is not None:
+                clauses.append('{0} = ?'.format(column))
+                params.append(value)
+
+        if modified_since is not None:
+            clauses.append('modified_at >= ?')
+            params.append(modified_since.isoformat())
+
+        query = 'SELECT detail FROM orders'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY modified_at'
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+
+        return [pickle.loads(bytes(row[0])) for row in rows]
+
+    def get_or_fetch(self, partner_order_id, endpoint, credentials,
+                     max_age=None, client=None):
+        """Looks up an order detail locally, falling back to the API.
+
+        The order is retrieved with GetOrderByPartnerOrderID, and stored,
+        when it is missing from the store or older than max_age.
+
+        :param partner_order_id: partner order ID of the order
+        :param endpoint: Symantec query endpoint
+        :param credentials: Symantec specific credentials, see post_request
+        :param max_age: optional maximum age, in seconds or as a timedelta,
+        of the stored record
+        :param client: optional SymantecClient, defaults to the shared client
+        :return: OrderDetail
+        """
+        detail = self.get(partner_order_id, max_age=max_age)
+        if detail is not None:
+            return detail
+
+        request_model = GetOrderByPartnerOrderID()
+        request_model.set_partner_order_id(partner_order_id)
+
+        client = client or get_default_client()
+        detail = client.post(endpoint, request_model, credentials).model
+        self.upsert([detail])
+
+        return detail
@@ -0,0 +1,180 @@
+from __future__ import absolute_import, division, print_function
+import io
+
+from lxml import etree
+
+from symantecssl import utils
+from symantecssl.columns import OrderDetailColumns
+from symantecssl.request_models import Reissue
+from symantecssl.response_models import OrderDetail
+
+ORDER_DETAIL_TAG = '{%s}OrderDetail' % utils.NS['m']
+SOAP_ENVELOPE_TAG = '{%s}Envelope' % utils.SOAP_NS['soap']
+SOAP_BODY_TAG = '{%s}Body' % utils.SOAP_NS['soap']
+
+
+def iter_order_detail_elements(source):
+    """Incrementally parses a response and yields each Order Detail element.
+
+    Every element is cleared once the caller moves on to the next one, and
+    processed siblings are detached from their parent, so only a single
+    Order Detail is held in memory at any time.
+
+    :param source: file-like object or filename holding the response body
+    :return: generator of Order Detail XML nodes
+    """
+    context = etree.iterparse(
+        source, events=('end',), tag=ORDER_DETAIL_TAG,
+        **utils.RESPONSE_PARSER_OPTIONS
+    )
+    for _, element in context:
+        yield element
+
+        element.clear()
+        parent = element.getparent()
+        while element.getprevious() is not None:
+            del parent[0]
+
+    del context
+
+
+def iter_order_details(source, projection=None, pool=None):
+    """Incrementally parses a response and yields deserialized order details.
+
+    This is the streaming counterpart of OrderDetails.deserialize. Peak memory
+    is bounded by the size of a single Order Detail rather than the size of
+    the whole response.
+
+    :param source: file-like object or filename holding the response body
+    :param projection: optional Projection of the attributes to deserialize
+    :param pool: optional StringPool deduplicating the field values across
+    order details
+    :return: generator of OrderDetail objects
+    """
+    for element in iter_order_detail_elements(source):
+        yield OrderDetail.deserialize(element, projection, pool)
+
+
+def read_order_columns(source, projection=None, pool=None):
+    """Incrementally parses a response into an OrderDetailColumns.
+
+    Each Order Detail element is deserialized straight into the columns, no
+    OrderDetail is created.
+
+    :param source: file-like object or filename holding the response body
+    :param projection: optional Projection of the fields to deserialize
+    :param pool: optional StringPool deduplicating the field values
+    :return: OrderDetailColumns
+    """
+    columns = OrderDetailColumns(projection, pool)
+    columns.extend(iter_order_detail_elements(source))
+    return columns
+
+
+def _write_order_change(xf, change_type, new_value=None, old_value=None):
+    """Writes an OrderChange element, as OrderChange.serialize builds it."""
+    with xf.element('OrderChange'):
+        with xf.element('ChangeType'):
+            xf.write(change_type)
+        if new_value:
+            with xf.element('NewValue'):
+                xf.write(new_value)
+        if old_value:
+            with xf.element('OldValue'):
+                xf.write(old_value)
+
+
+def _write_reissue(xf, request_model):
+    """Writes a Reissue request, one OrderChange at a time.
+
+    :param xf: lxml xmlfile writer
+    :param request_model: Reissue instance
+    :return: generator yielding after each part written
+    """
+    with xf.element('Reissue', nsmap=utils.DEFAULT_ONS):
+        with xf.element('Request'):
+            xf.write(request_model.request_header.serialize(order_type=True))
+            xf.write(request_model.order_parameters.serialize())
+            xf.write(request_model.reissue_email.serialize())
+            yield
+
+            changes = request_model.order_changes
+            if changes.has_changes:
+                with xf.element('OrderChanges'):
+                    for san in changes.add:
+                        _write_order_change(xf, 'Add_SAN', new_value=san)
+                        yield
+                    for san in changes.delete:
+                        _write_order_change(xf, 'Delete_SAN', old_value=san)
+                        yield
+                    for old_value, new_value in changes.edit:
+                        _write_order_change(
+                            xf, 'Edit_SAN', new_value, old_value
+                        )
+                        yield
+
+
+def _write_envelope(xf, request_model):
+    """Writes the SOAP envelope of a request.
+
+    Reissue requests are written one OrderChange at a time, other request
+    models are serialized into a tree and written at once.
+
+    :param xf: lxml xmlfile writer
+    :param request_model: request model instance, with credentials set
+    :return: generator yielding after each part written
+    """
+    with xf.element(SOAP_ENVELOPE_TAG, nsmap=utils.SOAP_NS):
+        with xf.element(SOAP_BODY_TAG):
+            if type(request_model) is Reissue:
+                for _ in _write_reissue(xf, request_model):
+                    yield
+            else:
+                xf.write(request_model.serialize())
+                yield
+
+
+def write_request(output, request_model):
+    """Writes the SOAP envelope of a request without building its tree.
+
+    This is the streaming counterpart of serialize_request. The envelope is
+    written compact, order changes of a Reissue are written one at a time, so
+    peak memory does not depend on the number of SANs.
+
+    :param output: file-like object opened for writing bytes, or filename
+    :param request_model: request model instance, with credentials set
+    """
+    with etree.xmlfile(output) as xf:
+        for _ in _write_envelope(xf, request_model):
+            pass
+
+
+class RequestBody(object):
+    """Request body writing the SOAP envelope of a request incrementally.
+
+    Iterating over the body writes the envelope, see write_request, and
+    yields it in chunks, so it can be posted with chunked transfer encoding
+    without holding the whole envelope in memory. Every iteration writes the
+    envelope again, which lets a retried request be sent again.
+
+    :param request_model: request model instance, with credentials set
+    :param chunk_size: minimum size of the chunks yielded, in bytes, except
+    for the last one
+    """
+
+    def __init__(self, request_model, chunk_size=65536):
+        self.request_model = request_model
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        buffer = io.BytesIO()
+        with etree.xmlfile(buffer) as xf:
+            for _ in _write_envelope(xf, self.request_model):
+                xf.flush()
+                if buffer.tell() >= self.chunk_size:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
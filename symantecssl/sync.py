@@ -0,0 +1,252 @@
+from __future__ import absolute_import, division, print_function
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+from symantecssl import utils
+from symantecssl.order import get_default_client
+from symantecssl.request_models import GetModifiedOrderRequest
+from symantecssl.response_models import OrderDetails
+
+
+def _encode_state(watermark, seen_events):
+    return (
+        watermark.isoformat() if watermark is not None else None,
+        dict((event_id, timestamp.isoformat())
+             for event_id, timestamp in seen_events.items())
+    )
+
+
+def _decode_state(watermark, seen_events):
+    return (
+        utils.parse_timestamp(watermark) if watermark is not None else None,
+        dict((event_id, utils.parse_timestamp(timestamp))
+             for event_id, timestamp in seen_events.items())
+    )
+
+
+class WatermarkStore(object):
+    """Persists the high-water mark of an incremental sync.
+
+    The state is the timestamp of the latest modification event seen and the
+    modification events seen within the safety overlap, which are used to drop
+    events that are returned again by the next run.
+    """
+
+    def load(self):
+        """Loads the sync state.
+
+        :return: tuple of (watermark datetime or None, dict mapping seen
+        modification event IDs to their datetime)
+        """
+        raise NotImplementedError
+
+    def save(self, watermark, seen_events):
+        """Saves the sync state.
+
+        :param watermark: naive UTC datetime of the latest event seen
+        :param seen_events: dict mapping modification event IDs to remember
+        to their datetime
+        """
+        raise NotImplementedError
+
+
+class FileWatermarkStore(WatermarkStore):
+    """Watermark store backed by a JSON file.
+
+    :param path: location of the JSON file, created on first save
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None, {}
+
+        with open(self.path, 'r') as f:
+            state = json.load(f)
+
+        return _decode_state(state['watermark'], state['seen_events'])
+
+    def save(self, watermark, seen_events):
+        watermark, seen_events = _encode_state(watermark, seen_events)
+        state = {'watermark': watermark, 'seen_events': seen_events}
+
+        # Write to a temporary file first so a crash never leaves a
+        # truncated state file behind.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        utils.replace_file(tmp_path, self.path)
+
+
+class SQLiteWatermarkStore(WatermarkStore):
+    """Watermark store backed by an SQLite database.
+
+    Several syncs can share a database by using different names.
+
+    :param path: location of the SQLite database
+    :param name: name of the sync this watermark belongs to
+    """
+
+    def __init__(self, path, name='modified_orders'):
+        self.path = path
+        self.name = name
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS watermarks ('
+                'name TEXT PRIMARY KEY, watermark TEXT, seen_events TEXT)'
+            )
+
+    def close(self):
+        self._connection.close()
+
+    def load(self):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT watermark, seen_events FROM watermarks '
+                'WHERE name = ?', (self.name,)
+            ).fetchone()
+
+        if row is None:
+            return None, {}
+
+        return _decode_state(row[0], json.loads(row[1]))
+
+    def save(self, watermark, seen_events):
+        watermark, seen_events = _encode_state(watermark, seen_events)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO watermarks '
+                '(name, watermark, seen_events) VALUES (?, ?, ?)',
+                (self.name, watermark, json.dumps(seen_events))
+            )
+
+
+class IncrementalSync(object):
+    """Retrieves only the orders modified since the previous run.
+
+    Each run requests the changes since the stored watermark minus a small
+    safety overlap, drops the modification events that were already seen and
+    moves the watermark to the latest modification event timestamp. A run
+    seeing no newer event moves the watermark to the end of its range minus
+    the overlap, so that quiet periods are not requested again.
+
+    Every datetime, including the watermark, is a naive datetime in UTC.
+
+    :param endpoint: Symantec query endpoint
+    :param credentials: Symantec specific credentials, see post_request
+    :param store: WatermarkStore holding the sync state
+    :param initial_from_date: naive UTC datetime the very first run starts
+    from
+    :param overlap: timedelta re-requested before the watermark on each run
+    :param query_options: optional OrderQueryOptions used for every request
+    :param client: optional SymantecClient, defaults to the shared client
+    :param listeners: optional callables receiving the OrderDetails of each
+    run, such as CacheInvalidator.consume
+    """
+
+    def __init__(self, endpoint, credentials, store, initial_from_date,
+                 overlap=datetime.timedelta(minutes=5), query_options=None,
+                 client=None, listeners=None):
+        self.endpoint = endpoint
+        self.credentials = credentials
+        self.store = store
+        self.initial_from_date = initial_from_date
+        self.overlap = overlap
+        self.query_options = query_options
+        self.client = client
+        self.listeners = list(listeners or [])
+
+    def _query(self, from_date, to_date):
+        request_model = GetModifiedOrderRequest()
+        request_model.set_time_frame(from_date, to_date)
+        if self.query_options is not None:
+            request_model.query_options = self.query_options
+
+        client = self.client or get_default_client()
+        response = client.post(self.endpoint, request_model, self.credentials)
+        return response.model
+
+    @staticmethod
+    def _new_events(detail, from_date, seen_events):
+        """Returns the modification events of an order not seen before.
+
+        Events older than the requested range were handled by a previous run
+        even if they are no longer remembered.
+
+        :return: list of (event ID, datetime) tuples
+        """
+        new_events = []
+        for event in detail.modified_events:
+            if event.mod_id in seen_events:
+                continue
+            try:
+                timestamp = utils.parse_timestamp(event.time_stamp)
+            except ValueError:
+                continue
+            if timestamp >= from_date:
+                new_events.append((event.mod_id, timestamp))
+
+        return new_events
+
+    def run(self, to_date=None):
+        """Runs one incremental sync.
+
+        :param to_date: end of the requested range as a naive UTC datetime,
+        defaults to datetime.utcnow()
+        :return: OrderDetails for the orders with unseen modification events
+        """
+        watermark, seen_events = self.store.load()
+        if watermark is None:
+            from_date = self.initial_from_date
+        else:
+            from_date = watermark - self.overlap
+        to_date = to_date or datetime.datetime.utcnow()
+
+        advanced = False
+        changed = []
+        for detail in self._query(from_date, to_date):
+            new_events = self._new_events(detail, from_date, seen_events)
+            if detail.modified_events and not new_events:
+                continue
+
+            changed.append(detail)
+            for event_id, timestamp in new_events:
+                seen_events[event_id] = timestamp
+                if watermark is None or timestamp > watermark:
+                    watermark = timestamp
+                    advanced = True
+
+        if not advanced:
+            # Nothing newer was seen up to to_date, except maybe events not
+            # indexed yet, which the next overlap requests again.
+            synced = to_date - self.overlap
+            if watermark is None or synced > watermark:
+                watermark = synced
+
+        # Only the events the next overlap can return again need to be
+        # remembered.
+        horizon = watermark - self.overlap
+        seen_events = dict(
+            (event_id, timestamp)
+            for event_id, timestamp in seen_events.items()
+            if timestamp >= horizon
+        )
+
+        # Listeners run before the watermark moves so that a failing
+        # listener sees the same changes again on the next run.
+        changed = OrderDetails(changed)
+        for listener in self.listeners:
+            listener(changed)
+
+        self.store.save(watermark, seen_events)
+
+        return changed
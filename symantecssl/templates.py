@@ -0,0 +1,477 @@
+"""Precompiled byte templates of the request envelopes.
+
+Building a request envelope with lxml creates every element of the request
+header and query options on each call, although only a few values change
+between calls. The templates below describe the envelope of each request
+model once. They are compiled at import time into static byte chunks and
+value slots, so that rendering a request only escapes and joins its values.
+
+Rendered envelopes are identical to the ones serialized by the request
+models, pretty printed or compact.
+"""
+from __future__ import absolute_import, division, print_function
+import operator
+import re
+
+from symantecssl import utils
+from symantecssl.request_models import (
+    GetModifiedOrderRequest, GetOrderByPartnerOrderID, QuickOrderRequest,
+    Reissue
+)
+
+_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '\r': '&#13;'}
+_ESCAPE_RE = re.compile('[&<>\r]')
+_INVALID_RE = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+# Characters that are not written as is: escaped, invalid or outside ASCII.
+_SPECIAL_RE = re.compile(u'[^\t\n\x20-\x25\x27-\x3b\x3d\x3f-\x7f]')
+_TEXT_TYPE = type(u'')
+
+
+def escape(value):
+    """Escapes a value as the text of an element.
+
+    Mirrors lxml: None is an empty text, bytes are decoded as UTF-8 and
+    characters outside ASCII are written as character references.
+
+    :param value: text, bytes or None
+    :return: escaped UTF-8 bytes
+    """
+    if value is None:
+        return b''
+    if value.__class__ is _TEXT_TYPE and not _SPECIAL_RE.search(value):
+        return value.encode('ascii')
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    elif not isinstance(value, _TEXT_TYPE):
+        raise TypeError(
+            "Argument must be bytes or unicode, got %r" % type(value).__name__
+        )
+    if _INVALID_RE.search(value):
+        raise ValueError(
+            "All strings must be XML compatible: Unicode or ASCII, no NULL "
+            "bytes or control characters"
+        )
+    return _ESCAPE_RE.sub(
+        lambda match: _ESCAPES[match.group()], value
+    ).encode('ascii', 'xmlcharrefreplace')
+
+
+class _Element(object):
+    """Element holding other elements.
+
+    :param tag: element name
+    :param children: list of child nodes
+    :param namespaces: optional dict of namespace URIs by prefix declared on
+    the element
+    """
+
+    def __init__(self, tag, children, namespaces=None):
+        self.tag = tag
+        self.children = children
+        self.attributes = ''
+        for prefix, uri in sorted((namespaces or {}).items(),
+                                  key=lambda item: item[0] or ''):
+            name = 'xmlns:%s' % prefix if prefix else 'xmlns'
+            self.attributes += ' %s="%s"' % (name, uri)
+
+
+class _Text(object):
+    """Element holding a value of the model.
+
+    :param tag: element name
+    :param value: callable returning the text from the model, or constant
+    text
+    """
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+
+class _Slot(_Text):
+    """Element holding escaped bytes computed from the model.
+
+    :param tag: element name
+    :param value: callable returning the escaped text from the model
+    """
+
+
+class _Optional(object):
+    """Node only rendered when a condition holds for the model.
+
+    :param condition: callable taking the model
+    :param node: node to render
+    """
+
+    def __init__(self, condition, node):
+        self.condition = condition
+        self.node = node
+
+
+class _Each(object):
+    """Node rendered once per item of the model.
+
+    :param items: callable returning the items from the model
+    :param node: node to render with each item as model
+    """
+
+    def __init__(self, items, node):
+        self.items = items
+        self.node = node
+
+
+class _Cached(object):
+    """Nodes rendered once per key and reused.
+
+    The nodes read their values from the key instead of the model, so the
+    rendered bytes only depend on the key.
+
+    :param key: callable returning a hashable tuple from the model
+    :param nodes: list of nodes to render
+    """
+
+    def __init__(self, key, nodes):
+        self.key = key
+        self.nodes = nodes
+
+
+class _Template(object):
+    """Compiled node, a list of byte chunks and value slots.
+
+    :param node: node to compile
+    :param pretty_print: whether to indent elements as lxml does
+    :param depth: depth of the node in the document
+    """
+
+    def __init__(self, node, pretty_print, depth=0):
+        self.parts = []
+        for part in _compile(node, pretty_print, depth):
+            if isinstance(part, bytes) and self.parts and isinstance(
+                    self.parts[-1], bytes):
+                self.parts[-1] += part
+            else:
+                self.parts.append(part)
+
+    def render(self, model):
+        """Renders the template.
+
+        :param model: model the slot values are read from
+        :return: bytes
+        """
+        return b''.join([
+            part if part.__class__ is bytes else part(model)
+            for part in self.parts
+        ])
+
+
+def _compile(node, pretty_print, depth):
+    """Compiles a node into byte chunks and value slots.
+
+    :param node: node to compile
+    :param pretty_print: whether to indent elements as lxml does
+    :param depth: depth of the node in the document
+    :return: list of bytes and callables taking the model and returning
+    bytes
+    """
+    indent = b'  ' * depth if pretty_print else b''
+    newline = b'\n' if pretty_print else b''
+
+    if isinstance(node, _Text):
+        tag = node.tag.encode('ascii')
+        value = node.value
+        start = indent + b'<' + tag + b'>'
+        end = b'</' + tag + b'>' + newline
+        if isinstance(node, _Slot):
+            return [start, value, end]
+        if not callable(value):
+            return [start + escape(value) + end]
+
+        # lxml writes an element without text as a single empty tag.
+        empty = indent + b'<' + tag + b'/>' + newline
+
+        def element(model):
+            text = value(model)
+            if text is None:
+                return empty
+            return start + escape(text) + end
+        return [element]
+
+    if isinstance(node, _Element):
+        tag = node.tag.encode('ascii')
+        attributes = node.attributes.encode('ascii')
+        parts = [b''.join([indent, b'<', tag, attributes, b'>', newline])]
+        for child in node.children:
+            parts.extend(_compile(child, pretty_print, depth + 1))
+        parts.append(indent + b'</' + tag + b'>' + newline)
+        return parts
+
+    if isinstance(node, _Cached):
+        key = node.key
+        templates = [
+            _Template(child, pretty_print, depth) for child in node.nodes
+        ]
+        fragments = utils.FragmentCache()
+
+        def build(values):
+            return b''.join([
+                template.render(values) for template in templates
+            ])
+
+        return [lambda model: fragments.get(key(model), build)]
+
+    template = _Template(node.node, pretty_print, depth)
+    if isinstance(node, _Optional):
+        condition = node.condition
+
+        def optional(model):
+            if condition(model):
+                return template.render(model)
+            return b''
+        return [optional]
+
+    items = node.items
+    return [lambda model: b''.join([
+        template.render(item) for item in items(model)
+    ])]
+
+
+def _text(tag, path, convert=None):
+    """Describes an element holding a model attribute.
+
+    :param tag: element name
+    :param path: dotted attribute path of the value in the model
+    :param convert: optional callable converting the value to text
+    """
+    getter = operator.attrgetter(path)
+    if convert is None:
+        return _Text(tag, getter)
+    return _Text(tag, lambda model: convert(getter(model)))
+
+
+_FLAGS = {True: b'true', False: b'false'}
+
+
+def _flag(tag, path):
+    getter = operator.attrgetter(path)
+
+    def flag(model):
+        value = getter(model)
+        if value is True or value is False:
+            return _FLAGS[value]
+        return escape(str(value).lower())
+    return _Slot(tag, flag)
+
+
+def _envelope(request):
+    return _Element('soap:Envelope', [
+        _Element('soap:Body', [request])
+    ], utils.SOAP_NS)
+
+
+def _cached_text(tag, path):
+    """Describes an element holding a model attribute, rendered once per
+    value of the attribute.
+
+    :param tag: element name
+    :param path: dotted attribute path of the value in the model
+    """
+    getter = operator.attrgetter(path)
+    return _Cached(
+        lambda model: (getter(model),), [_Text(tag, operator.itemgetter(0))]
+    )
+
+
+# Credentials of the request header. The password is escaped on each render
+# so that it is never cached.
+_CREDENTIALS = [
+    _cached_text('PartnerCode', 'request_header.partner_code'),
+    _Element('AuthToken', [
+        _cached_text('UserName', 'request_header.username'),
+        _text('Password', 'request_header.password'),
+    ]),
+]
+
+
+def _request_header(order_type):
+    children = []
+    if order_type:
+        children.extend([
+            _text('ProductCode', 'request_header.product_code'),
+            _text('PartnerOrderID', 'request_header.partner_order_id'),
+        ])
+    children.extend(_CREDENTIALS)
+    if order_type:
+        return _Element('OrderRequestHeader', children)
+    return _Element('QueryRequestHeader', children)
+
+
+_QUERY_OPTIONS = _Element('OrderQueryOptions', [
+    _flag('ReturnProductDetail', 'query_options.product_detail'),
+    _flag('ReturnContacts', 'query_options.contacts'),
+    _flag('ReturnPaymentInfo', 'query_options.payment_info'),
+    _flag('ReturnFulfillment', 'query_options.fulfillment'),
+    _flag('ReturnCACerts', 'query_options.ca_certs'),
+    _flag('ReturnPKCS7Cert', 'query_options.pkcs7_cert'),
+    _flag('ReturnPartnerTags', 'query_options.partner_tags'),
+    _flag('ReturnAuthenticationComments',
+          'query_options.authentication_comments'),
+    _flag('ReturnAuthenticationStatuses',
+          'query_options.authentication_statuses'),
+    _flag('ReturnFileAuthDVSummary', 'query_options.file_auth_dv_summary'),
+    _flag('ReturnTrustServicesSummary',
+          'query_options.trust_services_summary'),
+    _flag('ReturnTrustServicesDetails',
+          'query_options.trust_services_details'),
+    # Mirrors OrderQueryOptions.serialize, which sends the details flag.
+    _flag('ReturnVulnerabilityScanSummary',
+          'query_options.vulnerability_scan_details'),
+    _flag('ReturnCertificateAlgorithmInfo',
+          'query_options.certificate_algorithm_info'),
+])
+
+_ORDER_PARAMETERS = _Element('OrderParameters', [
+    _text('ValidityPeriod', 'order_parameters.valid_period'),
+    _text('DomainName', 'order_parameters.domain_name'),
+    _text('OriginalPartnerOrderID', 'order_parameters.order_partner_order_id'),
+    _text('CSR', 'order_parameters.csr'),
+    _text('WebServerType', 'order_parameters.web_server_type'),
+    _text('RenewalIndicator', 'order_parameters.renewal_indicator',
+          lambda value: utils._boolean_to_str(value, True)),
+    _text('RenewalBehavior', 'order_parameters.renewal_behavior'),
+    _text('SignatureHashAlgorithm',
+          'order_parameters.signature_hash_algorithm'),
+    _text('SpecialInstructions', 'order_parameters.special_instructions'),
+    _text('WildCard', 'order_parameters.wildcard',
+          lambda value: utils._boolean_to_str(value, False)),
+    _text('DNSNames', 'order_parameters.dnsnames'),
+])
+
+
+def _contact(tag, path):
+    return _Element(tag, [
+        _text(name, '%s.%s' % (path, attribute)) for name, attribute in [
+            ('FirstName', 'first_name'),
+            ('LastName', 'last_name'),
+            ('Phone', 'phone'),
+            ('Email', 'email'),
+            ('Title', 'title'),
+            ('OrganizationName', 'org_name'),
+            ('AddressLine1', 'address_line_one'),
+            ('AddressLine2', 'address_line_two'),
+            ('City', 'city'),
+            ('Region', 'region'),
+            ('PostalCode', 'postal_code'),
+            ('Country', 'country'),
+            ('Fax', 'fax'),
+        ]
+    ])
+
+
+_ORGANIZATION_INFO = _Element('OrganizationInfo', [
+    _text('OrganizationName', 'organization_info.org_name'),
+    _Element('OrganizationAddress', [
+        _text('AddressLine1', 'organization_info.address_line_one'),
+        _text('AddressLine2', 'organization_info.address_line_two'),
+        _text('AddressLine3', 'organization_info.address_line_three'),
+        _text('City', 'organization_info.city'),
+        _text('Region', 'organization_info.region'),
+        _text('PostalCode', 'organization_info.postal_code'),
+        _text('Country', 'organization_info.country'),
+        _text('Phone', 'organization_info.phone'),
+    ]),
+    _text('DUNS', 'organization_info.duns'),
+])
+
+
+def _identity(value):
+    return value
+
+
+_new_value = operator.itemgetter(1)
+_old_value = operator.itemgetter(0)
+
+_ORDER_CHANGES = _Optional(
+    lambda request: request.order_changes.has_changes,
+    _Element('OrderChanges', [
+        _Each(operator.attrgetter('order_changes.add'), _Element(
+            'OrderChange', [
+                _Text('ChangeType', 'Add_SAN'),
+                _Optional(_identity, _Text('NewValue', _identity)),
+            ]
+        )),
+        _Each(operator.attrgetter('order_changes.delete'), _Element(
+            'OrderChange', [
+                _Text('ChangeType', 'Delete_SAN'),
+                _Optional(_identity, _Text('OldValue', _identity)),
+            ]
+        )),
+        _Each(operator.attrgetter('order_changes.edit'), _Element(
+            'OrderChange', [
+                _Text('ChangeType', 'Edit_SAN'),
+                _Optional(_new_value, _Text('NewValue', _new_value)),
+                _Optional(_old_value, _Text('OldValue', _old_value)),
+            ]
+        )),
+    ])
+)
+
+_ENVELOPES = {
+    GetModifiedOrderRequest: _envelope(_Element('GetModifiedOrders', [
+        _Element('Request', [
+            _request_header(order_type=False),
+            _QUERY_OPTIONS,
+            _text('FromDate', 'from_date'),
+            _text('ToDate', 'to_date'),
+        ]),
+    ], utils.NS)),
+    GetOrderByPartnerOrderID: _envelope(_Element('GetOrderByPartnerOrderID', [
+        _Element('Request', [
+            _request_header(order_type=False),
+            _text('PartnerOrderID', 'partner_order_id'),
+            _QUERY_OPTIONS,
+        ]),
+    ], utils.NS)),
+    QuickOrderRequest: _envelope(_Element('QuickOrder', [
+        _Element('Request', [
+            _request_header(order_type=True),
+            _ORGANIZATION_INFO,
+            _ORDER_PARAMETERS,
+            _contact('AdminContact', 'order_contacts.admin'),
+            _contact('TechContact', 'order_contacts.tech'),
+            _contact('BillingContact', 'order_contacts.billing'),
+            _text('ApproverEmail', 'approver_email.approver_email'),
+        ]),
+    ], utils.NS)),
+    Reissue: _envelope(_Element('Reissue', [
+        _Element('Request', [
+            _request_header(order_type=True),
+            _ORDER_PARAMETERS,
+            _text('ReissueEmail', 'reissue_email.reissue_email'),
+            _ORDER_CHANGES,
+        ]),
+    ], utils.DEFAULT_ONS)),
+}
+
+# Compiled templates by request model class and pretty_print.
+_TEMPLATES = dict(
+    ((cls, pretty_print), _Template(envelope, pretty_print))
+    for cls, envelope in _ENVELOPES.items()
+    for pretty_print in (True, False)
+)
+
+
+def render_request(request_model, pretty_print=True):
+    """Renders the SOAP envelope of a request from its template.
+
+    Only the request models of this package have a template, subclasses are
+    left to their own serialize method.
+
+    :param request_model: request model instance, with credentials set
+    :param pretty_print: whether to indent the envelope, compact otherwise
+    :return: serialized request body, or None if the request model has no
+    template
+    """
+    template = _TEMPLATES.get((type(request_model), pretty_print))
+    if template is None:
+        return None
+    return template.render(request_model)
@@ -0,0 +1,187 @@
+from __future__ import absolute_import, division, print_function
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Token bucket rate limiter.
+
+    :param rate: number of tokens added per second
+    :param burst: maximum number of tokens held, defaults to one second of
+    tokens
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def take(self):
+        """Takes a token if one is available.
+
+        :return: 0 when a token was taken, otherwise the number of seconds
+        until the next token is available
+        """
+        with self._lock:
+            self._refill(time.time())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def set_rate(self, rate):
+        """Changes the rate, keeping the tokens accumulated so far.
+
+        :param rate: number of tokens added per second
+        """
+        with self._lock:
+            self._refill(time.time())
+            self.rate = float(rate)
+
+
+class Governor(object):
+    """Paces the requests made for a single partner account.
+
+    Requests are paced by a token bucket and the number of requests in flight
+    is capped. In adaptive mode, the rate is cut whenever a request fails or
+    is slower than target_latency, and raised again step by step as requests
+    succeed.
+
+    :param rate: maximum number of requests started per second, or None for
+    no rate limit
+    :param burst: number of requests that can be started at once
+    :param max_in_flight: maximum number of concurrent requests, or None for
+    no limit
+    :param adaptive: whether to adjust the rate from errors and latency
+    :param min_rate: lowest rate adaptive mode slows down to
+    :param target_latency: optional latency in seconds above which adaptive
+    mode slows down
+    :param decrease_factor: factor applied to the rate on a slow or failed
+    request
+    :param increase_step: requests per second added on a successful request
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None,
+                 adaptive=False, min_rate=0.1, target_latency=None,
+                 decrease_factor=0.5, increase_step=0.1):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_rate = rate
+        self.max_in_flight = max_in_flight
+        self.adaptive = adaptive and rate is not None
+        self.min_rate = min_rate
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._release_callbacks = []
+
+    @property
+    def rate(self):
+        return self.bucket.rate if self.bucket is not None else None
+
+    def _full(self):
+        if self.max_in_flight is None:
+            return False
+        return self.in_flight >= self.max_in_flight
+
+    def try_acquire(self, on_release=None):
+        """Tries to start a request without blocking.
+
+        Used by the asyncio client, which cannot block on a lock.
+
+        :param on_release: optional callable, called once by the next release
+        when too many requests are in flight. It is called from the thread
+        releasing the request.
+        :return: 0 when the request may start, None when too many requests
+        are in flight, otherwise the number of seconds to wait before trying
+        again
+        """
+        with self._condition:
+            if self._full():
+                if on_release is not None:
+                    self._release_callbacks.append(on_release)
+                return None
+
+            if self.bucket is not None:
+                delay = self.bucket.take()
+                if delay:
+                    return delay
+
+            self.in_flight += 1
+            return 0
+
+    def acquire(self):
+        """Blocks until a request may start."""
+        with self._condition:
+            while self._full():
+                self._condition.wait()
+            self.in_flight += 1
+
+        if self.bucket is not None:
+            delay = self.bucket.take()
+            while delay:
+                time.sleep(delay)
+                delay = self.bucket.take()
+
+    def release(self, failed=False, latency=None):
+        """Records the end of a request.
+
+        :param failed: whether the request failed or was throttled
+        :param latency: optional duration of the request in seconds
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+            # Every waiter tries again, since some may have given up.
+            callbacks, self._release_callbacks = self._release_callbacks, []
+        for callback in callbacks:
+            callback()
+
+        if not self.adaptive:
+            return
+
+        slow = False
+        if self.target_latency is not None and latency is not None:
+            slow = latency > self.target_latency
+
+        if failed or slow:
+            rate = max(self.min_rate, self.rate * self.decrease_factor)
+        else:
+            rate = min(self.max_rate, self.rate + self.increase_step)
+        self.bucket.set_rate(rate)
+
+
+class ThrottleRegistry(object):
+    """Hands out one Governor per partner code.
+
+    A registry can be shared by several clients, synchronous or asyncio, so
+    that every request made for a partner account is paced together.
+
+    :param governor_options: keyword arguments used to create each Governor
+    """
+
+    def __init__(self, **governor_options):
+        self.governor_options = governor_options
+        self._governors = {}
+        self._lock = threading.Lock()
+
+    def get(self, partner_code):
+        """Returns the Governor of a partner account.
+
+        :param partner_code: partner code given to Request.set_credentials
+        :return: Governor shared by every request for this partner code
+        """
+        with self._lock:
+            governor = self._governors.get(partner_code)
+            if governor is None:
+                governor = Governor(**self.governor_options)
+                self._governors[partner_code] = governor
+            return governor
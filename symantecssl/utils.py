@@ -1,4 +1,10 @@
 from __future__ import absolute_import, division, print_function
+import datetime
+import os
+import re
+import sys
+import threading
+
 from lxml import etree
 
 NS = {
@@ -21,6 +27,260 @@ DEFAULT_ONS = {
     None: 'http://api.geotrust.com/webtrust/order'
 }
 
+# Options of the parsers reading responses. Modified orders windows can
+# exceed the default lxml limits, and responses never need network access or
+# entity expansion.
+RESPONSE_PARSER_OPTIONS = {
+    'remove_blank_text': True,
+    'huge_tree': True,
+    'no_network': True,
+    'resolve_entities': False,
+}
+
+_parsers = threading.local()
+
+
+def _move_file_ex(source, destination):  # pragma: no cover
+    """Replaces a file with MoveFileEx, for Windows on Python 2."""
+    import ctypes
+
+    def text(path):
+        if isinstance(path, bytes):
+            return path.decode(sys.getfilesystemencoding())
+        return path
+
+    # MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH
+    flags = 0x1 | 0x8
+    if not ctypes.windll.kernel32.MoveFileExW(
+            text(source), text(destination), flags):
+        raise ctypes.WinError()
+
+
+if hasattr(os, 'replace'):
+    _replace = os.replace
+elif sys.platform == 'win32':  # pragma: no cover
+    _replace = _move_file_ex
+else:  # pragma: no cover
+    # rename replaces the destination atomically on POSIX.
+    _replace = os.rename
+
+
+def replace_file(source, destination):
+    """Atomically replaces a file with another one.
+
+    Used to rewrite state files through a temporary file, so that a crash
+    never leaves a truncated file behind. os.replace only exists on Python
+    3.3+, and os.rename fails on Windows when the destination exists.
+
+    :param source: path of the new file
+    :param destination: path of the file replaced
+    """
+    _replace(source, destination)
+
+
+def get_response_parser():
+    """Returns the response parser of the current thread.
+
+    lxml parsers can not be used by several threads at once, so a parser
+    configured with RESPONSE_PARSER_OPTIONS is created once per thread and
+    reused by every response parsed on that thread.
+
+    :return: lxml XMLParser
+    """
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        parser = _parsers.parser = etree.XMLParser(**RESPONSE_PARSER_OPTIONS)
+    return parser
+
+
+_TIMESTAMP_RE = re.compile(
+    r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(\.\d+)?'
+    r'(Z|[+-]\d{2}:?\d{2})?$'
+)
+
+
+def parse_timestamp(text):
+    """Parses an ISO8601 timestamp as returned by Symantec.
+
+    Timestamps carrying an offset are normalised to UTC.
+
+    :param text: timestamp such as 2014-08-05T15:05:33.332+00:00
+    :return: naive datetime in UTC
+    """
+    match = _TIMESTAMP_RE.match(text.strip())
+    if match is None:
+        raise ValueError("Invalid timestamp: %r" % text)
+
+    seconds, fraction, offset = match.groups()
+    timestamp = datetime.datetime.strptime(seconds, '%Y-%m-%dT%H:%M:%S')
+    if fraction:
+        timestamp += datetime.timedelta(
+            microseconds=int(round(float(fraction) * 1000000))
+        )
+    if offset and offset != 'Z':
+        sign = -1 if offset[0] == '-' else 1
+        digits = offset[1:].replace(':', '')
+        timestamp -= sign * datetime.timedelta(
+            hours=int(digits[:2]), minutes=int(digits[2:])
+        )
+
+    return timestamp
+
+
+class ElementPath(object):
+    """Compiled lookup of the elements found at a path below a node.
+
+    The path, made of direct child steps following the schema, is compiled
+    once at import time. The fallback path, by default a descendant search
+    for the last step, is only evaluated when the path matches nothing, so
+    nodes nested differently than the schema are still found.
+
+    :param path: XPath of the elements relative to the node
+    :param fallback: optional XPath evaluated when path matches nothing, or
+    False for sections that are optional in the schema
+    :param namespaces: namespace prefixes used by the paths
+    """
+
+    def __init__(self, path, fallback=None, namespaces=NS):
+        if fallback is None:
+            fallback = './/' + path.rsplit('/', 1)[-1]
+        self.path = path
+        self._xpath = etree.XPath(path, namespaces=namespaces)
+        self._fallback = None
+        if fallback is not False and fallback != path:
+            self._fallback = etree.XPath(fallback, namespaces=namespaces)
+
+    def findall(self, node):
+        """Returns every element matching the path.
+
+        :param node: element or element tree to search
+        :return: list of elements
+        """
+        elements = self._xpath(node)
+        if not elements and self._fallback is not None:
+            elements = self._fallback(node)
+        return elements
+
+    def find(self, node):
+        """Returns the first element matching the path.
+
+        :param node: element or element tree to search
+        :return: element or None
+        """
+        elements = self.findall(node)
+        return elements[0] if elements else None
+
+    def text(self, node):
+        """Returns the text of the first element matching the path.
+
+        :param node: element or element tree to search
+        :return: text of element or "None" text
+        """
+        return get_element_text(self.find(node))
+
+
+class StringPool(object):
+    """Pool sharing a single object between equal strings.
+
+    Large responses repeat the same CA certificates, organization names,
+    countries and approver emails across thousands of orders, and lxml
+    returns a new string for each of them. Deserializers given a pool keep
+    the first string seen and return it for every equal one, so the
+    duplicates can be freed.
+
+    Every distinct string stays alive as long as the pool, which is meant to
+    last as long as the results it deduplicates. Counters are not updated
+    atomically, share a pool between threads only if approximate counters
+    are acceptable.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._strings = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __call__(self, text):
+        """Returns the pooled string equal to text.
+
+        :param text: string to deduplicate, or None
+        :return: pooled string, or None
+        """
+        if text is None:
+            return text
+
+        pooled = self._strings.setdefault(text, text)
+        if pooled is text:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.bytes_saved += sys.getsizeof(text)
+        return pooled
+
+    @property
+    def stats(self):
+        """Returns the pool counters.
+
+        :return: dict of hits, misses, strings and bytes_saved
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'strings': len(self._strings),
+            'bytes_saved': self.bytes_saved,
+        }
+
+    def clear(self):
+        """Releases the pooled strings, counters are kept."""
+        self._strings.clear()
+
+
+class FragmentCache(object):
+    """Cache of request fragments by the values they are serialized from.
+
+    Fragments are looked up by every value they depend on, such as the
+    partner code and username of a request header, so a fragment
+    is never reused once one of these values changes. The cache is cleared
+    when it holds maxsize fragments, bounding it when credentials rotate.
+
+    :param maxsize: maximum number of fragments kept
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._fragments = {}
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def get(self, key, build):
+        """Returns the fragment of a key, building it on a miss.
+
+        :param key: hashable tuple of the values the fragment depends on
+        :param build: callable taking the key and returning the fragment
+        :return: cached fragment
+        """
+        fragment = self._fragments.get(key)
+        if fragment is not None:
+            self.hits += 1
+            return fragment
+
+        self.misses += 1
+        fragment = build(key)
+        if len(self._fragments) >= self.maxsize:
+            self._fragments.clear()
+        self._fragments[key] = fragment
+        return fragment
+
+    def clear(self):
+        """Drops every cached fragment, counters are kept."""
+        self._fragments.clear()
+
 
 def get_element_text(element):
     """Checks if element is NoneType.
@@ -0,0 +1,8 @@
+from __future__ import absolute_import, division, print_function
+import sys
+
+collect_ignore = []
+
+# The asyncio client and its tests use the async and await syntax.
+if sys.version_info < (3, 5):
+    collect_ignore.append("unit/test_aio.py")
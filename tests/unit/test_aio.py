@@ -0,0 +1,389 @@
+from __future__ import absolute_import, division, print_function
+import asyncio
+
+from lxml import etree
+from mock import Mock, patch
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from symantecssl import utils  # noqa: E402
+from symantecssl.aio import (  # noqa: E402
+    AsyncSymantecClient, _set_released, _wake, async_post_request
+)
+from symantecssl.instrumentation import (  # noqa: E402
+    DESERIALIZE, PARSE, SEND, SERIALIZE, Instrumentation
+)
+from symantecssl.order import FailedRequest  # noqa: E402
+from symantecssl.request_models import GetOrderByPartnerOrderID  # noqa: E402
+from symantecssl.retry import RetryPolicy  # noqa: E402
+from symantecssl.throttle import ThrottleRegistry  # noqa: E402
+from tests.unit import utils as test_utils  # noqa: E402
+
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+class FakeResponse(object):
+
+    def __init__(self, status, content):
+        self.status = status
+        self.headers = {}
+        self.content = content
+
+    async def read(self):
+        return self.content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeSession(object):
+
+    def __init__(self, status=200):
+        self.status = status
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = False
+        self.content = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+
+    def post(self, endpoint, data, headers):
+        session = self
+
+        class Context(object):
+
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.max_in_flight = max(
+                    session.max_in_flight, session.in_flight
+                )
+                await asyncio.sleep(0.01)
+                session.in_flight -= 1
+                return FakeResponse(session.status, session.content)
+
+            async def __aexit__(self, *exc_info):
+                pass
+
+        return Context()
+
+    async def close(self):
+        self.closed = True
+
+
+def order_request():
+    request_model = GetOrderByPartnerOrderID()
+    request_model.set_partner_order_id("131000-00000")
+    return request_model
+
+
+class TestAsyncSymantecClient(object):
+
+    def test_post_deserializes_response(self):
+        client = AsyncSymantecClient(session=FakeSession())
+
+        response = asyncio.run(
+            client.post("http://www.example.com/", order_request(),
+                        CREDENTIALS)
+        )
+
+        assert response.status_code == 200
+        assert response.model.status_code == "ORDER_COMPLETE"
+
+    def test_send_cpu_time_is_not_measured(self):
+        instrumentation = Instrumentation()
+        instrumentation.record = Mock()
+        client = AsyncSymantecClient(
+            session=FakeSession(), instrumentation=instrumentation
+        )
+
+        asyncio.run(
+            client.post("http://www.example.com/", order_request(),
+                        CREDENTIALS)
+        )
+
+        recorded = instrumentation.record.call_args[0][0]
+        assert SEND in recorded.wall_times
+        assert set(recorded.cpu_times) == set([
+            SERIALIZE, PARSE, DESERIALIZE
+        ])
+
+    def test_bad_response(self):
+        client = AsyncSymantecClient(session=FakeSession(status=500))
+
+        with pytest.raises(FailedRequest):
+            asyncio.run(
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+            )
+
+    def test_retry(self):
+        session = FakeSession(status=503)
+        client = AsyncSymantecClient(
+            session=session, retry=RetryPolicy(backoff_factor=0)
+        )
+
+        with pytest.raises(FailedRequest) as excinfo:
+            asyncio.run(
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+            )
+        assert excinfo.value.status_code == 503
+        assert excinfo.value.attempts == 3
+
+    def test_connection_errors_are_retried(self):
+        session = FakeSession()
+        post = session.post
+        errors = [aiohttp.ClientConnectionError()]
+
+        def flaky_post(*args, **kwargs):
+            if errors:
+                raise errors.pop()
+            return post(*args, **kwargs)
+
+        session.post = flaky_post
+        client = AsyncSymantecClient(
+            session=session, retry=RetryPolicy(backoff_factor=0)
+        )
+
+        response = asyncio.run(
+            client.post("http://www.example.com/", order_request(),
+                        CREDENTIALS)
+        )
+        assert response.status_code == 200
+
+    def test_connection_errors_without_retry(self):
+        session = FakeSession()
+        session.post = Mock(side_effect=aiohttp.ClientConnectionError())
+        client = AsyncSymantecClient(session=session)
+
+        with pytest.raises(aiohttp.ClientConnectionError):
+            asyncio.run(
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+            )
+
+    def test_connection_errors_exhaust_retries(self):
+        session = FakeSession()
+        session.post = Mock(side_effect=aiohttp.ClientConnectionError())
+        client = AsyncSymantecClient(
+            session=session, retry=RetryPolicy(backoff_factor=0)
+        )
+
+        with pytest.raises(FailedRequest) as excinfo:
+            asyncio.run(
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+            )
+        assert session.post.call_count == 3
+        assert excinfo.value.status_code is None
+        assert excinfo.value.attempts == 3
+        assert excinfo.value.elapsed is not None
+        assert excinfo.value.response is None
+        assert isinstance(
+            excinfo.value.__cause__, aiohttp.ClientConnectionError
+        )
+
+    def test_aiohttp_required_without_session(self):
+        with patch("symantecssl.aio.aiohttp", None):
+            with pytest.raises(ImportError):
+                AsyncSymantecClient()
+
+    def test_session_given_without_aiohttp(self):
+        session = FakeSession()
+        errors = [asyncio.TimeoutError()]
+        post = session.post
+
+        def flaky_post(*args, **kwargs):
+            if errors:
+                raise errors.pop()
+            return post(*args, **kwargs)
+
+        session.post = flaky_post
+        with patch("symantecssl.aio.aiohttp", None):
+            client = AsyncSymantecClient(
+                session=session, retry=RetryPolicy(backoff_factor=0)
+            )
+            response = asyncio.run(
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+            )
+        assert response.status_code == 200
+
+    def test_concurrency_is_bounded(self):
+        session = FakeSession()
+
+        async def run():
+            client = AsyncSymantecClient(max_concurrency=5, session=session)
+            await asyncio.gather(*[
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+                for _ in range(20)
+            ])
+
+        asyncio.run(run())
+        assert session.max_in_flight == 5
+
+    def test_semaphore_created_in_running_loop(self):
+        session = FakeSession()
+        # Constructed outside of any event loop.
+        client = AsyncSymantecClient(max_concurrency=2, session=session)
+        assert client._semaphore is None
+
+        async def run():
+            await asyncio.gather(*[
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+                for _ in range(4)
+            ])
+
+        asyncio.run(run())
+        assert client._semaphore is not None
+        assert session.max_in_flight == 2
+
+    def test_latency_excludes_local_queueing(self):
+        session = FakeSession()
+        registry = ThrottleRegistry(max_in_flight=10)
+        governor = registry.get("123456")
+        governor.release = Mock(wraps=governor.release)
+
+        async def run():
+            client = AsyncSymantecClient(
+                max_concurrency=1, session=session, throttle=registry
+            )
+            await asyncio.gather(*[
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+                for _ in range(10)
+            ])
+
+        asyncio.run(run())
+
+        latencies = [
+            call[1]["latency"] for call in governor.release.call_args_list
+        ]
+        assert len(latencies) == 10
+        # Queued behind nine other requests, the last one would report
+        # about 0.1 seconds if the semaphore wait were counted.
+        assert max(latencies) < 0.05
+        assert governor.in_flight == 0
+
+    def test_throttle_bounds_in_flight_requests(self):
+        session = FakeSession()
+        registry = ThrottleRegistry(max_in_flight=2)
+
+        async def run():
+            client = AsyncSymantecClient(session=session, throttle=registry)
+            await asyncio.gather(*[
+                client.post("http://www.example.com/", order_request(),
+                            CREDENTIALS)
+                for _ in range(10)
+            ])
+
+        asyncio.run(run())
+        assert session.max_in_flight == 2
+        assert registry.get("123456").in_flight == 0
+
+    def test_throttle_paces_requests(self):
+        session = FakeSession()
+        registry = ThrottleRegistry(rate=1000, burst=1)
+
+        async def run():
+            client = AsyncSymantecClient(session=session, throttle=registry)
+            with patch("symantecssl.aio.asyncio.sleep",
+                       Mock(wraps=asyncio.sleep)) as mocked_sleep:
+                await asyncio.gather(*[
+                    client.post("http://www.example.com/", order_request(),
+                                CREDENTIALS)
+                    for _ in range(3)
+                ])
+            return mocked_sleep
+
+        mocked_sleep = asyncio.run(run())
+        # FakeSession sleeps once per request, the throttle sleeps as well.
+        assert mocked_sleep.call_count > 3
+
+    def test_wake_after_loop_closed(self):
+        loop = asyncio.new_event_loop()
+        future = loop.create_future()
+        loop.close()
+
+        _wake(loop, future)
+
+        assert not future.done()
+
+    def test_set_released_ignores_cancelled_waiters(self):
+        loop = asyncio.new_event_loop()
+        future = loop.create_future()
+        future.cancel()
+
+        _set_released(future)
+
+        assert future.cancelled()
+        loop.close()
+
+    def test_provided_session_is_not_closed(self):
+        session = FakeSession()
+
+        async def run():
+            async with AsyncSymantecClient(session=session):
+                pass
+
+        asyncio.run(run())
+        assert not session.closed
+
+    def test_creates_pooled_session(self):
+
+        async def run():
+            async with AsyncSymantecClient(pool_maxsize=7) as client:
+                session = client._get_session()
+                assert client._get_session() is session
+                assert session.connector.limit_per_host == 7
+            return session
+
+        session = asyncio.run(run())
+        assert session.closed
+
+
+class TestAsyncPostRequest(object):
+
+    def test_with_client(self):
+        client = AsyncSymantecClient(session=FakeSession())
+
+        response = asyncio.run(
+            async_post_request("http://www.example.com/", order_request(),
+                               CREDENTIALS, client=client)
+        )
+        assert response.model.organization_info.city == "City"
+
+    def test_pool(self):
+        client = AsyncSymantecClient(session=FakeSession())
+        pool = utils.StringPool()
+
+        response = asyncio.run(
+            async_post_request("http://www.example.com/", order_request(),
+                               CREDENTIALS, client=client, pool=pool)
+        )
+
+        assert response.model.organization_info.city == "City"
+        assert len(pool) > 0
+
+    def test_short_lived_client(self):
+        session = FakeSession()
+
+        with patch.object(AsyncSymantecClient, "_get_session",
+                          return_value=session):
+            response = asyncio.run(
+                async_post_request("http://www.example.com/",
+                                   order_request(), CREDENTIALS)
+            )
+        assert response.model.organization_info.city == "City"
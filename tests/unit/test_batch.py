@@ -0,0 +1,129 @@
+from __future__ import absolute_import, division, print_function
+import threading
+
+from lxml import etree
+from mock import Mock, patch
+
+from symantecssl.batch import iter_order_results, place_orders
+from symantecssl.order import FailedRequest, SymantecClient
+from symantecssl.request_models import QuickOrderRequest
+from symantecssl.response_models import QuickOrderResponse
+from tests.unit import utils as test_utils
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+def quick_order(partner_order_id):
+    request = QuickOrderRequest()
+    request.request_header.set_request_header("SSL123", partner_order_id)
+    return request
+
+
+class FakeClient(object):
+    """Answers orders with their partner order ID, failing the given ones."""
+
+    pretty_print = True
+    stream_requests = False
+
+    def __init__(self, fail=(), wait=None):
+        self.fail = fail
+        self.wait = wait or (lambda partner_order_id: None)
+        self.bodies = []
+
+    def post_serialized(self, endpoint, request_model, serialized_xml):
+        self.bodies.append(serialized_xml)
+        partner_order_id = request_model.request_header.partner_order_id
+        self.wait(partner_order_id)
+        if partner_order_id in self.fail:
+            raise FailedRequest(status_code=500)
+        return Mock(model=partner_order_id)
+
+
+class TestPlaceOrders(object):
+
+    def test_results_in_order(self):
+        client = FakeClient(fail=["2"])
+        orders = [quick_order(str(index)) for index in range(5)]
+
+        batch = place_orders(
+            "http://www.example.com/", orders, CREDENTIALS, workers=3,
+            client=client
+        )
+
+        assert len(batch) == 5
+        assert [result.index for result in batch] == [0, 1, 2, 3, 4]
+        assert batch.models == ["0", "1", None, "3", "4"]
+        assert [result.index for result in batch.failed] == [2]
+        assert isinstance(batch[2].error, FailedRequest)
+        assert len(batch.succeeded) == 4
+        assert all(isinstance(body, bytes) for body in client.bodies)
+
+    def test_slow_order_does_not_block_others(self):
+        released = threading.Event()
+
+        def wait(partner_order_id):
+            if partner_order_id == "0":
+                released.wait(5)
+
+        callback = Mock(side_effect=lambda result: released.set())
+
+        batch = place_orders(
+            "http://www.example.com/", [quick_order("0"), quick_order("1")],
+            CREDENTIALS, workers=2, client=FakeClient(wait=wait),
+            callback=callback
+        )
+
+        completed = [call[0][0].index for call in callback.call_args_list]
+        assert completed == [1, 0]
+        assert batch.models == ["0", "1"]
+
+    def test_serialization_errors(self):
+        orders = [quick_order("0"), quick_order("1")]
+        orders[1].organization_info.org_name = u"Example\x00"
+
+        batch = place_orders(
+            "http://www.example.com/", orders, CREDENTIALS,
+            client=FakeClient()
+        )
+
+        assert batch.models == ["0", None]
+        assert isinstance(batch[1].error, ValueError)
+
+    def test_closing_cancels_pending_orders(self):
+        never = threading.Event()
+
+        def wait(partner_order_id):
+            # Keeps later orders running while the generator is closed.
+            if partner_order_id != "0":
+                never.wait(0.1)
+
+        client = FakeClient(wait=wait)
+        results = iter_order_results(
+            "http://www.example.com/",
+            [quick_order(str(index)) for index in range(4)],
+            CREDENTIALS, workers=1, client=client
+        )
+
+        assert next(results).index == 0
+        results.close()
+
+        assert len(client.bodies) <= 2
+
+    @patch("requests.Session.post")
+    def test_client(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('quick_order_response.xml')
+        )
+
+        batch = place_orders(
+            "http://www.example.com/", [quick_order("0")], CREDENTIALS,
+            client=SymantecClient()
+        )
+
+        assert isinstance(batch[0].model, QuickOrderResponse)
+        assert mocked_post.call_count == 1
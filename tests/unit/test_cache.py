@@ -0,0 +1,367 @@
+from __future__ import absolute_import, division, print_function
+
+from lxml import etree
+from mock import Mock, patch
+import pytest
+
+from symantecssl.cache import (
+    CacheInvalidator, ResponseCache, cache_key, cache_tag
+)
+from symantecssl.order import SymantecClient
+from symantecssl.request_models import (
+    GetModifiedOrderRequest, GetOrderByPartnerOrderID, OrderQueryOptions,
+    QuickOrderRequest, Reissue
+)
+from symantecssl.response_models import (
+    ModificationEvent, ModificationEvents, OrderDetail, OrderDetails
+)
+from tests.unit import utils as test_utils
+
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+def order_request(partner_order_id="131000-00000"):
+    request_model = GetOrderByPartnerOrderID()
+    request_model.set_partner_order_id(partner_order_id)
+    request_model.set_credentials(**CREDENTIALS)
+    return request_model
+
+
+class TestCacheKey(object):
+
+    def test_order_requests_are_not_cached(self):
+        assert cache_key(QuickOrderRequest()) is None
+        assert cache_key(Reissue()) is None
+        assert cache_key(GetModifiedOrderRequest()) is None
+
+    def test_key_depends_on_query_options(self):
+        first = order_request()
+        second = order_request()
+        second.query_options.contacts = False
+
+        assert cache_key(first) == cache_key(order_request())
+        assert cache_key(first) != cache_key(second)
+        assert cache_key(first) != cache_key(order_request("other"))
+        assert cache_key(first).startswith(
+            "GetOrderByPartnerOrderID:123456:131000-00000:"
+        )
+
+    def test_key_depends_on_projection(self):
+        first = order_request()
+        first.set_projection(["status_code"])
+        second = order_request()
+        second.set_projection(["approver_email"])
+
+        assert cache_key(first) != cache_key(second)
+        assert cache_key(first) != cache_key(order_request())
+
+    def test_key_ignores_projection_order(self):
+        first = order_request()
+        first.set_projection(["status_code", "contacts.admin.email"])
+        second = order_request()
+        second.set_projection(
+            ["organization_contacts.admin.email", "status_code"]
+        )
+
+        assert cache_key(first) == cache_key(second)
+
+    def test_key_depends_on_lazy(self):
+        request_model = order_request()
+
+        assert cache_key(request_model) == cache_key(request_model, False)
+        assert cache_key(request_model) != cache_key(request_model, True)
+
+    def test_key_ignores_option_order(self):
+        first = order_request()
+        second = order_request()
+        second.query_options.__dict__ = dict(
+            reversed(list(vars(second.query_options).items()))
+        )
+
+        assert cache_key(first) == cache_key(second)
+
+    def test_key_follows_serialized_flags(self):
+        first = order_request()
+        first.query_options.contacts = "False"
+        second = order_request()
+        second.query_options.contacts = False
+
+        assert cache_key(first) == cache_key(second)
+        assert cache_key(first) != cache_key(order_request())
+
+    def test_tag_includes_partner_code(self):
+        assert cache_tag("123456", "131000-00000") != cache_tag(
+            "654321", "131000-00000"
+        )
+
+
+class TestResponseCache(object):
+
+    def test_hit_and_miss(self):
+        cache = ResponseCache()
+
+        assert cache.get("key") is None
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+        assert cache.stats == {
+            "hits": 1, "misses": 1, "evictions": 0, "expirations": 0
+        }
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(maxsize=2)
+
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.evictions == 1
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(ttl=10)
+        with patch("symantecssl.cache.time.time", return_value=100.0):
+            cache.set("a", 1)
+        with patch("symantecssl.cache.time.time", return_value=105.0):
+            assert cache.get("a") == 1
+        with patch("symantecssl.cache.time.time", return_value=111.0):
+            assert cache.get("a") is None
+
+        assert cache.expirations == 1
+
+    def test_hits_return_copies(self):
+        cache = ResponseCache()
+        cache.set("a", {"value": 1})
+
+        cache.get("a")["value"] = 2
+
+        assert cache.get("a") == {"value": 1}
+
+    def test_close_without_storage(self):
+        cache = ResponseCache()
+        cache.set("a", 1)
+        cache.clear()
+        cache.close()
+
+        assert len(cache) == 0
+
+    def test_shared_storage(self, tmpdir):
+        path = str(tmpdir.join("cache.db"))
+        first = ResponseCache(path=path)
+        second = ResponseCache(path=path)
+
+        first.set("a", {"value": 1})
+
+        assert second.get("a") == {"value": 1}
+        assert len(second) == 1
+
+        second.clear()
+        first._entries.clear()
+        assert first.get("a") is None
+        first.close()
+        second.close()
+
+
+class TestSymantecClientCache(object):
+
+    @patch("requests.Session.post")
+    def test_query_responses_are_cached(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+        client = SymantecClient(cache=ResponseCache())
+
+        first = client.post(
+            "http://www.example.com/", order_request(), CREDENTIALS
+        )
+        second = client.post(
+            "http://www.example.com/", order_request(), CREDENTIALS
+        )
+
+        assert mocked_post.call_count == 1
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.model.status_code == "ORDER_COMPLETE"
+        assert second.model is not first.model
+        assert client.cache.hits == 1
+
+    @patch("requests.Session.post")
+    def test_lazy_responses_are_cached_apart(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+        client = SymantecClient(cache=ResponseCache())
+
+        client.post("http://www.example.com/", order_request(), CREDENTIALS)
+        client.post(
+            "http://www.example.com/", order_request(), CREDENTIALS,
+            lazy=True
+        )
+
+        assert mocked_post.call_count == 2
+        assert len(client.cache) == 2
+
+    @patch("requests.Session.post")
+    def test_order_responses_are_not_cached(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('quick_order_response.xml')
+        )
+        client = SymantecClient(cache=ResponseCache())
+
+        for _ in range(2):
+            client.post(
+                "http://www.example.com/", QuickOrderRequest(), CREDENTIALS
+            )
+
+        assert mocked_post.call_count == 2
+        assert len(client.cache) == 0
+
+
+TAG_A = cache_tag("123456", "a")
+
+
+def cached_detail(partner_order_id, event_ids):
+    detail = OrderDetail()
+    detail.partner_order_id = partner_order_id
+    events = []
+    for event_id in event_ids:
+        event = ModificationEvent()
+        event.mod_id = event_id
+        events.append(event)
+    detail.modified_events = ModificationEvents(events)
+    return detail
+
+
+class TestCacheInvalidation(object):
+
+    def test_invalidate_tag(self):
+        cache = ResponseCache()
+        cache.set("a-1", 1, tag="a")
+        cache.set("a-2", 2, tag="a")
+        cache.set("b-1", 3, tag="b")
+
+        assert cache.invalidate("a") == 2
+        assert cache.get("a-1") is None
+        assert cache.get("b-1") == 3
+        assert cache.invalidate("missing") == 0
+
+    def test_retagging_and_eviction_drop_tags(self):
+        cache = ResponseCache(maxsize=1)
+        cache.set("key", 1, tag="a")
+        cache.set("key", 2, tag="b")
+        cache.set("other", 3, tag="c")
+
+        assert cache._tags == {"c": set(["other"])}
+
+    def test_invalidate_shared_storage(self, tmpdir):
+        path = str(tmpdir.join("cache.db"))
+        first = ResponseCache(path=path)
+        second = ResponseCache(path=path)
+        first.set("a-1", 1, tag="a")
+
+        assert second.invalidate("a") == 1
+        first._entries.clear()
+        assert first.get("a-1") is None
+
+    def test_invalidate_shared_storage_stale_only(self, tmpdir):
+        path = str(tmpdir.join("cache.db"))
+        first = ResponseCache(path=path)
+        second = ResponseCache(path=path)
+        first.set("a-1", 1, tag="a")
+        first.set("a-2", 2, tag="a")
+
+        assert second.invalidate("a", lambda value: value == 2) == 1
+        first._entries.clear()
+        assert first.get("a-1") == 1
+        assert first.get("a-2") is None
+
+    def test_consume_evicts_only_changed_orders(self):
+        cache = ResponseCache()
+        cache.set("a", (b"", cached_detail("a", ["1"])), tag=TAG_A)
+        cache.set("b", (b"", cached_detail("b", ["2", "3"])),
+                  tag=cache_tag("123456", "b"))
+        invalidator = CacheInvalidator(cache, credentials=CREDENTIALS)
+
+        changed = invalidator.consume(OrderDetails([
+            cached_detail("a", ["1", "4"]),
+            cached_detail("b", ["3"]),
+            cached_detail("c", ["5"]),
+            cached_detail("None", ["6"]),
+        ]))
+
+        assert changed == ["a"]
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+
+    def test_consume_without_events_evicts(self):
+        cache = ResponseCache()
+        cache.set("a", (b"", cached_detail("a", ["1"])), tag=TAG_A)
+
+        invalidator = CacheInvalidator(cache, partner_code="123456")
+
+        assert invalidator.consume([cached_detail("a", [])]) == ["a"]
+
+    def test_consume_ignores_other_partner_codes(self):
+        cache = ResponseCache()
+        cache.set("a", (b"", cached_detail("a", ["1"])), tag=TAG_A)
+        invalidator = CacheInvalidator(cache, partner_code="654321")
+
+        assert invalidator.consume([cached_detail("a", ["2"])]) == []
+        assert len(cache) == 1
+
+    def test_partner_code_is_required(self):
+        with pytest.raises(ValueError):
+            CacheInvalidator(ResponseCache())
+
+    def test_consume_refreshes(self):
+        cache = ResponseCache()
+        cache.set("a", (b"", cached_detail("a", ["1"])), tag=TAG_A)
+        client = Mock()
+        options = OrderQueryOptions(contacts=False)
+        invalidator = CacheInvalidator(
+            cache, refresh=True, endpoint="http://www.example.com/",
+            credentials=CREDENTIALS, query_options=options, client=client
+        )
+
+        invalidator.consume([cached_detail("a", ["2"])])
+
+        endpoint, request_model, credentials = client.post.call_args[0]
+        assert endpoint == "http://www.example.com/"
+        assert request_model.partner_order_id == "a"
+        assert request_model.query_options is options
+
+    def test_consume_refreshes_with_default_options(self):
+        cache = ResponseCache()
+        cache.set("a", (b"", cached_detail("a", ["1"])), tag=TAG_A)
+        client = Mock()
+        invalidator = CacheInvalidator(
+            cache, refresh=True, endpoint="http://www.example.com/",
+            credentials=CREDENTIALS, client=client
+        )
+
+        invalidator.consume([cached_detail("a", ["2"])])
+
+        request_model = client.post.call_args[0][1]
+        assert request_model.query_options.contacts is True
+
+    @patch("requests.Session.post")
+    def test_client_tags_entries(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+        client = SymantecClient(cache=ResponseCache())
+
+        client.post("http://www.example.com/", order_request(), CREDENTIALS)
+
+        assert list(client.cache._tags) == ["123456:131000-00000"]
@@ -0,0 +1,171 @@
+from __future__ import absolute_import, division, print_function
+import io
+
+from lxml import etree
+
+import pytest
+
+from symantecssl import utils
+from symantecssl.columns import OrderDetailColumns
+from symantecssl.response_models import OrderDetails, Projection
+from tests.unit import utils as test_utils
+
+FILENAMES = [
+    'order_detail.xml', 'order_detail_with_vuln.xml',
+    'order_detail_no_mod_event.xml', 'get_order_by_poid.xml'
+]
+
+
+def response_node():
+    root = etree.Element('Response')
+    for filename in FILENAMES:
+        node = test_utils.create_node_from_file(filename)
+        root.append(next(node.iter('{*}OrderDetail')))
+    return root
+
+
+class TestOrderDetailColumns(object):
+
+    def test_matches_order_details(self):
+        root = response_node()
+        details = OrderDetails.deserialize(root)
+
+        columns = OrderDetailColumns.deserialize(root)
+
+        assert len(columns) == 4
+        for index, detail in enumerate(details):
+            for name in columns.columns:
+                if '.' not in name:
+                    assert columns[name][index] == getattr(detail, name)
+            assert columns["organization_info.city"][index] == (
+                detail.organization_info.city
+            )
+            assert columns["contacts.admin.email"][index] == (
+                detail.organization_contacts.admin.email
+            )
+
+            offsets = columns.offsets["modified_events"]
+            events = slice(offsets[index], offsets[index + 1])
+            assert columns["modified_events.mod_id"][events] == [
+                event.mod_id for event in detail.modified_events
+            ]
+            offsets = columns.offsets["vulnerabilities"]
+            vulnerabilities = slice(offsets[index], offsets[index + 1])
+            assert columns["vulnerabilities.severity"][vulnerabilities] == [
+                vulnerability.severity
+                for vulnerability in detail.vulnerabilities
+            ]
+
+    def test_missing_fields(self):
+        node = etree.fromstring(
+            '<m:OrderDetail xmlns:m="http://api.geotrust.com/webtrust/query">'
+            '<m:OrderContacts><m:AdminContact><m:FirstName>John'
+            '</m:FirstName></m:AdminContact></m:OrderContacts>'
+            '</m:OrderDetail>'
+        )
+
+        columns = OrderDetailColumns()
+        columns.append(node)
+
+        assert columns["status_code"] == ["None"]
+        assert columns["organization_info.name"] == [""]
+        assert columns["contacts.admin.first_name"] == ["John"]
+        assert columns["contacts.admin.email"] == ["None"]
+        assert columns["contacts.tech.email"] == [""]
+        assert list(columns.offsets["modified_events"]) == [0, 0]
+
+    def test_pool(self):
+        pool = utils.StringPool()
+
+        columns = OrderDetailColumns.deserialize(response_node(), pool=pool)
+
+        first, second = columns["partner_order_id"][:2]
+        assert first is second
+        assert columns.take([0]).pool is pool
+        assert pool.bytes_saved > 0
+
+    def test_projection(self):
+        projection = Projection(["status_code", "modified_events.event_name"])
+
+        columns = OrderDetailColumns.deserialize(response_node(), projection)
+
+        assert list(columns.columns) == [
+            "status_code", "modified_events.event_name"
+        ]
+        assert list(columns.offsets) == ["modified_events"]
+        assert columns.counts("modified_events") == [1, 1, 0, 0]
+
+    def test_mask_and_compress(self):
+        columns = OrderDetailColumns.deserialize(response_node())
+
+        mask = columns.mask("status_code", lambda code: code != "None")
+        assert mask == [True, True, True, True]
+
+        mask = columns.mask(
+            "modified_events.event_name", lambda name: name == "Order Created"
+        )
+        selected = columns.compress(mask)
+
+        assert mask == [True, True, False, False]
+        assert len(selected) == 2
+        assert selected["modified_events.event_name"] == ["Order Created"] * 2
+        assert list(selected.offsets["modified_events"]) == [0, 1, 2]
+        assert list(selected.offsets["vulnerabilities"]) == [0, 0, 1]
+
+    def test_take_items(self):
+        columns = OrderDetailColumns.deserialize(response_node())
+
+        taken = columns.take([2, 1])
+
+        assert taken["vulnerabilities.severity"] == ["1", "1"]
+        assert list(taken.offsets["vulnerabilities"]) == [0, 1, 2]
+        assert taken.parents("vulnerabilities") == [0, 1]
+
+    def test_sort_by(self):
+        columns = OrderDetailColumns.deserialize(response_node())
+
+        ordered = columns.sort_by("status_code", reverse=True)
+
+        assert ordered["status_code"] == (
+            ["ORDER_WAITING_FOR_APPROVAL"] * 3 + ["ORDER_COMPLETE"]
+        )
+        assert ordered.counts("modified_events") == [1, 1, 0, 0]
+
+    def test_group_by(self):
+        columns = OrderDetailColumns.deserialize(response_node())
+
+        groups = columns.group_by("status_code")
+
+        assert list(groups) == ["ORDER_WAITING_FOR_APPROVAL", "ORDER_COMPLETE"]
+        assert len(groups["ORDER_WAITING_FOR_APPROVAL"]) == 3
+        assert groups["ORDER_COMPLETE"]["partner_order_id"] == [
+            "131000-00000"
+        ]
+
+    def test_group_by_item_column(self):
+        columns = OrderDetailColumns.deserialize(response_node())
+
+        with pytest.raises(ValueError):
+            columns.group_by("modified_events.event_name")
+
+    def test_export(self):
+        columns = OrderDetailColumns.deserialize(
+            response_node(),
+            Projection(["partner_order_id", "vulnerabilities.severity"])
+        )
+
+        assert columns.to_dict() == {
+            "partner_order_id": [
+                "eUogDVDrbdeRelyIzDyblFgWCOeeFc"
+            ] * 3 + ["131000-00000"]
+        }
+        assert columns.rows("vulnerabilities") == [
+            {"order": 1, "vulnerabilities.severity": "1"},
+            {"order": 2, "vulnerabilities.severity": "1"},
+        ]
+
+        output = io.StringIO()
+        columns.to_csv(output, "vulnerabilities")
+        assert output.getvalue().splitlines() == [
+            "order,vulnerabilities.severity", "1,1", "2,1"
+        ]
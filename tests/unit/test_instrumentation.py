@@ -0,0 +1,315 @@
+from __future__ import absolute_import, division, print_function
+import logging
+
+from lxml import etree
+from mock import Mock, patch
+
+import pytest
+
+from symantecssl.instrumentation import (
+    DESERIALIZE, PARSE, PHASES, SEND, SERIALIZE, Instrumentation,
+    LoggingInstrumentation, PrometheusInstrumentation, RequestMetrics
+)
+from symantecssl.order import (
+    FailedRequest, SymantecClient, serialize_request
+)
+from symantecssl.request_models import GetOrderByPartnerOrderID
+from tests.unit import utils as test_utils
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+class RecordingInstrumentation(Instrumentation):
+
+    def __init__(self):
+        self.recorded = []
+
+    def record(self, metrics):
+        self.recorded.append(metrics)
+
+
+class BrokenInstrumentation(Instrumentation):
+
+    def record(self, metrics):
+        raise RuntimeError("exporter unavailable")
+
+
+def response_body():
+    return etree.tostring(
+        test_utils.create_node_from_file('get_order_by_poid.xml')
+    )
+
+
+def metrics(error=None):
+    result = RequestMetrics(
+        Instrumentation(), "GetOrderByPartnerOrderID",
+        "http://www.example.com/"
+    )
+    for phase in PHASES:
+        result.wall_times[phase] = 0.25
+        result.cpu_times[phase] = 0.125
+    result.request_bytes = 1000
+    result.response_bytes = 2000
+    result.status_code = 500 if error else 200
+    result.error = error
+    return result
+
+
+class TestClientInstrumentation(object):
+
+    @patch("requests.Session.post")
+    def test_phases(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = response_body()
+        instrumentation = RecordingInstrumentation()
+        client = SymantecClient(instrumentation=instrumentation)
+
+        client.post(
+            "http://www.example.com/", GetOrderByPartnerOrderID(),
+            CREDENTIALS
+        )
+
+        recorded, = instrumentation.recorded
+        assert recorded.request_type == "GetOrderByPartnerOrderID"
+        assert recorded.endpoint == "http://www.example.com/"
+        assert set(recorded.wall_times) == set(PHASES)
+        assert set(recorded.cpu_times) == set(PHASES)
+        assert recorded.wall_time >= recorded.wall_times[SEND]
+        assert recorded.request_bytes == len(mocked_post.call_args[0][1])
+        assert recorded.response_bytes == len(response_body())
+        assert recorded.status_code == 200
+        assert recorded.error is None
+
+    @patch("requests.Session.post")
+    def test_failed_request(self, mocked_post):
+        mocked_post.return_value.status_code = 500
+        instrumentation = RecordingInstrumentation()
+        client = SymantecClient(instrumentation=instrumentation)
+
+        with pytest.raises(FailedRequest):
+            client.post(
+                "http://www.example.com/", GetOrderByPartnerOrderID(),
+                CREDENTIALS
+            )
+
+        recorded, = instrumentation.recorded
+        assert recorded.status_code == 500
+        assert isinstance(recorded.error, FailedRequest)
+        assert PARSE not in recorded.wall_times
+
+    @patch("requests.Session.post")
+    def test_post_serialized(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = response_body()
+        instrumentation = RecordingInstrumentation()
+        client = SymantecClient(instrumentation=instrumentation)
+        request_model = GetOrderByPartnerOrderID()
+        serialized_xml = serialize_request(request_model, CREDENTIALS)
+
+        client.post_serialized(
+            "http://www.example.com/", request_model, serialized_xml
+        )
+
+        recorded, = instrumentation.recorded
+        assert set(recorded.wall_times) == set([SEND, PARSE, DESERIALIZE])
+        assert SERIALIZE not in recorded.wall_times
+
+    @patch("requests.Session.post")
+    def test_unreadable_response(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = b"<truncated"
+        instrumentation = RecordingInstrumentation()
+        client = SymantecClient(instrumentation=instrumentation)
+
+        with pytest.raises(etree.XMLSyntaxError):
+            client.post(
+                "http://www.example.com/", GetOrderByPartnerOrderID(),
+                CREDENTIALS
+            )
+
+        recorded, = instrumentation.recorded
+        assert recorded.status_code == 200
+        assert isinstance(recorded.error, etree.XMLSyntaxError)
+
+    @patch("requests.Session.post")
+    def test_streamed_request_size_is_unknown(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = response_body()
+        instrumentation = RecordingInstrumentation()
+        client = SymantecClient(
+            instrumentation=instrumentation, stream_requests=True
+        )
+
+        client.post(
+            "http://www.example.com/", GetOrderByPartnerOrderID(),
+            CREDENTIALS
+        )
+
+        recorded, = instrumentation.recorded
+        assert recorded.request_bytes is None
+        assert recorded.response_bytes == len(response_body())
+
+    @patch("requests.Session.post")
+    def test_record_errors_are_logged(self, mocked_post, caplog):
+        mocked_post.return_value.status_code = 500
+        client = SymantecClient(instrumentation=BrokenInstrumentation())
+
+        with pytest.raises(FailedRequest):
+            client.post(
+                "http://www.example.com/", GetOrderByPartnerOrderID(),
+                CREDENTIALS
+            )
+
+        record, = caplog.records
+        assert record.levelno == logging.ERROR
+        assert record.getMessage() == (
+            "Could not record the metrics of GetOrderByPartnerOrderID to "
+            "http://www.example.com/"
+        )
+        assert isinstance(record.exc_info[1], RuntimeError)
+
+    @patch("requests.Session.post")
+    def test_record_errors_keep_the_response(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = response_body()
+        client = SymantecClient(instrumentation=BrokenInstrumentation())
+
+        response = client.post(
+            "http://www.example.com/", GetOrderByPartnerOrderID(),
+            CREDENTIALS
+        )
+
+        assert response.model.status_code == "ORDER_COMPLETE"
+
+
+class TestRequestMetrics(object):
+
+    def test_phases(self):
+        result = RequestMetrics(
+            Instrumentation(), "GetOrderByPartnerOrderID",
+            "http://www.example.com/"
+        )
+
+        with result.phase(PARSE):
+            pass
+        with result.phase(SEND, cpu=False):
+            pass
+
+        assert set(result.wall_times) == set([PARSE, SEND])
+        assert set(result.cpu_times) == set([PARSE])
+        assert result.cpu_time == result.cpu_times[PARSE]
+
+    def test_response_without_body(self):
+        result = metrics()
+        result.response_bytes = None
+
+        result.record_response(Mock(status_code=200, content=None))
+
+        assert result.response_bytes is None
+
+
+class TestLoggingInstrumentation(object):
+
+    def test_record(self, caplog):
+        caplog.set_level(logging.DEBUG, logger="symantecssl")
+
+        LoggingInstrumentation().record(metrics())
+
+        record, = caplog.records
+        assert record.levelno == logging.DEBUG
+        assert record.getMessage() == (
+            "GetOrderByPartnerOrderID to http://www.example.com/: status 200 "
+            "in 1.000 s [serialize 0.250 s (cpu 0.125 s), send 0.250 s "
+            "(cpu 0.125 s), parse 0.250 s (cpu 0.125 s), deserialize 0.250 s "
+            "(cpu 0.125 s)], request 1000 bytes, response 2000 bytes"
+        )
+        assert record.metrics.status_code == 200
+
+    def test_failure(self, caplog):
+        caplog.set_level(logging.WARNING, logger="symantecssl")
+
+        LoggingInstrumentation().record(metrics(FailedRequest(500)))
+
+        record, = caplog.records
+        assert record.levelno == logging.WARNING
+        assert "failed: FailedRequest" in record.getMessage()
+
+    def test_without_cpu_time(self, caplog):
+        caplog.set_level(logging.DEBUG, logger="symantecssl")
+        result = metrics()
+        del result.cpu_times[SEND]
+
+        LoggingInstrumentation().record(result)
+
+        record, = caplog.records
+        assert "send 0.250 s, parse" in record.getMessage()
+
+    def test_disabled(self, caplog):
+        caplog.set_level(logging.INFO, logger="symantecssl")
+
+        LoggingInstrumentation().record(metrics())
+
+        assert caplog.records == []
+
+
+class TestPrometheusInstrumentation(object):
+
+    def test_record(self):
+        prometheus_client = pytest.importorskip("prometheus_client")
+        registry = prometheus_client.CollectorRegistry()
+        instrumentation = PrometheusInstrumentation(registry=registry)
+
+        instrumentation.record(metrics())
+        instrumentation.record(metrics(FailedRequest(500)))
+
+        labels = {"request_type": "GetOrderByPartnerOrderID"}
+        assert registry.get_sample_value(
+            "symantecssl_requests_total", dict(labels, status="200")
+        ) == 1
+        assert registry.get_sample_value(
+            "symantecssl_phase_seconds_sum", dict(labels, phase="send")
+        ) == 0.5
+        assert registry.get_sample_value(
+            "symantecssl_response_bytes_count", labels
+        ) == 2
+
+    def test_unknown_sizes(self):
+        prometheus_client = pytest.importorskip("prometheus_client")
+        registry = prometheus_client.CollectorRegistry()
+        result = metrics()
+        result.request_bytes = None
+        result.response_bytes = None
+
+        PrometheusInstrumentation(registry=registry).record(result)
+
+        labels = {"request_type": "GetOrderByPartnerOrderID"}
+        assert registry.get_sample_value(
+            "symantecssl_request_bytes_count", labels
+        ) is None
+        assert registry.get_sample_value(
+            "symantecssl_response_bytes_count", labels
+        ) is None
+        assert registry.get_sample_value(
+            "symantecssl_requests_total", dict(labels, status="200")
+        ) == 1
+
+    def test_default_registry(self):
+        prometheus_client = pytest.importorskip("prometheus_client")
+        registry = prometheus_client.CollectorRegistry()
+
+        with patch.object(prometheus_client, "REGISTRY", registry):
+            PrometheusInstrumentation().record(metrics())
+
+        assert registry.get_sample_value(
+            "symantecssl_requests_total",
+            {"request_type": "GetOrderByPartnerOrderID", "status": "200"}
+        ) == 1
+
+    def test_prometheus_client_required(self):
+        with patch("symantecssl.instrumentation.prometheus_client", None):
+            with pytest.raises(ImportError):
+                PrometheusInstrumentation()
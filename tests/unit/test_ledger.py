@@ -0,0 +1,436 @@
+from __future__ import absolute_import, division, print_function
+import datetime
+import sqlite3
+import time
+
+from lxml import etree
+from mock import Mock
+
+import pytest
+import requests
+
+from symantecssl.ledger import (
+    ACKNOWLEDGED, FAILED, SUBMITTED, FileLedgerStore, LedgerConflictError,
+    LedgerEntry, LedgerStore, OrderLedger, SQLiteLedgerStore
+)
+from symantecssl.order import FailedRequest, parse_response
+from symantecssl.request_models import (
+    GetModifiedOrderRequest, GetOrderByPartnerOrderID, QuickOrderRequest,
+    Reissue
+)
+from symantecssl.response_models import (
+    ModificationEvent, ModificationEvents, OrderDetail, OrderDetails,
+    QuickOrderResponse, ReissueResponse
+)
+from tests.unit import utils as test_utils
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+PLACED = object()
+LOST = object()
+
+
+def quick_order(partner_order_id="04201988"):
+    request = QuickOrderRequest()
+    request.request_header.set_request_header("SSL123", partner_order_id)
+    return request
+
+
+def reissue(partner_order_id="04201988"):
+    request = Reissue()
+    request.request_header.set_request_header("SSL123", partner_order_id)
+    return request
+
+
+def event(name, time_stamp):
+    modification_event = ModificationEvent()
+    modification_event.event_name = name
+    modification_event.time_stamp = time_stamp
+    return modification_event
+
+
+def now(offset=datetime.timedelta(0)):
+    return (datetime.datetime.utcnow() + offset).isoformat() + "+00:00"
+
+
+class FakeClient(object):
+    """Places orders according to a list of outcomes.
+
+    Each outcome is PLACED, LOST for an order placed whose response was
+    lost in a timeout, or an exception raised without placing the order.
+    Placed orders are recorded by partner order ID with their GeoTrust
+    order ID, reissues with the time of their reissue event, read from a
+    clock offset from the local one by clock_offset.
+    """
+
+    parser = None
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.clock_offset = datetime.timedelta(0)
+        self.placed = {}
+        self.reissued = {}
+        self.orders = 0
+        self.queries = 0
+
+    def _modified_orders(self):
+        details = []
+        for partner_order_id, time_stamp in self.reissued.items():
+            detail = OrderDetail()
+            detail.partner_order_id = partner_order_id
+            detail.geotrust_order_id = "1934562"
+            detail.modified_events = ModificationEvents([
+                event("Order Created", "2014-08-05T15:05:33+00:00"),
+                event("Order Reissued", time_stamp),
+            ])
+            details.append(detail)
+        return OrderDetails(details)
+
+    def post(self, endpoint, request_model, credentials):
+        if isinstance(request_model, GetOrderByPartnerOrderID):
+            assert not request_model.cacheable
+            self.queries += 1
+            detail = OrderDetail()
+            partner_order_id = request_model.partner_order_id
+            if partner_order_id in self.placed:
+                detail.partner_order_id = partner_order_id
+                detail.geotrust_order_id = self.placed[partner_order_id]
+            return Mock(model=detail)
+        if isinstance(request_model, GetModifiedOrderRequest):
+            self.queries += 1
+            return Mock(model=self._modified_orders())
+
+        self.orders += 1
+        outcome = self.outcomes.pop(0)
+        partner_order_id = request_model.request_header.partner_order_id
+        if isinstance(request_model, Reissue):
+            placed, filename = self.reissued, 'reissue_response.xml'
+            placed_value = lost_value = now(self.clock_offset)
+        else:
+            placed, filename = self.placed, 'quick_order_response.xml'
+            placed_value, lost_value = "1912794", "1234"
+        if outcome is LOST:
+            placed[partner_order_id] = lost_value
+            raise requests.Timeout()
+        if outcome is not PLACED:
+            raise outcome
+
+        placed[partner_order_id] = placed_value
+        content = etree.tostring(test_utils.create_node_from_file(filename))
+        return Mock(
+            content=content,
+            model=parse_response(request_model, 200, content)
+        )
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmpdir):
+    if request.param == "file":
+        return FileLedgerStore(str(tmpdir.join("ledger.json")))
+    return SQLiteLedgerStore(str(tmpdir.join("ledger.db")))
+
+
+def ledger(store, client, **kwargs):
+    return OrderLedger(
+        store, "http://www.example.com/query", client=client, **kwargs
+    )
+
+
+def place(ledger, request_model=None):
+    return ledger.post(
+        "http://www.example.com/order", request_model or quick_order(),
+        CREDENTIALS
+    )
+
+
+class TestLedgerStores(object):
+
+    def test_round_trip(self, store):
+        entry = LedgerEntry(
+            "QuickOrderRequest", "04201988", ACKNOWLEDGED, attempts=2,
+            geotrust_order_id="1234", content=b"<response/>"
+        )
+        store.save(entry)
+
+        assert store.get("QuickOrderRequest", "04201988").to_row() == (
+            entry.to_row()
+        )
+        assert store.get("Reissue", "04201988") is None
+        assert store.get("QuickOrderRequest", "missing") is None
+
+    def test_entries_by_request_type(self, store):
+        store.save(LedgerEntry("QuickOrderRequest", "04201988", ACKNOWLEDGED))
+        store.save(LedgerEntry("Reissue", "04201988", FAILED))
+
+        assert store.get("QuickOrderRequest", "04201988").state == (
+            ACKNOWLEDGED
+        )
+        assert store.get("Reissue", "04201988").state == FAILED
+
+    def test_purge(self, store):
+        store.save(LedgerEntry("QuickOrderRequest", "old", submitted=100))
+        store.save(LedgerEntry("QuickOrderRequest", "new", submitted=300))
+
+        assert store.purge(200) == 1
+        assert store.get("QuickOrderRequest", "old") is None
+        assert store.get("QuickOrderRequest", "new") is not None
+
+    def test_sqlite_close(self, tmpdir):
+        store = SQLiteLedgerStore(str(tmpdir.join("ledger.db")))
+        store.close()
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            store.get("QuickOrderRequest", "04201988")
+
+    @pytest.mark.parametrize("call", [
+        lambda store: store.get("QuickOrderRequest", "04201988"),
+        lambda store: store.save(LedgerEntry("QuickOrderRequest", "1")),
+        lambda store: store.purge(0),
+    ])
+    def test_interface(self, call):
+        with pytest.raises(NotImplementedError):
+            call(LedgerStore())
+
+
+class TestOrderLedger(object):
+
+    def test_duplicates_return_recorded_result(self, store):
+        client = FakeClient(PLACED)
+        order_ledger = ledger(store, client)
+
+        first = place(order_ledger)
+        second = place(order_ledger)
+
+        assert client.orders == 1
+        assert isinstance(second.model, QuickOrderResponse)
+        assert second.model.result.order_id == "1912794"
+        assert second.content == first.content
+        assert store.get("QuickOrderRequest", "04201988").state == ACKNOWLEDGED
+        assert order_ledger.stats["duplicates"] == 1
+
+    def test_ambiguous_failure_reconciled(self, store):
+        client = FakeClient(LOST)
+        order_ledger = ledger(store, client)
+
+        response = place(order_ledger)
+
+        assert (client.orders, client.queries) == (1, 1)
+        assert response.model.result.order_id == "1234"
+        assert response.model.result.order_response.partner_order_id == (
+            "04201988"
+        )
+        assert store.get("QuickOrderRequest", "04201988").state == ACKNOWLEDGED
+        assert place(order_ledger).model.result.order_id == "1234"
+
+    def test_resubmitted_when_not_placed(self, store):
+        client = FakeClient(requests.Timeout(), PLACED)
+        order_ledger = ledger(store, client)
+
+        response = place(order_ledger)
+
+        assert (client.orders, client.queries) == (2, 1)
+        assert response.model.result.order_id == "1912794"
+        assert store.get("QuickOrderRequest", "04201988").attempts == 2
+        assert order_ledger.stats["resubmits"] == 1
+
+    def test_gives_up_after_resubmits(self, store):
+        client = FakeClient(FailedRequest(status_code=503), requests.Timeout())
+        order_ledger = ledger(store, client)
+
+        with pytest.raises(requests.Timeout):
+            place(order_ledger)
+
+        assert (client.orders, client.queries) == (2, 2)
+        assert store.get("QuickOrderRequest", "04201988").state == FAILED
+
+    def test_rejected_orders_are_not_reconciled(self, store):
+        client = FakeClient(FailedRequest(status_code=400), PLACED)
+        order_ledger = ledger(store, client)
+
+        with pytest.raises(FailedRequest):
+            place(order_ledger)
+
+        assert client.queries == 0
+        assert store.get("QuickOrderRequest", "04201988").state == FAILED
+        place(order_ledger)
+        assert store.get("QuickOrderRequest", "04201988").state == ACKNOWLEDGED
+
+    def test_unknown_outcome_reconciled_first(self, store):
+        store.save(LedgerEntry(
+            "QuickOrderRequest", "04201988", SUBMITTED, attempts=1
+        ))
+        client = FakeClient()
+        client.placed["04201988"] = "1234"
+
+        response = place(ledger(store, client))
+
+        assert (client.orders, client.queries) == (0, 1)
+        assert response.model.result.order_id == "1234"
+
+    def test_unknown_outcome_not_placed_is_resubmitted(self, store):
+        store.save(LedgerEntry(
+            "QuickOrderRequest", "04201988", SUBMITTED, attempts=1
+        ))
+        client = FakeClient(PLACED)
+
+        response = place(ledger(store, client))
+
+        assert (client.orders, client.queries) == (1, 1)
+        assert response.model.result.order_id == "1912794"
+        assert store.get("QuickOrderRequest", "04201988").attempts == 2
+
+    def test_reconciliation_failure_keeps_entry_submitted(self, store):
+        client = FakeClient()
+        client.post = Mock(side_effect=[
+            requests.Timeout(), requests.ConnectionError()
+        ])
+
+        with pytest.raises(requests.Timeout):
+            place(ledger(store, client))
+
+        assert store.get("QuickOrderRequest", "04201988").state == SUBMITTED
+
+    def test_window(self, store):
+        store.save(LedgerEntry(
+            "QuickOrderRequest", "04201988", ACKNOWLEDGED,
+            submitted=time.time() - 7200, content=b"<response/>"
+        ))
+        client = FakeClient(PLACED)
+        order_ledger = ledger(
+            store, client, window=datetime.timedelta(hours=1)
+        )
+
+        place(order_ledger)
+
+        assert client.orders == 1
+        assert order_ledger.purge() == 0
+
+    def test_partner_order_id_required(self, store):
+        with pytest.raises(ValueError):
+            ledger(store, FakeClient()).post(
+                "http://www.example.com/order", quick_order(""), CREDENTIALS
+            )
+
+    def test_in_flight_conflict(self, store):
+        order_ledger = ledger(store, FakeClient(PLACED))
+        order_ledger._in_flight.add(("QuickOrderRequest", "04201988"))
+
+        with pytest.raises(LedgerConflictError):
+            place(order_ledger)
+        place(order_ledger, reissue())
+
+    def test_local_errors_are_not_reconciled(self, store):
+        client = FakeClient(ValueError("invalid character"))
+        order_ledger = ledger(store, client)
+
+        with pytest.raises(ValueError):
+            place(order_ledger)
+
+        assert client.queries == 0
+        assert store.get("QuickOrderRequest", "04201988").state == FAILED
+
+    def test_unreadable_responses_are_reconciled(self, store):
+        client = FakeClient(etree.XMLSyntaxError("truncated", 1, 1, 1))
+        client.placed["04201988"] = "1234"
+
+        response = place(ledger(store, client))
+
+        assert client.queries == 1
+        assert response.model.result.order_id == "1234"
+
+    def test_only_orders_are_recorded(self, store):
+        with pytest.raises(TypeError):
+            ledger(store, FakeClient()).post(
+                "http://www.example.com/order", GetOrderByPartnerOrderID(),
+                CREDENTIALS
+            )
+
+
+class TestReissueLedger(object):
+
+    def test_recorded_apart_from_the_order(self, store):
+        client = FakeClient(PLACED, PLACED)
+        order_ledger = ledger(store, client)
+
+        place(order_ledger)
+        response = place(order_ledger, reissue())
+
+        assert client.orders == 2
+        assert isinstance(response.model, ReissueResponse)
+        assert store.get("Reissue", "04201988").state == ACKNOWLEDGED
+
+    def test_duplicates_return_recorded_result(self, store):
+        client = FakeClient(PLACED)
+        order_ledger = ledger(store, client)
+
+        first = place(order_ledger, reissue())
+        second = place(order_ledger, reissue())
+
+        assert client.orders == 1
+        assert isinstance(second.model, ReissueResponse)
+        assert second.content == first.content
+
+    def test_ambiguous_failure_reconciled(self, store):
+        client = FakeClient(LOST)
+        order_ledger = ledger(store, client)
+
+        response = place(order_ledger, reissue())
+
+        assert (client.orders, client.queries) == (1, 1)
+        assert isinstance(response.model, ReissueResponse)
+        assert response.model.result.order_response.partner_order_id == (
+            "04201988"
+        )
+        entry = store.get("Reissue", "04201988")
+        assert entry.state == ACKNOWLEDGED
+        assert entry.geotrust_order_id == "1934562"
+
+    def test_resubmitted_without_reissue_event(self, store):
+        client = FakeClient(requests.Timeout(), PLACED)
+        client.placed["04201988"] = "1912794"
+        client.reissued["04201988"] = "2014-08-05T15:05:33+00:00"
+
+        place(ledger(store, client), reissue())
+
+        assert (client.orders, client.queries) == (2, 1)
+        assert store.get("Reissue", "04201988").attempts == 2
+
+    def test_other_orders_and_invalid_timestamps_are_ignored(self, store):
+        client = FakeClient(requests.Timeout(), PLACED)
+        client.reissued["other"] = now()
+        client.reissued["04201988"] = "invalid"
+
+        place(ledger(store, client), reissue())
+
+        assert (client.orders, client.queries) == (2, 1)
+
+    def test_query_covers_the_submission(self, store):
+        client = FakeClient(requests.Timeout(), PLACED)
+        client.post = Mock(wraps=client.post)
+
+        place(ledger(store, client), reissue())
+
+        query = client.post.call_args_list[1][0][1]
+        entry = store.get("Reissue", "04201988")
+        assert isinstance(query, GetModifiedOrderRequest)
+        submitted = datetime.datetime.utcfromtimestamp(entry.submitted)
+        since = submitted - datetime.timedelta(minutes=5)
+        assert query.from_date == since.isoformat()
+        assert "modified_events" in query.projection.fields
+
+    @pytest.mark.parametrize("clock_skew,orders", [
+        (datetime.timedelta(minutes=5), 1),
+        (datetime.timedelta(0), 2),
+    ])
+    def test_symantec_clock_behind(self, store, clock_skew, orders):
+        client = FakeClient(LOST, PLACED)
+        # The reissue event is stamped a minute before the local submission.
+        client.clock_offset = -datetime.timedelta(minutes=1)
+
+        place(ledger(store, client, clock_skew=clock_skew), reissue())
+
+        assert (client.orders, client.queries) == (orders, 1)
+        assert store.get("Reissue", "04201988").state == ACKNOWLEDGED
@@ -1,17 +1,28 @@
 from __future__ import absolute_import, division, print_function
-from mock import patch
+from mock import MagicMock, Mock, patch
 from lxml import etree
 
+import io
+import threading
+
 import pytest
 
-from symantecssl.order import FailedRequest, post_request
-from symantecssl.request_models import GetModifiedOrderRequest
+from symantecssl.order import (
+    FailedRequest, SymantecClient, fetch_order_columns, get_default_client,
+    parse_response, post_request, stream_order_details
+)
+from symantecssl import order, utils
+from symantecssl.request_models import (
+    GetModifiedOrderRequest, QuickOrderRequest, Reissue, RequestEnvelope
+)
+from symantecssl.response_models import LazyOrderDetail, OrderDetail
+from symantecssl.streaming import RequestBody
 from tests.unit import utils as test_utils
 
 
 class TestPostRequest(object):
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_successful_post_request(self, mocked_post):
 
         endpoint = "http://www.example.com/"
@@ -40,7 +51,99 @@ class TestPostRequest(object):
         assert detail.organization_info.country == "US"
         assert detail.status_code == "ORDER_COMPLETE"
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
+    def test_lazy_post_request(self, mocked_post):
+
+        endpoint = "http://www.example.com/"
+        request_model = GetModifiedOrderRequest()
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        response = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = response
+
+        response = post_request(
+            endpoint, request_model, credentials, lazy=True
+        )
+
+        detail = response.model[0]
+
+        assert isinstance(detail, LazyOrderDetail)
+        assert detail.status_code == "ORDER_COMPLETE"
+        assert detail.organization_info.city == "City"
+
+    @patch("requests.Session.post")
+    def test_projected_post_request(self, mocked_post):
+
+        endpoint = "http://www.example.com/"
+        request_model = GetModifiedOrderRequest()
+        request_model.set_projection(["status_code", "organization_info.city"])
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        response = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = response
+
+        response = post_request(
+            endpoint, request_model, credentials
+        )
+
+        detail = response.model[0]
+
+        assert detail.status_code == "ORDER_COMPLETE"
+        assert detail.organization_info.city == "City"
+        assert detail.organization_info.country == ""
+        assert detail.organization_contacts.admin.email == ""
+        assert detail.partner_order_id == ""
+
+    @patch("requests.Session.post")
+    def test_pooled_post_request(self, mocked_post):
+
+        endpoint = "http://www.example.com/"
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        response = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = response
+        pool = utils.StringPool()
+
+        first, second = [
+            post_request(
+                endpoint, GetModifiedOrderRequest(), credentials, pool=pool
+            ).model[0]
+            for _ in range(2)
+        ]
+
+        assert first.approver_email is second.approver_email
+        assert pool.hits > 0
+
+    def test_pool_ignored_without_order_details(self):
+        content = etree.tostring(
+            test_utils.create_node_from_file('quick_order_response.xml')
+        )
+        pool = utils.StringPool()
+
+        model = parse_response(QuickOrderRequest(), 200, content, pool=pool)
+
+        assert model.result.order_response.success_code == "0"
+        assert len(pool) == 0
+
+    @patch("requests.Session.post")
     def test_bad_response(self, mocked_post):
 
         endpoint = "http://www.example.com/"
@@ -56,3 +159,287 @@ class TestPostRequest(object):
             post_request(
                 endpoint, request_model, credentials
             )
+
+
+class TestParseResponse(object):
+
+    def test_parser_is_reused_per_thread(self):
+        parser = utils.get_response_parser()
+        parsers = []
+        thread = threading.Thread(
+            target=lambda: parsers.append(utils.get_response_parser())
+        )
+        thread.start()
+        thread.join()
+
+        assert utils.get_response_parser() is parser
+        assert parsers[0] is not parser
+
+    def test_bad_status_code(self):
+        with pytest.raises(FailedRequest) as error:
+            parse_response(GetModifiedOrderRequest(), 503, b"")
+
+        assert error.value.status_code == 503
+
+    def test_huge_text_nodes(self):
+        content = b''.join([
+            b'<m:OrderDetail xmlns:m="http://api.geotrust.com/webtrust/query">'
+            b'<m:ApproverEmailAddress>',
+            b'a' * (11 * 1024 * 1024),
+            b'</m:ApproverEmailAddress></m:OrderDetail>'
+        ])
+        request_model = Mock(projection=None)
+        request_model.response_model = OrderDetail
+
+        detail = parse_response(request_model, 200, content)
+
+        assert len(detail.approver_email) == 11 * 1024 * 1024
+
+    def test_entities_are_not_resolved(self):
+        content = (
+            b'<!DOCTYPE m:OrderDetail [<!ENTITY email "admin@example.com">]>'
+            b'<m:OrderDetail xmlns:m="http://api.geotrust.com/webtrust/query">'
+            b'<m:ApproverEmailAddress>&email;</m:ApproverEmailAddress>'
+            b'</m:OrderDetail>'
+        )
+        request_model = Mock(projection=None)
+        request_model.response_model = OrderDetail
+
+        detail = parse_response(request_model, 200, content)
+
+        assert detail.approver_email is None
+
+    @patch("requests.Session.post")
+    def test_client_parser(self, mocked_post):
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+        parser = etree.XMLParser()
+        root = etree.fromstring(mocked_post.return_value.content)
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+
+        with patch("lxml.etree.fromstring", return_value=root) as fromstring:
+            SymantecClient(parser=parser).post(
+                "http://www.example.com/", GetModifiedOrderRequest(),
+                credentials
+            )
+
+        assert fromstring.call_args[0][1] is parser
+
+
+class TestSymantecClient(object):
+
+    def test_endpoints_get_dedicated_pools(self):
+        client = SymantecClient(pool_maxsize=4)
+
+        client._mount("https://example.com/query")
+        client._mount("https://example.com/order")
+        client._mount("https://example.com/query")
+
+        assert len(client._adapters) == 2
+        query_adapter = client.session.get_adapter("https://example.com/query")
+        assert query_adapter is client._adapters["https://example.com/query"]
+        assert query_adapter._pool_maxsize == 4
+
+    def test_keep_alive_disabled(self):
+        client = SymantecClient(keep_alive=False)
+
+        assert client.session.headers["Connection"] == "close"
+
+    def test_context_manager_closes_session(self):
+        with SymantecClient() as client:
+            client._mount("https://example.com/query")
+            client.session.close = Mock()
+
+        client.session.close.assert_called_once_with()
+        assert client._adapters == {}
+
+    @patch("requests.Session.post")
+    def test_session_is_reused(self, mocked_post):
+        client = SymantecClient(timeout=5)
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+
+        for _ in range(3):
+            client.post(
+                "http://www.example.com/", GetModifiedOrderRequest(),
+                credentials
+            )
+
+        assert mocked_post.call_count == 3
+        assert mocked_post.call_args[1]["timeout"] == 5
+        assert len(client._adapters) == 1
+
+    @patch("requests.Session.post")
+    def test_compact_requests(self, mocked_post):
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+
+        SymantecClient(pretty_print=False).post(
+            "http://www.example.com/", GetModifiedOrderRequest(), credentials
+        )
+
+        body = mocked_post.call_args[0][1]
+        assert b"\n" not in body
+        assert b"<PartnerCode>123456</PartnerCode>" in body
+
+    @patch("requests.Session.post")
+    def test_subclassed_requests(self, mocked_post):
+        class CustomRequest(GetModifiedOrderRequest):
+            pass
+
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        )
+        request_model = CustomRequest()
+
+        response = SymantecClient().post(
+            "http://www.example.com/", request_model, credentials
+        )
+
+        body = mocked_post.call_args[0][1]
+        assert body == etree.tostring(
+            RequestEnvelope(request_model).serialize(), pretty_print=True
+        )
+        assert response.model[0].status_code == "ORDER_COMPLETE"
+
+    @patch("requests.Session.post")
+    def test_stream_requests(self, mocked_post):
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        request = Reissue()
+        request.add_san("www.example.com")
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.content = etree.tostring(
+            test_utils.create_node_from_file('reissue_response.xml')
+        )
+
+        SymantecClient(stream_requests=True).post(
+            "http://www.example.com/", request, credentials
+        )
+
+        body = mocked_post.call_args[0][1]
+        assert isinstance(body, RequestBody)
+        assert b"".join(body) == etree.tostring(
+            RequestEnvelope(request).serialize()
+        )
+
+    def test_default_client_is_shared(self):
+        assert get_default_client() is get_default_client()
+
+    def test_default_client_created_while_waiting_for_the_lock(self):
+        client = SymantecClient()
+        lock = MagicMock()
+        lock.__enter__.side_effect = lambda: setattr(
+            order, "_default_client", client
+        )
+
+        with patch.object(order, "_default_client", None), \
+                patch.object(order, "_default_client_lock", lock):
+            assert get_default_client() is client
+
+    def test_pool_mounted_while_waiting_for_the_lock(self):
+        client = SymantecClient()
+        adapter = Mock()
+        client._lock = MagicMock()
+        client._lock.__enter__.side_effect = lambda: client._adapters.update(
+            {"https://example.com/query": adapter}
+        )
+
+        client._mount("https://example.com/query")
+
+        assert client._adapters == {"https://example.com/query": adapter}
+
+
+class TestStreamOrderDetails(object):
+
+    @patch("requests.Session.post")
+    def test_stream_order_details(self, mocked_post):
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.raw = io.BytesIO(etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        ))
+
+        details = list(stream_order_details(
+            "http://www.example.com/", GetModifiedOrderRequest(), credentials
+        ))
+
+        assert len(details) == 1
+        assert details[0].status_code == "ORDER_COMPLETE"
+        assert mocked_post.call_args[1]["stream"] is True
+        mocked_post.return_value.close.assert_called_once_with()
+
+    @patch("requests.Session.post")
+    def test_stream_bad_response(self, mocked_post):
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        mocked_post.return_value.status_code = 500
+
+        details = stream_order_details(
+            "http://www.example.com/", GetModifiedOrderRequest(), credentials
+        )
+        with pytest.raises(FailedRequest):
+            next(details)
+        mocked_post.return_value.close.assert_called_once_with()
+
+
+class TestFetchOrderColumns(object):
+
+    @patch("requests.Session.post")
+    def test_fetch_order_columns(self, mocked_post):
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": "TrainConductor"
+        }
+        mocked_post.return_value.status_code = 200
+        mocked_post.return_value.raw = io.BytesIO(etree.tostring(
+            test_utils.create_node_from_file('get_order_by_poid.xml')
+        ))
+        request = GetModifiedOrderRequest()
+        request.set_projection(["status_code"])
+
+        columns = fetch_order_columns(
+            "http://www.example.com/", request, credentials
+        )
+
+        assert list(columns.columns) == ["status_code"]
+        assert columns["status_code"] == ["ORDER_COMPLETE"]
+        assert mocked_post.call_args[1]["stream"] is True
+        mocked_post.return_value.close.assert_called_once_with()
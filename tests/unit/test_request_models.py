@@ -1,11 +1,14 @@
 from __future__ import absolute_import, division, print_function
 import datetime
 
+from lxml import etree
+from mock import Mock
+
 from symantecssl.models import ContactInfo
 from symantecssl.request_models import (
     GetModifiedOrderRequest, GetOrderByPartnerOrderID, OrderQueryOptions,
     OrderChanges, QuickOrderRequest, RequestHeader, RequestEnvelope, Reissue,
-    ReissueEmail
+    ReissueEmail, _HEADER_FRAGMENTS
 )
 from symantecssl import utils
 
@@ -50,6 +53,75 @@ class TestQueryRequestHeader(object):
         assert root.find('.//ProductCode').text == "SSL123"
         assert root.find('.//PartnerOrderID').text == "2364"
 
+    def test_headers_are_cached_per_credential_set(self):
+        qrh = RequestHeader()
+        qrh.partner_code = "BL2"
+        qrh.username = "Axton"
+        qrh.password = "IHateCL4P-TP!"
+
+        first = qrh.serialize(order_type=False)
+        second = qrh.serialize(order_type=False)
+        first.find('.//UserName').text = "Changed"
+        qrh.password = "Sp4rkyL0g1n"
+        third = qrh.serialize(order_type=False)
+
+        assert first is not second
+        assert second.find('.//UserName').text == "Axton"
+        assert second.find('.//Password').text == "IHateCL4P-TP!"
+        assert third.find('.//Password').text == "Sp4rkyL0g1n"
+
+    def test_passwords_are_not_cached(self):
+        qrh = RequestHeader()
+        qrh.partner_code = "BL2"
+        qrh.username = "Axton"
+        qrh.password = "IHateCL4P-TP!"
+
+        qrh.serialize(order_type=False)
+        qrh.serialize(order_type=True)
+
+        for key, fragment in _HEADER_FRAGMENTS._fragments.items():
+            assert "IHateCL4P-TP!" not in key
+            assert b"IHateCL4P-TP!" not in etree.tostring(fragment)
+
+    def test_cached_order_header(self):
+        qrh = RequestHeader()
+        qrh.partner_code = "BL2"
+        qrh.set_request_header('SSL123', '2364')
+        qrh.serialize(order_type=True)
+        qrh.set_request_header('SSL456', None)
+
+        root = qrh.serialize(order_type=True)
+
+        assert [child.tag for child in root] == [
+            'ProductCode', 'PartnerOrderID', 'PartnerCode', 'AuthToken'
+        ]
+        assert root.find('.//ProductCode').text == "SSL456"
+        assert root.find('.//PartnerOrderID').text is None
+        assert root.find('.//PartnerCode').text == "BL2"
+
+
+class TestFragmentCache(object):
+
+    def test_get(self):
+        cache = utils.FragmentCache()
+        build = Mock(side_effect=lambda key: '-'.join(key))
+
+        assert cache.get(("BL2", "Axton"), build) == "BL2-Axton"
+        assert cache.get(("BL2", "Axton"), build) == "BL2-Axton"
+        assert cache.get(("BL2", "Maya"), build) == "BL2-Maya"
+
+        assert build.call_count == 2
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_cleared_when_full(self):
+        cache = utils.FragmentCache(maxsize=2)
+        for key in [("a",), ("b",), ("c",)]:
+            cache.get(key, str)
+
+        assert len(cache) == 1
+        cache.clear()
+        assert len(cache) == 0
+
 
 class TestOrderQueryOptions(object):
 
@@ -180,6 +252,34 @@ class TestGetModifiedOrderRequest(object):
         assert not gmor.query_options.vulnerability_scan_details
         assert not gmor.query_options.certificate_algorithm_info
 
+    def test_set_projection(self):
+
+        gmor = GetModifiedOrderRequest()
+        gmor.set_projection(["status_code", "contacts.admin.email"])
+
+        assert gmor.projection.fields == (
+            "status_code", "contacts.admin.email"
+        )
+        assert gmor.query_options.product_detail
+        assert gmor.query_options.contacts
+        assert not gmor.query_options.payment_info
+        assert not gmor.query_options.fulfillment
+        assert not gmor.query_options.vulnerability_scan_details
+
+        root = gmor.serialize()
+        returned = [
+            ele.tag for ele in root.find('.//OrderQueryOptions')
+            if ele.text == "true"
+        ]
+        assert sorted(returned) == ["ReturnContacts", "ReturnProductDetail"]
+
+    def test_set_projection_without_sections(self):
+
+        gmor = GetModifiedOrderRequest()
+        gmor.set_projection(["partner_order_id", "modified_events"])
+
+        assert not any(vars(gmor.query_options).values())
+
 
 class TestQuickOrderRequest(object):
 
@@ -1,12 +1,21 @@
 from __future__ import absolute_import, division, print_function
+import datetime
+import pickle
+import sys
+
+from lxml import etree
+
+from mock import Mock, patch
+import pytest
 
 from symantecssl import utils
 from symantecssl.models import OrderContacts, ContactInfo
 from symantecssl.response_models import (
     Certificate, CertificateInfo, IntermediateCertificate, ModificationEvent,
-    ModificationEvents, OrganizationInfo, OrderDetail, OrderDetails,
+    LazyOrderDetail, ModificationEvents, OrganizationInfo, OrderDetail,
+    OrderDetails, Projection,
     OrderResponseHeader, QuickOrderResponse, QuickOrderResult, Vulnerabilities,
-    ReissueResponse, ReissueResult
+    ReissueResponse, ReissueResult, _LAZY_LOADERS
 )
 from tests.unit import utils as test_utils
 
@@ -72,6 +81,17 @@ class TestCertificate(object):
         assert certificate.intermediates[1], IntermediateCertificate
         assert certificate.intermediates[2], IntermediateCertificate
 
+    def test_deserialize_with_pool(self):
+        node = test_utils.create_node_from_file('certificate.xml')
+        pool = utils.StringPool()
+
+        first = Certificate.deserialize(node, pool)
+        second = Certificate.deserialize(node, pool)
+
+        for ours, theirs in zip(first.intermediates, second.intermediates):
+            assert ours.cert is theirs.cert
+        assert pool.bytes_saved > 0
+
 
 class TestIntermediateCertificate(object):
 
@@ -112,6 +132,10 @@ class TestOrderDetail(object):
         node = test_utils.create_node_from_file('order_detail.xml')
 
         order_detail = OrderDetail.deserialize(node)
+        assert order_detail.partner_order_id == (
+            "eUogDVDrbdeRelyIzDyblFgWCOeeFc"
+        )
+        assert order_detail.geotrust_order_id == "1825833"
         assert order_detail.status_code == "ORDER_WAITING_FOR_APPROVAL"
         assert order_detail.status_name == "Order Waiting For Approval"
         assert order_detail.approver_email == "admin@example.com"
@@ -125,6 +149,8 @@ class TestOrderDetail(object):
         order_detail = OrderDetail.deserialize(node)
 
         assert order_detail.vulnerabilities, Vulnerabilities
+        assert order_detail.vulnerabilities[0].severity == "1"
+        assert order_detail.vulnerabilities[0].number_found == "1"
 
     def test_deserialize_without_modification_events(self):
         node = test_utils.create_node_from_file(
@@ -137,6 +163,235 @@ class TestOrderDetail(object):
         assert order_detail.organization_contacts, OrderContacts
         assert order_detail.organization_info, OrganizationInfo
 
+    def test_deserialize_from_response(self):
+        node = test_utils.create_node_from_file('get_order_by_poid.xml')
+        order_detail = OrderDetail.deserialize(node)
+
+        assert order_detail.partner_order_id == "131000-00000"
+        assert order_detail.status_code == "ORDER_COMPLETE"
+        assert order_detail.organization_info.city == "City"
+        assert order_detail.organization_contacts.admin.first_name == (
+            "The First"
+        )
+        assert order_detail.vulnerabilities == []
+
+    def test_deserialize_without_order_detail(self):
+        order_detail = OrderDetail.deserialize(etree.Element("Empty"))
+
+        assert order_detail.partner_order_id == "None"
+        assert order_detail.status_code == "None"
+
+    def test_deserialize_matches_section_models(self):
+        node = test_utils.create_node_from_file('order_detail.xml')
+        order_detail = OrderDetail.deserialize(node)
+
+        org_info = OrganizationInfo.deserialize(
+            node.find('.//m:OrganizationInfo', utils.NS)
+        )
+        assert state(order_detail.organization_info) == state(org_info)
+
+        contacts = OrderContacts.deserialize(
+            node.find('.//m:OrderContacts', utils.NS)
+        )
+        for kind in ('admin', 'tech', 'billing'):
+            contact = getattr(order_detail.organization_contacts, kind)
+            assert state(contact) == state(getattr(contacts, kind))
+
+        events = ModificationEvents.deserialize(
+            node.find('.//m:ModificationEvents', utils.NS)
+        )
+        assert [state(event) for event in order_detail.modified_events] == [
+            state(event) for event in events
+        ]
+
+    def test_deserialize_missing_and_nested_fields(self):
+        node = etree.fromstring(
+            '<m:OrderDetail xmlns:m="http://api.geotrust.com/webtrust/query">'
+            '<m:OrderInfo><m:Extra><m:PartnerOrderID>1</m:PartnerOrderID>'
+            '</m:Extra></m:OrderInfo>'
+            '<m:OrderContacts><m:AdminContact><m:FirstName>John'
+            '</m:FirstName></m:AdminContact></m:OrderContacts>'
+            '</m:OrderDetail>'
+        )
+        order_detail = OrderDetail.deserialize(node)
+
+        assert order_detail.partner_order_id == "1"
+        assert order_detail.geotrust_order_id == "None"
+        assert order_detail.status_code == "None"
+        assert order_detail.organization_contacts.admin.first_name == "John"
+        assert order_detail.organization_contacts.admin.email == "None"
+        assert order_detail.modified_events == []
+
+    @pytest.mark.parametrize("model", [
+        OrderDetail(), OrganizationInfo(), OrderContacts(), ContactInfo(),
+        ModificationEvent(), OrderDetails()
+    ])
+    def test_slots(self, model):
+        assert not hasattr(model, '__dict__')
+        with pytest.raises(AttributeError):
+            model.unknown = "value"
+
+    def test_pickle(self):
+        node = test_utils.create_node_from_file('order_detail.xml')
+        order_detail = OrderDetail.deserialize(node)
+
+        unpickled = pickle.loads(pickle.dumps(order_detail, protocol=2))
+
+        assert order_detail_state(unpickled) == (
+            order_detail_state(order_detail)
+        )
+
+
+def state(model):
+    """Returns the attributes of a response model as a dict."""
+    return {name: getattr(model, name) for name in model.__slots__}
+
+
+def order_detail_state(order_detail):
+    """Returns the deserialized attributes of an order detail as plain data.
+    """
+    return {
+        'partner_order_id': order_detail.partner_order_id,
+        'geotrust_order_id': order_detail.geotrust_order_id,
+        'status_code': order_detail.status_code,
+        'status_name': order_detail.status_name,
+        'approver_email': order_detail.approver_email,
+        'organization_info': state(order_detail.organization_info),
+        'contacts': [
+            state(getattr(order_detail.organization_contacts, kind))
+            for kind in ('admin', 'tech', 'billing')
+        ],
+        'modified_events': [
+            state(event) for event in order_detail.modified_events
+        ],
+        'vulnerabilities': [
+            state(vulnerability)
+            for vulnerability in order_detail.vulnerabilities
+        ],
+    }
+
+
+class TestLazyOrderDetail(object):
+
+    @pytest.mark.parametrize("filename", [
+        'order_detail.xml', 'order_detail_with_vuln.xml',
+        'order_detail_no_mod_event.xml', 'get_order_by_poid.xml'
+    ])
+    def test_matches_order_detail(self, filename):
+        node = test_utils.create_node_from_file(filename)
+
+        lazy = OrderDetail.deserialize_lazy(node)
+
+        assert isinstance(lazy, LazyOrderDetail)
+        assert order_detail_state(lazy) == (
+            order_detail_state(OrderDetail.deserialize(node))
+        )
+
+    def test_sections_are_memoized(self):
+        node = test_utils.create_node_from_file('order_detail.xml')
+        lazy = OrderDetail.deserialize_lazy(node)
+        loader = Mock(wraps=_LAZY_LOADERS['organization_contacts'])
+
+        with patch.dict(_LAZY_LOADERS, organization_contacts=loader):
+            assert lazy.status_code == "ORDER_WAITING_FOR_APPROVAL"
+            assert not loader.called
+
+            contacts = lazy.organization_contacts
+            assert lazy.organization_contacts is contacts
+            assert loader.call_count == 1
+
+    def test_vulnerabilities(self):
+        node = test_utils.create_node_from_file('order_detail_with_vuln.xml')
+
+        lazy = OrderDetail.deserialize_lazy(node)
+
+        assert lazy.vulnerabilities[0].severity == "1"
+        assert lazy.vulnerabilities[0].number_found == "1"
+
+    def test_without_order_detail(self):
+        node = etree.Element("Empty")
+
+        lazy = OrderDetail.deserialize_lazy(node)
+
+        assert lazy._xml_node is node
+
+    def test_unknown_attribute(self):
+        node = test_utils.create_node_from_file('order_detail.xml')
+        lazy = OrderDetail.deserialize_lazy(node)
+
+        with pytest.raises(AttributeError):
+            lazy.unknown
+
+    def test_pickle(self):
+        node = test_utils.create_node_from_file('order_detail.xml')
+        lazy = OrderDetail.deserialize_lazy(node)
+
+        unpickled = pickle.loads(pickle.dumps(lazy))
+
+        assert type(unpickled) is OrderDetail
+        assert order_detail_state(unpickled) == order_detail_state(lazy)
+
+
+class TestProjection(object):
+
+    def test_deserialize_fields(self):
+        node = test_utils.create_node_from_file('order_detail.xml')
+        projection = Projection(["status_code", "contacts.admin.email"])
+
+        order_detail = OrderDetail.deserialize(node, projection)
+
+        assert order_detail.status_code == "ORDER_WAITING_FOR_APPROVAL"
+        assert order_detail.organization_contacts.admin.email == (
+            "someone@email.com"
+        )
+        assert order_detail.organization_contacts.admin.first_name == ""
+        assert order_detail.organization_contacts.tech.email == ""
+        assert order_detail.partner_order_id == ""
+        assert order_detail.organization_info.city == ""
+        assert order_detail.modified_events == []
+
+    def test_deserialize_sections(self):
+        node = test_utils.create_node_from_file('order_detail.xml')
+        projection = Projection(["modified_events", "organization_info"])
+
+        order_detail = OrderDetail.deserialize(node, projection)
+        full = OrderDetail.deserialize(node)
+
+        assert [state(event) for event in order_detail.modified_events] == [
+            state(event) for event in full.modified_events
+        ]
+        assert state(order_detail.organization_info) == (
+            state(full.organization_info)
+        )
+        assert order_detail.status_code == ""
+
+    def test_missing_fields(self):
+        node = test_utils.create_node_from_file('order_detail.xml')
+        projection = Projection(["vulnerabilities.severity", "approver_email"])
+
+        order_detail = OrderDetail.deserialize(node, projection)
+
+        assert order_detail.vulnerabilities == []
+        assert order_detail.approver_email == "admin@example.com"
+
+    def test_order_details(self):
+        node = test_utils.create_node_from_file('order_details.xml')
+        projection = Projection(["partner_order_id"])
+
+        order_details = OrderDetails.deserialize(node, projection)
+
+        assert order_details[0].partner_order_id == (
+            "eUogDVDrbdeRelyIzDyblFgWCOeeFc"
+        )
+        assert order_details[0].status_code == ""
+
+    @pytest.mark.parametrize("field", [
+        "unknown", "contacts.admin.unknown", "status_code.text", ""
+    ])
+    def test_unknown_field(self, field):
+        with pytest.raises(ValueError):
+            Projection([field])
+
 
 class TestOrderDetails(object):
 
@@ -146,6 +401,29 @@ class TestOrderDetails(object):
         order_details = OrderDetails.deserialize(node)
         assert len(order_details) == 1
 
+    def test_deserialize_lazy(self):
+        node = test_utils.create_node_from_file('order_details.xml')
+
+        order_details = OrderDetails.deserialize_lazy(node)
+        assert len(order_details) == 1
+        assert isinstance(order_details[0], LazyOrderDetail)
+
+    def test_deserialize_with_pool(self):
+        node = test_utils.create_node_from_file('order_details.xml')
+        pool = utils.StringPool()
+
+        first = OrderDetails.deserialize(node, pool=pool)[0]
+        second = OrderDetails.deserialize(node, pool=pool)[0]
+
+        assert state(first.organization_info) == (
+            state(second.organization_info)
+        )
+        assert first.approver_email is second.approver_email
+        assert first.organization_info.name is second.organization_info.name
+        assert first.organization_contacts.admin.email is (
+            second.organization_contacts.admin.email
+        )
+
 
 class TestGetElementText(object):
 
@@ -156,6 +434,71 @@ class TestGetElementText(object):
         assert text == "None"
 
 
+class TestStringPool(object):
+
+    def test_shares_equal_strings(self):
+        pool = utils.StringPool()
+        first = "".join(["Example", " Inc"])
+        second = "".join(["Example", " Inc"])
+        assert first is not second
+
+        assert pool(first) is first
+        assert pool(second) is first
+        assert pool(None) is None
+        assert len(pool) == 1
+        assert pool.stats == {
+            'hits': 1, 'misses': 1, 'strings': 1,
+            'bytes_saved': sys.getsizeof(second),
+        }
+
+    def test_clear(self):
+        pool = utils.StringPool()
+        pool("US")
+        pool.clear()
+
+        assert len(pool) == 0
+        assert pool.misses == 1
+
+
+class TestElementPath(object):
+
+    def test_direct_path(self):
+        node = test_utils.create_node_from_file('organization_info.xml')
+        path = utils.ElementPath('m:OrganizationAddress/m:City')
+
+        assert path.text(node) == "San Antonio"
+
+    def test_fallback(self):
+        node = test_utils.create_node_from_file('organization_info.xml')
+
+        assert utils.ElementPath('m:City').text(node) == "San Antonio"
+        assert utils.ElementPath('m:City', False).find(node) is None
+        assert utils.ElementPath('m:Missing').text(node) == "None"
+
+    def test_findall(self):
+        node = test_utils.create_node_from_file('mod_events.xml')
+        path = utils.ElementPath('m:ModificationEvent')
+
+        assert len(path.findall(node)) == 2
+
+
+class TestParseTimestamp(object):
+
+    def test_parse_timestamp_with_offset(self):
+        timestamp = utils.parse_timestamp("2014-12-01T23:14:01.332-05:30")
+
+        assert timestamp == datetime.datetime(2014, 12, 2, 4, 44, 1, 332000)
+
+    def test_parse_timestamp_without_offset(self):
+        timestamp = utils.parse_timestamp("2014-08-05T15:05:33")
+
+        assert timestamp == datetime.datetime(2014, 8, 5, 15, 5, 33)
+
+    def test_parse_invalid_timestamp(self):
+        with pytest.raises(ValueError):
+            utils.parse_timestamp("None")
+
+
 class TestQuickOrderResponse(object):
 
     def test_deserialize(self):
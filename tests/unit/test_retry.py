@@ -0,0 +1,136 @@
+from __future__ import absolute_import, division, print_function
+
+from mock import Mock, patch
+
+import pytest
+import requests
+
+from symantecssl.order import FailedRequest, SymantecClient
+from symantecssl.request_models import (
+    GetOrderByPartnerOrderID, QuickOrderRequest
+)
+from symantecssl.retry import RetryPolicy
+from tests.unit import utils as test_utils
+
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+def http_response(status_code, filename='get_order_by_poid.xml'):
+    response = Mock(status_code=status_code)
+    with test_utils.open_xml_file(filename, 'rb') as f:
+        response.content = f.read()
+    return response
+
+
+class TestRetryPolicy(object):
+
+    def test_exponential_backoff(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+
+        assert [policy.backoff(attempt) for attempt in range(1, 5)] == [
+            1, 2, 4, 5
+        ]
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff_factor=1)
+
+        for attempt in range(1, 5):
+            assert 0 <= policy.backoff(attempt) <= 2 ** (attempt - 1)
+
+    def test_only_idempotent_requests_are_retried(self):
+        policy = RetryPolicy(jitter=False)
+
+        assert policy.next_delay(GetOrderByPartnerOrderID(), 1, 0, 503) == 0.5
+        assert policy.next_delay(QuickOrderRequest(), 1, 0, 503) is None
+
+        policy.retry_non_idempotent = True
+        assert policy.next_delay(QuickOrderRequest(), 1, 0, 503) == 0.5
+
+    def test_gives_up(self):
+        policy = RetryPolicy(max_attempts=3, deadline=10, jitter=False)
+        request_model = GetOrderByPartnerOrderID()
+
+        assert policy.next_delay(request_model, 3, 0, 503) is None
+        assert policy.next_delay(request_model, 1, 0, 400) is None
+        assert policy.next_delay(request_model, 1, 9.9, 503) is None
+        assert policy.next_delay(request_model, 1, 0, None) == 0.5
+
+
+@patch("symantecssl.order.time.sleep")
+@patch("requests.Session.post")
+class TestSymantecClientRetry(object):
+
+    def test_transient_errors_are_retried(self, mocked_post, mocked_sleep):
+        mocked_post.side_effect = [
+            http_response(503), requests.ConnectionError(),
+            http_response(200)
+        ]
+        client = SymantecClient(retry=RetryPolicy(jitter=False))
+
+        response = client.post(
+            "http://www.example.com/", GetOrderByPartnerOrderID(),
+            CREDENTIALS
+        )
+
+        assert response.model.status_code == "ORDER_COMPLETE"
+        assert mocked_post.call_count == 3
+        assert [c[0][0] for c in mocked_sleep.call_args_list] == [0.5, 1.0]
+
+    def test_failed_request_details(self, mocked_post, mocked_sleep):
+        mocked_post.return_value = http_response(503)
+        client = SymantecClient(retry=RetryPolicy(max_attempts=2))
+
+        with pytest.raises(FailedRequest) as excinfo:
+            client.post(
+                "http://www.example.com/", GetOrderByPartnerOrderID(),
+                CREDENTIALS
+            )
+
+        assert excinfo.value.status_code == 503
+        assert excinfo.value.attempts == 2
+        assert excinfo.value.elapsed >= 0
+        assert excinfo.value.response is mocked_post.return_value
+
+    def test_orders_are_not_retried(self, mocked_post, mocked_sleep):
+        mocked_post.return_value = http_response(503)
+        client = SymantecClient(retry=RetryPolicy())
+
+        with pytest.raises(FailedRequest) as excinfo:
+            client.post(
+                "http://www.example.com/", QuickOrderRequest(), CREDENTIALS
+            )
+
+        assert excinfo.value.attempts == 1
+        assert not mocked_sleep.called
+
+    def test_connection_errors_are_raised(self, mocked_post, mocked_sleep):
+        mocked_post.side_effect = requests.ConnectionError()
+        client = SymantecClient(retry=RetryPolicy(max_attempts=2))
+
+        with pytest.raises(FailedRequest) as excinfo:
+            client.post(
+                "http://www.example.com/", GetOrderByPartnerOrderID(),
+                CREDENTIALS
+            )
+        assert mocked_post.call_count == 2
+        assert excinfo.value.status_code is None
+        assert excinfo.value.attempts == 2
+        assert excinfo.value.elapsed is not None
+        assert excinfo.value.response is None
+        assert isinstance(excinfo.value.__cause__, requests.ConnectionError)
+
+    def test_no_policy(self, mocked_post, mocked_sleep):
+        mocked_post.side_effect = requests.Timeout()
+        client = SymantecClient()
+
+        with pytest.raises(requests.Timeout):
+            client.post(
+                "http://www.example.com/", GetOrderByPartnerOrderID(),
+                CREDENTIALS
+            )
+        assert mocked_post.call_count == 1
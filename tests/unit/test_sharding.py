@@ -0,0 +1,261 @@
+from __future__ import absolute_import, division, print_function
+import datetime
+import threading
+
+from mock import Mock
+
+import pytest
+import requests
+
+from symantecssl.order import FailedRequest
+from symantecssl.request_models import OrderQueryOptions
+from symantecssl.response_models import (
+    ModificationEvent, OrderDetail, OrderDetails
+)
+from symantecssl.sharding import get_modified_orders, split_time_frame
+
+
+START = datetime.datetime(2015, 1, 1)
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+def order_detail(partner_order_id, status_code="ORDER_COMPLETE"):
+    detail = OrderDetail()
+    detail.partner_order_id = partner_order_id
+    detail.status_code = status_code
+    return detail
+
+
+class FakeClient(object):
+    """Answers GetModifiedOrders from a map of order id to modified time."""
+
+    def __init__(self, orders, fail=None):
+        self.orders = orders
+        self.fail = fail or (lambda start, end: None)
+        self.windows = []
+        self.lock = threading.Lock()
+
+    def post(self, endpoint, request_model, credentials):
+        start = request_model.from_date
+        end = request_model.to_date
+        with self.lock:
+            self.windows.append((start, end))
+        self.fail(start, end)
+
+        details = OrderDetails([
+            order_detail(order_id, status_code=start)
+            for order_id, modified in sorted(self.orders.items())
+            if start <= modified.isoformat() <= end
+        ])
+        return Mock(model=details)
+
+
+class TestSplitTimeFrame(object):
+
+    def test_split(self):
+        windows = split_time_frame(
+            START, START + datetime.timedelta(hours=5),
+            datetime.timedelta(hours=2)
+        )
+
+        assert windows == [
+            (START, START + datetime.timedelta(hours=2)),
+            (START + datetime.timedelta(hours=2),
+             START + datetime.timedelta(hours=4)),
+            (START + datetime.timedelta(hours=4),
+             START + datetime.timedelta(hours=5)),
+        ]
+
+    def test_invalid_window(self):
+        with pytest.raises(ValueError):
+            split_time_frame(START, START, datetime.timedelta(0))
+
+
+class TestGetModifiedOrders(object):
+
+    def test_merges_and_deduplicates(self):
+        # Order "b" sits on a window boundary and is returned twice.
+        client = FakeClient({
+            "a": START + datetime.timedelta(hours=1),
+            "b": START + datetime.timedelta(days=1),
+            "c": START + datetime.timedelta(days=2, hours=3),
+        })
+
+        details = get_modified_orders(
+            "http://www.example.com/", CREDENTIALS, START,
+            START + datetime.timedelta(days=3), workers=2, client=client
+        )
+
+        assert len(client.windows) == 3
+        assert sorted(d.partner_order_id for d in details) == ["a", "b", "c"]
+        detail_b = [d for d in details if d.partner_order_id == "b"][0]
+        assert detail_b.status_code == (
+            START + datetime.timedelta(days=1)
+        ).isoformat()
+
+    def test_events_spanning_windows_are_merged(self):
+        def event(mod_id, time_stamp):
+            modification = ModificationEvent()
+            modification.mod_id = mod_id
+            modification.event_name = "Order Modified"
+            modification.time_stamp = time_stamp
+            return modification
+
+        def post(endpoint, request_model, credentials):
+            detail = order_detail("a", status_code=request_model.from_date)
+            if request_model.from_date == START.isoformat():
+                detail.modified_events.extend([
+                    event("1", "2015-01-01T10:00:00"),
+                    event("2", "2015-01-02T00:00:00"),
+                ])
+            else:
+                detail.modified_events.extend([
+                    event("2", "2015-01-02T00:00:00"),
+                    event("3", "2015-01-02T10:00:00"),
+                    event("", "2015-01-02T11:00:00"),
+                ])
+            return Mock(model=OrderDetails([detail]))
+
+        details = get_modified_orders(
+            "http://www.example.com/", CREDENTIALS, START,
+            START + datetime.timedelta(days=2), client=Mock(post=post)
+        )
+
+        assert len(details) == 1
+        assert details[0].status_code == (
+            START + datetime.timedelta(days=1)
+        ).isoformat()
+        assert [e.mod_id for e in details[0].modified_events] == [
+            "1", "2", "3", ""
+        ]
+
+    def test_orders_without_ids_are_kept(self):
+        client = FakeClient({"None": START + datetime.timedelta(hours=1)})
+
+        details = get_modified_orders(
+            "http://www.example.com/", CREDENTIALS, START,
+            START + datetime.timedelta(days=1), client=client
+        )
+
+        assert len(details) == 1
+
+    def test_large_windows_are_split(self):
+        client = FakeClient(dict(
+            ("order-%d" % i, START + datetime.timedelta(hours=i * 5))
+            for i in range(4)
+        ))
+
+        details = get_modified_orders(
+            "http://www.example.com/", CREDENTIALS, START,
+            START + datetime.timedelta(days=1), max_orders=2,
+            min_window=datetime.timedelta(hours=3), client=client
+        )
+
+        assert len(details) == 4
+        assert len(client.windows) > 1
+
+    def test_failed_windows_are_split(self):
+        day = datetime.timedelta(days=1).total_seconds()
+
+        def fail(start, end):
+            end = datetime.datetime.strptime(end, "%Y-%m-%dT%H:%M:%S")
+            start = datetime.datetime.strptime(start, "%Y-%m-%dT%H:%M:%S")
+            length = end - start
+            if length.total_seconds() >= day:
+                raise requests.Timeout()
+
+        client = FakeClient(
+            {"a": START + datetime.timedelta(hours=13)}, fail=fail
+        )
+
+        details = get_modified_orders(
+            "http://www.example.com/", CREDENTIALS, START,
+            START + datetime.timedelta(days=1), client=client
+        )
+
+        assert [d.partner_order_id for d in details] == ["a"]
+        assert len(client.windows) == 3
+
+    def test_failure_below_min_window_raises(self):
+        def fail(start, end):
+            raise FailedRequest()
+
+        client = FakeClient({}, fail=fail)
+
+        with pytest.raises(FailedRequest):
+            get_modified_orders(
+                "http://www.example.com/", CREDENTIALS, START,
+                START + datetime.timedelta(hours=1),
+                min_window=datetime.timedelta(hours=1), client=client
+            )
+
+    def test_server_errors_are_split(self):
+        def fail(start, end):
+            if (start, end) == (START.isoformat(), "2015-01-02T00:00:00"):
+                raise FailedRequest(status_code=503)
+
+        client = FakeClient({}, fail=fail)
+
+        get_modified_orders(
+            "http://www.example.com/", CREDENTIALS, START,
+            START + datetime.timedelta(days=1), client=client
+        )
+
+        assert len(client.windows) == 3
+
+    def test_client_errors_are_raised_at_once(self):
+        def fail(start, end):
+            raise FailedRequest(status_code=401)
+
+        client = FakeClient({}, fail=fail)
+
+        with pytest.raises(FailedRequest) as error:
+            get_modified_orders(
+                "http://www.example.com/", CREDENTIALS, START,
+                START + datetime.timedelta(days=30), workers=1,
+                client=client
+            )
+
+        assert error.value.status_code == 401
+        # Neither split nor carried on with the remaining windows.
+        assert len(client.windows) <= 2
+
+    def test_failure_cancels_pending_windows(self):
+        def fail(start, end):
+            if start == START.isoformat():
+                raise FailedRequest()
+            # Keeps the second window running while the failure is handled.
+            threading.Event().wait(0.2)
+
+        client = FakeClient({}, fail=fail)
+
+        with pytest.raises(FailedRequest):
+            get_modified_orders(
+                "http://www.example.com/", CREDENTIALS, START,
+                START + datetime.timedelta(hours=3),
+                window=datetime.timedelta(hours=1),
+                min_window=datetime.timedelta(hours=1), workers=1,
+                client=client
+            )
+
+        # The third window never starts.
+        assert len(client.windows) < 3
+
+    def test_query_options_are_used(self):
+        client = FakeClient({})
+        client.post = Mock(return_value=Mock(model=OrderDetails([])))
+        options = OrderQueryOptions(contacts=False)
+
+        get_modified_orders(
+            "http://www.example.com/", CREDENTIALS, START,
+            START + datetime.timedelta(hours=1), query_options=options,
+            client=client
+        )
+
+        request_model = client.post.call_args[0][1]
+        assert request_model.query_options.contacts is False
+        assert request_model.query_options is not options
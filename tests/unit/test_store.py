@@ -0,0 +1,168 @@
+from __future__ import absolute_import, division, print_function
+import datetime
+
+from mock import Mock, patch
+
+from symantecssl.response_models import (
+    ModificationEvent, ModificationEvents, OrderDetail, OrderDetails
+)
+from symantecssl.store import OrderStore
+from tests.unit import utils as test_utils
+
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+def order_detail(partner_order_id, status_code, admin_email, modified=None):
+    detail = OrderDetail()
+    detail.partner_order_id = partner_order_id
+    detail.status_code = status_code
+    detail.approver_email = "approver@example.com"
+    detail.organization_contacts.admin.email = admin_email
+    if modified is not None:
+        event = ModificationEvent()
+        event.mod_id = partner_order_id
+        event.time_stamp = modified
+        detail.modified_events = ModificationEvents([event])
+    return detail
+
+
+def populated_store():
+    store = OrderStore()
+    store.upsert(OrderDetails([
+        order_detail("a", "ORDER_COMPLETE", "admin@example.com",
+                     "2015-01-02T00:00:00+00:00"),
+        order_detail("b", "ORDER_WAITING_FOR_APPROVAL", "admin@example.com",
+                     "2015-01-01T00:00:00+00:00"),
+        order_detail("c", "ORDER_COMPLETE", "other@example.com"),
+    ]))
+    return store
+
+
+class TestOrderStore(object):
+
+    def test_upsert_skips_orders_without_id(self):
+        store = OrderStore()
+
+        stored = store.upsert([order_detail("None", "ORDER_COMPLETE", "")])
+
+        assert stored == 0
+        assert len(store) == 0
+
+    def test_upsert_replaces(self):
+        store = populated_store()
+
+        store.upsert([order_detail("a", "CANCELLED", "admin@example.com")])
+
+        assert len(store) == 3
+        assert store.get("a").status_code == "CANCELLED"
+
+    def test_upsert_skips_stale_details(self):
+        store = populated_store()
+
+        stored = store.upsert([
+            order_detail("a", "ORDER_WAITING_FOR_APPROVAL",
+                         "admin@example.com", "2015-01-01T12:00:00+00:00"),
+            order_detail("b", "ORDER_COMPLETE", "admin@example.com",
+                         "2015-01-01T00:00:00+00:00"),
+        ])
+
+        assert stored == 1
+        assert store.get("a").status_code == "ORDER_COMPLETE"
+        assert store.get("b").status_code == "ORDER_COMPLETE"
+
+    def test_upsert_without_events_keeps_modification_time(self):
+        store = populated_store()
+
+        store.upsert([order_detail("a", "CANCELLED", "admin@example.com")])
+
+        recent = store.find(modified_since=datetime.datetime(2015, 1, 1, 12))
+        assert [d.status_code for d in recent] == ["CANCELLED"]
+
+    def test_latest_valid_modification_is_indexed(self):
+        store = OrderStore()
+        detail = order_detail("a", "ORDER_COMPLETE", "",
+                              "2015-01-02T00:00:00+00:00")
+        for time_stamp in ("None", "2015-01-01T00:00:00+00:00"):
+            event = ModificationEvent()
+            event.time_stamp = time_stamp
+            detail.modified_events.append(event)
+
+        store.upsert([detail])
+
+        assert store.find(
+            modified_since=datetime.datetime(2015, 1, 1, 12)
+        ) != []
+        assert len(store.find()) == 1
+
+    def test_get(self):
+        store = populated_store()
+
+        detail = store.get("a")
+
+        assert detail.status_code == "ORDER_COMPLETE"
+        assert detail.organization_contacts.admin.email == (
+            "admin@example.com"
+        )
+        assert store.get("missing") is None
+
+    def test_get_stale(self, tmpdir):
+        store = OrderStore(str(tmpdir.join("orders.db")))
+        with patch("symantecssl.store.time.time", return_value=1000.0):
+            store.upsert([order_detail("a", "ORDER_COMPLETE", "")])
+
+        with patch("symantecssl.store.time.time", return_value=1100.0):
+            assert store.get("a", max_age=200) is not None
+            assert store.get("a", max_age=50) is None
+            assert store.get(
+                "a", max_age=datetime.timedelta(minutes=1)
+            ) is None
+        store.close()
+
+    def test_find(self):
+        store = populated_store()
+
+        completed = store.find(status_code="ORDER_COMPLETE")
+        admin = store.find(admin_email="admin@example.com")
+        both = store.find(
+            status_code="ORDER_COMPLETE", admin_email="admin@example.com"
+        )
+        recent = store.find(modified_since=datetime.datetime(2015, 1, 1, 12))
+
+        assert sorted(d.partner_order_id for d in completed) == ["a", "c"]
+        assert [d.partner_order_id for d in admin] == ["b", "a"]
+        assert [d.partner_order_id for d in both] == ["a"]
+        assert [d.partner_order_id for d in recent] == ["a"]
+        assert len(store.find(approver_email="approver@example.com")) == 3
+
+    def test_get_or_fetch_served_locally(self):
+        store = populated_store()
+        client = Mock()
+
+        detail = store.get_or_fetch(
+            "a", "http://www.example.com/", CREDENTIALS, client=client
+        )
+
+        assert detail.partner_order_id == "a"
+        assert not client.post.called
+
+    def test_get_or_fetch_falls_back_to_api(self):
+        store = OrderStore()
+        client = Mock()
+        client.post.return_value.model = OrderDetail.deserialize(
+            test_utils.create_node_from_file("get_order_by_poid.xml")
+        )
+
+        detail = store.get_or_fetch(
+            "131000-00000", "http://www.example.com/", CREDENTIALS,
+            client=client
+        )
+
+        request_model = client.post.call_args[0][1]
+        assert request_model.partner_order_id == "131000-00000"
+        assert detail.status_code == "ORDER_COMPLETE"
+        assert store.get("131000-00000").status_code == "ORDER_COMPLETE"
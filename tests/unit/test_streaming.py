@@ -0,0 +1,134 @@
+from __future__ import absolute_import, division, print_function
+import io
+
+from lxml import etree
+from mock import patch
+
+from symantecssl import utils
+from symantecssl.request_models import (
+    GetOrderByPartnerOrderID, Reissue, RequestEnvelope
+)
+from symantecssl.response_models import OrderDetail
+from symantecssl.streaming import (
+    RequestBody, iter_order_detail_elements, iter_order_details,
+    read_order_columns, write_request
+)
+from tests.unit import utils as test_utils
+
+
+def reissue_request(sans):
+    request = Reissue()
+    request.set_credentials("123456", "Krieg", "TrainConductor")
+    for index in range(sans):
+        request.add_san("add%d.example.com" % index)
+        request.delete_san("delete&%d.example.com" % index)
+        request.edit_san("old%d.example.com" % index, "new<%d>" % index)
+    return request
+
+
+def response_body(filename, copies=1):
+    root = test_utils.create_node_from_file(filename).getroot()
+    detail = root.find('.//{*}OrderDetail')
+    parent = detail.getparent()
+    for _ in range(copies - 1):
+        parent.append(etree.fromstring(etree.tostring(detail)))
+    return io.BytesIO(etree.tostring(root))
+
+
+class TestIterOrderDetails(object):
+
+    def test_yields_each_order_detail(self):
+        details = list(iter_order_details(
+            response_body('get_order_by_poid.xml', copies=3)
+        ))
+
+        assert len(details) == 3
+        for detail in details:
+            assert isinstance(detail, OrderDetail)
+            assert detail.status_code == "ORDER_COMPLETE"
+            assert detail.organization_contacts.admin.email == (
+                "administrator@example.com"
+            )
+
+    def test_pool(self):
+        pool = utils.StringPool()
+
+        first, second = iter_order_details(
+            response_body('get_order_by_poid.xml', copies=2), pool=pool
+        )
+
+        assert first.approver_email is second.approver_email
+        assert pool.hits > 0
+
+    def test_processed_elements_are_released(self):
+        elements = iter_order_detail_elements(
+            response_body('get_order_by_poid.xml', copies=3)
+        )
+
+        first = next(elements)
+        assert len(first) > 0
+
+        next(elements)
+        assert len(first) == 0
+
+        next(elements)
+        assert first.getparent() is None
+
+    def test_no_order_details(self):
+        body = io.BytesIO(b'<Envelope><Body/></Envelope>')
+
+        assert list(iter_order_details(body)) == []
+
+
+class TestReadOrderColumns(object):
+
+    def test_reads_each_order_detail(self):
+        columns = read_order_columns(
+            response_body('get_order_by_poid.xml', copies=3)
+        )
+
+        assert len(columns) == 3
+        assert columns["status_code"] == ["ORDER_COMPLETE"] * 3
+
+
+class TestWriteRequest(object):
+
+    def test_matches_serialize(self):
+        for request in [reissue_request(3), Reissue(),
+                        GetOrderByPartnerOrderID()]:
+            output = io.BytesIO()
+
+            write_request(output, request)
+
+            assert output.getvalue() == etree.tostring(
+                RequestEnvelope(request).serialize()
+            )
+
+
+class TestRequestBody(object):
+
+    def test_chunks(self):
+        request = reissue_request(500)
+
+        chunks = list(RequestBody(request, chunk_size=4096))
+
+        assert len(chunks) > 1
+        assert all(len(chunk) >= 4096 for chunk in chunks[:-1])
+        assert b"".join(chunks) == etree.tostring(
+            RequestEnvelope(request).serialize()
+        )
+
+    def test_no_empty_chunk(self):
+        def write_envelope(xf, request_model):
+            xf.write(etree.Element("Envelope"))
+            yield
+
+        with patch("symantecssl.streaming._write_envelope", write_envelope):
+            chunks = list(RequestBody(reissue_request(1), chunk_size=1))
+
+        assert chunks == [b"<Envelope/>"]
+
+    def test_iterated_again(self):
+        body = RequestBody(reissue_request(2))
+
+        assert b"".join(body) == b"".join(body)
@@ -0,0 +1,210 @@
+from __future__ import absolute_import, division, print_function
+import datetime
+
+from mock import Mock
+
+import pytest
+
+from symantecssl.request_models import OrderQueryOptions
+from symantecssl.response_models import (
+    ModificationEvent, ModificationEvents, OrderDetail, OrderDetails
+)
+from symantecssl.sync import (
+    FileWatermarkStore, IncrementalSync, SQLiteWatermarkStore, WatermarkStore
+)
+
+
+START = datetime.datetime(2015, 1, 1)
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+def order_detail(partner_order_id, events):
+    detail = OrderDetail()
+    detail.partner_order_id = partner_order_id
+    modified_events = []
+    for mod_id, minutes in events:
+        event = ModificationEvent()
+        event.mod_id = mod_id
+        event.event_name = "Order Modified"
+        event.time_stamp = (
+            START + datetime.timedelta(minutes=minutes)
+        ).isoformat() + "+00:00"
+        modified_events.append(event)
+    detail.modified_events = ModificationEvents(modified_events)
+    return detail
+
+
+def sync_client(*responses):
+    client = Mock()
+    client.post.side_effect = [
+        Mock(model=OrderDetails(details)) for details in responses
+    ]
+    return client
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmpdir):
+    if request.param == "file":
+        return FileWatermarkStore(str(tmpdir.join("watermark.json")))
+    return SQLiteWatermarkStore(str(tmpdir.join("watermark.db")))
+
+
+class TestWatermarkStores(object):
+
+    def test_empty_store(self, store):
+        assert store.load() == (None, {})
+
+    def test_round_trip(self, store):
+        watermark = START + datetime.timedelta(minutes=5)
+        store.save(watermark, {"1": watermark})
+
+        assert store.load() == (watermark, {"1": watermark})
+
+    def test_interface(self):
+        with pytest.raises(NotImplementedError):
+            WatermarkStore().load()
+        with pytest.raises(NotImplementedError):
+            WatermarkStore().save(START, {})
+
+    def test_sqlite_stores_are_named(self, tmpdir):
+        path = str(tmpdir.join("watermark.db"))
+        first = SQLiteWatermarkStore(path, name="first")
+        second = SQLiteWatermarkStore(path, name="second")
+
+        first.save(START, {})
+
+        assert second.load() == (None, {})
+        first.close()
+        second.close()
+
+
+class TestIncrementalSync(object):
+
+    def test_first_run_uses_initial_from_date(self, store):
+        client = sync_client([order_detail("a", [("1", 10), ("2", 20)])])
+        sync = IncrementalSync(
+            "http://www.example.com/", CREDENTIALS, store, START,
+            client=client
+        )
+
+        changed = sync.run(to_date=START + datetime.timedelta(hours=1))
+
+        request_model = client.post.call_args[0][1]
+        assert request_model.from_date == START.isoformat()
+        assert [d.partner_order_id for d in changed] == ["a"]
+        assert store.load()[0] == START + datetime.timedelta(minutes=20)
+
+    def test_next_run_requests_delta_with_overlap(self, store):
+        client = sync_client(
+            [order_detail("a", [("1", 10), ("2", 20)])],
+            [order_detail("a", [("1", 10), ("2", 20)]),
+             order_detail("b", [("3", 18), ("4", 30)])],
+        )
+        sync = IncrementalSync(
+            "http://www.example.com/", CREDENTIALS, store, START,
+            overlap=datetime.timedelta(minutes=5), client=client
+        )
+
+        sync.run(to_date=START + datetime.timedelta(hours=1))
+        changed = sync.run(to_date=START + datetime.timedelta(hours=2))
+
+        request_model = client.post.call_args[0][1]
+        assert request_model.from_date == (
+            START + datetime.timedelta(minutes=15)
+        ).isoformat()
+        assert [d.partner_order_id for d in changed] == ["b"]
+
+        watermark, seen_events = store.load()
+        assert watermark == START + datetime.timedelta(minutes=30)
+        assert sorted(seen_events) == ["4"]
+
+    def test_orders_without_events_are_kept(self, store):
+        client = sync_client([order_detail("a", [])])
+        sync = IncrementalSync(
+            "http://www.example.com/", CREDENTIALS, store, START,
+            client=client
+        )
+
+        changed = sync.run(to_date=START + datetime.timedelta(hours=1))
+
+        assert len(changed) == 1
+        assert store.load() == (START + datetime.timedelta(minutes=55), {})
+
+    def test_quiet_runs_move_the_watermark(self, store):
+        client = sync_client(
+            [order_detail("a", [("1", 10)])], [], [order_detail("a", [])]
+        )
+        sync = IncrementalSync(
+            "http://www.example.com/", CREDENTIALS, store, START,
+            overlap=datetime.timedelta(minutes=5), client=client
+        )
+
+        sync.run(to_date=START + datetime.timedelta(hours=1))
+        assert store.load()[0] == START + datetime.timedelta(minutes=10)
+
+        sync.run(to_date=START + datetime.timedelta(days=1))
+        assert store.load()[0] == START + datetime.timedelta(
+            days=1, minutes=-5
+        )
+
+        sync.run(to_date=START + datetime.timedelta(days=2))
+        request_model = client.post.call_args[0][1]
+        assert request_model.from_date == (
+            START + datetime.timedelta(days=1, minutes=-10)
+        ).isoformat()
+
+    def test_quiet_runs_never_move_the_watermark_back(self, store):
+        client = sync_client(
+            [order_detail("a", [("1", 58)])], [order_detail("a", [("1", 58)])]
+        )
+        sync = IncrementalSync(
+            "http://www.example.com/", CREDENTIALS, store, START,
+            overlap=datetime.timedelta(minutes=5), client=client
+        )
+
+        sync.run(to_date=START + datetime.timedelta(hours=1))
+        assert len(sync.run(to_date=START + datetime.timedelta(hours=1))) == 0
+
+        assert store.load() == (
+            START + datetime.timedelta(minutes=58),
+            {"1": START + datetime.timedelta(minutes=58)}
+        )
+
+    def test_query_options_are_used(self, store):
+        client = sync_client([])
+        options = OrderQueryOptions(contacts=False)
+        sync = IncrementalSync(
+            "http://www.example.com/", CREDENTIALS, store, START,
+            query_options=options, client=client
+        )
+
+        sync.run()
+
+        assert client.post.call_args[0][1].query_options is options
+
+    def test_invalid_timestamps_are_ignored(self, store):
+        detail = order_detail("a", [("1", 10)])
+        detail.modified_events[0].time_stamp = "None"
+        client = sync_client([detail])
+        sync = IncrementalSync(
+            "http://www.example.com/", CREDENTIALS, store, START,
+            client=client
+        )
+
+        assert len(sync.run()) == 0
+
+    def test_listeners_receive_changes(self, store):
+        client = sync_client([order_detail("a", [("1", 10)])])
+        listener = Mock()
+        sync = IncrementalSync(
+            "http://www.example.com/", CREDENTIALS, store, START,
+            client=client, listeners=[listener]
+        )
+
+        changed = sync.run()
+
+        listener.assert_called_once_with(changed)
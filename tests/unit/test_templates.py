@@ -0,0 +1,195 @@
+from __future__ import absolute_import, division, print_function
+import gc
+import random
+
+from lxml import etree
+
+import pytest
+
+from symantecssl import utils
+from symantecssl.models import ContactInfo
+from symantecssl.order import serialize_request
+from symantecssl.request_models import (
+    GetModifiedOrderRequest, GetOrderByPartnerOrderID, QuickOrderRequest,
+    Reissue, RequestEnvelope
+)
+from symantecssl.templates import escape, render_request
+
+ALPHABET = u'abcXYZ 019-_.@&<>"\'\r\n\t\xe9€漢'
+
+
+def random_text(rng):
+    if rng.random() < 0.1:
+        return None
+    return u''.join(
+        rng.choice(ALPHABET) for _ in range(rng.randint(0, 12))
+    )
+
+
+def randomize(rng, model):
+    """Sets every text and boolean attribute of a model to a random value."""
+    if isinstance(model, ContactInfo):
+        names = ContactInfo.__slots__
+    else:
+        names = list(vars(model))
+    for name in names:
+        value = getattr(model, name)
+        if isinstance(value, bool):
+            setattr(model, name, rng.choice([True, False]))
+        elif value is None or isinstance(value, str):
+            setattr(model, name, random_text(rng))
+
+
+def random_request(rng):
+    request = rng.choice([
+        GetModifiedOrderRequest, GetOrderByPartnerOrderID, QuickOrderRequest,
+        Reissue
+    ])()
+    randomize(rng, request)
+    randomize(rng, request.request_header)
+    randomize(rng, request.query_options)
+
+    if isinstance(request, (QuickOrderRequest, Reissue)):
+        randomize(rng, request.order_parameters)
+    if isinstance(request, QuickOrderRequest):
+        randomize(rng, request.organization_info)
+        randomize(rng, request.approver_email)
+        for contact in (request.order_contacts.admin,
+                        request.order_contacts.tech,
+                        request.order_contacts.billing):
+            randomize(rng, contact)
+    if isinstance(request, Reissue):
+        randomize(rng, request.reissue_email)
+        for _ in range(rng.randint(0, 2)):
+            request.add_san(random_text(rng))
+        for _ in range(rng.randint(0, 2)):
+            request.delete_san(random_text(rng))
+        for _ in range(rng.randint(0, 2)):
+            request.edit_san(random_text(rng), random_text(rng))
+
+    return request
+
+
+def canonical(body):
+    return etree.tostring(etree.fromstring(body), method='c14n')
+
+
+class TestRenderRequest(object):
+
+    @pytest.mark.parametrize("pretty_print", [True, False])
+    def test_equivalent_to_serialize(self, pretty_print):
+        rng = random.Random(0)
+        for _ in range(300):
+            request = random_request(rng)
+
+            expected = etree.tostring(
+                RequestEnvelope(request).serialize(),
+                pretty_print=pretty_print
+            )
+            rendered = render_request(request, pretty_print)
+
+            assert canonical(rendered) == canonical(expected)
+            assert rendered == expected
+
+    def test_identical_to_serialize(self):
+        request = Reissue()
+        request.set_credentials("123456", "Krieg", "TrainConductor")
+        request.add_san("www.example.com")
+        request.edit_san("old.example.com", "new.example.com")
+
+        for pretty_print in (True, False):
+            assert render_request(request, pretty_print) == etree.tostring(
+                RequestEnvelope(request).serialize(),
+                pretty_print=pretty_print
+            )
+
+    @pytest.mark.parametrize("pretty_print", [True, False])
+    def test_missing_values_are_empty_tags(self, pretty_print):
+        request = QuickOrderRequest()
+        request.order_parameters.domain_name = None
+        request.order_parameters.csr = u""
+        credentials = {
+            "partner_code": "123456",
+            "username": "Krieg",
+            "password": None
+        }
+
+        rendered = serialize_request(request, credentials, pretty_print)
+
+        assert b"<DomainName/>" in rendered
+        assert b"<CSR></CSR>" in rendered
+        assert b"<Password/>" in rendered
+        model = RequestEnvelope(request_model=request)
+        assert rendered == etree.tostring(
+            model.serialize(), pretty_print=pretty_print
+        )
+
+    def test_credentials_change(self):
+        request = GetOrderByPartnerOrderID()
+        request.set_credentials("123456", "Krieg", "TrainConductor")
+        render_request(request)
+
+        request.set_credentials("123456", "Krieg", "M1ndFreak")
+        rendered = render_request(request)
+
+        assert b"<Password>M1ndFreak</Password>" in rendered
+        assert b"TrainConductor" not in rendered
+
+    def test_passwords_are_not_cached(self):
+        request = GetOrderByPartnerOrderID()
+        request.set_credentials("123456", "Krieg", "TrainConductor")
+
+        rendered = render_request(request)
+
+        assert b"<Password>TrainConductor</Password>" in rendered
+        caches = [
+            obj for obj in gc.get_objects()
+            if isinstance(obj, utils.FragmentCache)
+        ]
+        assert caches
+        for cache in caches:
+            for key, fragment in cache._fragments.items():
+                assert "TrainConductor" not in key
+                if isinstance(fragment, bytes):
+                    assert b"TrainConductor" not in fragment
+
+    def test_compact(self):
+        request = GetOrderByPartnerOrderID()
+
+        assert b'\n' not in render_request(request, pretty_print=False)
+
+    def test_subclasses_have_no_template(self):
+        class CustomRequest(GetModifiedOrderRequest):
+            pass
+
+        assert render_request(CustomRequest()) is None
+
+    def test_non_boolean_flags(self):
+        request = GetOrderByPartnerOrderID()
+        request.set_credentials("123456", "Krieg", "TrainConductor")
+        request.query_options.contacts = "False"
+        request.query_options.ca_certs = 0
+
+        rendered = render_request(request)
+
+        assert b"<ReturnContacts>false</ReturnContacts>" in rendered
+        assert b"<ReturnCACerts>0</ReturnCACerts>" in rendered
+        assert canonical(rendered) == canonical(etree.tostring(
+            RequestEnvelope(request).serialize(), pretty_print=True
+        ))
+
+
+class TestEscape(object):
+
+    def test_escape(self):
+        assert escape(u'a&b<c>d\r\xe9') == b'a&amp;b&lt;c&gt;d&#13;&#233;'
+        assert escape(b'abc') == b'abc'
+        assert escape(None) == b''
+
+    def test_invalid_characters(self):
+        with pytest.raises(ValueError):
+            escape(u'a\x00b')
+
+    def test_invalid_type(self):
+        with pytest.raises(TypeError):
+            escape(12)
@@ -0,0 +1,188 @@
+from __future__ import absolute_import, division, print_function
+import threading
+import time
+
+from mock import Mock, patch
+
+import pytest
+import requests
+
+from symantecssl.order import FailedRequest, SymantecClient
+from symantecssl.request_models import GetOrderByPartnerOrderID
+from symantecssl.throttle import Governor, ThrottleRegistry, TokenBucket
+from tests.unit import utils as test_utils
+
+
+CREDENTIALS = {
+    "partner_code": "123456",
+    "username": "Krieg",
+    "password": "TrainConductor"
+}
+
+
+def http_response(status_code, filename='get_order_by_poid.xml'):
+    response = Mock(status_code=status_code)
+    with test_utils.open_xml_file(filename, 'rb') as f:
+        response.content = f.read()
+    return response
+
+
+def order_request():
+    request_model = GetOrderByPartnerOrderID()
+    request_model.set_partner_order_id("131000-00000")
+    return request_model
+
+
+class TestTokenBucket(object):
+
+    @patch("symantecssl.throttle.time.time")
+    def test_take(self, mocked_time):
+        mocked_time.return_value = 100
+        bucket = TokenBucket(rate=2, burst=2)
+
+        assert bucket.take() == 0
+        assert bucket.take() == 0
+        assert bucket.take() == 0.5
+
+        mocked_time.return_value = 100.5
+        assert bucket.take() == 0
+        assert bucket.take() == 0.5
+
+    @patch("symantecssl.throttle.time.time")
+    def test_tokens_are_capped_by_burst(self, mocked_time):
+        mocked_time.return_value = 100
+        bucket = TokenBucket(rate=10, burst=1)
+        assert bucket.take() == 0
+
+        mocked_time.return_value = 200
+        assert bucket.take() == 0
+        assert bucket.take() > 0
+
+
+class TestGovernor(object):
+
+    def test_max_in_flight(self):
+        governor = Governor(max_in_flight=2)
+        lock = threading.Lock()
+        counts = {'in_flight': 0, 'max': 0}
+
+        def work():
+            governor.acquire()
+            with lock:
+                counts['in_flight'] += 1
+                counts['max'] = max(counts['max'], counts['in_flight'])
+            time.sleep(0.01)
+            with lock:
+                counts['in_flight'] -= 1
+            governor.release()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counts['max'] == 2
+        assert governor.in_flight == 0
+
+    def test_try_acquire(self):
+        governor = Governor(rate=1, burst=1, max_in_flight=1)
+
+        assert governor.try_acquire() == 0
+        assert governor.try_acquire() is None
+        governor.release()
+        assert governor.try_acquire() > 0
+        assert governor.in_flight == 0
+
+    def test_try_acquire_calls_back_on_release(self):
+        governor = Governor(max_in_flight=1)
+        callback = Mock()
+
+        assert governor.try_acquire() == 0
+        assert governor.try_acquire(on_release=callback) is None
+        assert not callback.called
+
+        governor.release()
+        governor.try_acquire()
+        governor.release()
+        assert callback.call_count == 1
+
+    @patch("symantecssl.throttle.time.sleep")
+    def test_acquire_waits_for_tokens(self, mocked_sleep):
+        governor = Governor(rate=1000, burst=1)
+
+        governor.acquire()
+        governor.acquire()
+
+        assert mocked_sleep.called
+        assert governor.in_flight == 2
+
+    def test_adaptive_rate(self):
+        governor = Governor(
+            rate=10, adaptive=True, min_rate=2, target_latency=1,
+            increase_step=1
+        )
+
+        governor.try_acquire()
+        governor.release(failed=True)
+        assert governor.rate == 5
+
+        governor.try_acquire()
+        governor.release(latency=2)
+        assert governor.rate == 2.5
+
+        governor.try_acquire()
+        governor.release(failed=True)
+        assert governor.rate == 2
+
+        for _ in range(20):
+            governor.try_acquire()
+            governor.release(latency=0.1)
+        assert governor.rate == 10
+
+    def test_fixed_rate(self):
+        governor = Governor(rate=10)
+
+        governor.try_acquire()
+        governor.release(failed=True)
+        assert governor.rate == 10
+
+
+class TestThrottleRegistry(object):
+
+    def test_governor_per_partner_code(self):
+        registry = ThrottleRegistry(rate=5, max_in_flight=3)
+
+        governor = registry.get("123456")
+        assert registry.get("123456") is governor
+        assert registry.get("654321") is not governor
+        assert governor.rate == 5
+        assert governor.max_in_flight == 3
+
+    @patch("requests.Session.post")
+    def test_client_is_throttled(self, mocked_post):
+        mocked_post.side_effect = [http_response(503), http_response(200)]
+        registry = ThrottleRegistry(rate=10, adaptive=True, increase_step=1)
+        client = SymantecClient(throttle=registry)
+
+        with pytest.raises(FailedRequest):
+            client.post("http://www.example.com/", order_request(),
+                        CREDENTIALS)
+        governor = registry.get("123456")
+        assert governor.in_flight == 0
+        assert governor.rate == 5
+
+        client.post("http://www.example.com/", order_request(), CREDENTIALS)
+        assert governor.in_flight == 0
+        assert governor.rate == 6
+
+    @patch("requests.Session.post")
+    def test_connection_errors_release_the_slot(self, mocked_post):
+        mocked_post.side_effect = requests.ConnectionError()
+        registry = ThrottleRegistry(max_in_flight=1)
+        client = SymantecClient(throttle=registry)
+
+        with pytest.raises(requests.ConnectionError):
+            client.post("http://www.example.com/", order_request(),
+                        CREDENTIALS)
+        assert registry.get("123456").in_flight == 0